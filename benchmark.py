@@ -0,0 +1,278 @@
+"""
+File : benchmark.py
+
+How fast CorpusGenius goes, stage by stage, against the stand-in of mock_genius (the artists of 'Sample Corpus')
+rather than genius.com. Same catalog, same latency, same errors & throttling (seeded) from one run to the next, so
+that a change (more concurrency, a cache, another request budget ...) can be judged by its numbers before it goes
+anywhere near genius.com.
+
+Every stage (artist_albums, album_tracks, lyrics_by_song and corpus_generator, or run_pipeline with --pipeline) is
+timed along with the requests the stand-in got for it (throttled and failed ones included), the songs it went through
+and the peak memory it took (resident set size, or Python allocations only with --tracemalloc).
+
+The stand-in runs in a process of its own, CorpusGenius itself runs just the way it does against genius.com (every
+option of corpusgenius works the same). Mind that without --max-rate or --adaptive that includes lyricsgenius' sleep
+of 0.75 seconds after every request, --songs keeps such runs short.
+
+Example : python benchmark.py --artist "Bob Dylan" --latency 0.05 --concurrency 16 --max-rate 50 --by-id --runs 2
+          (the second run with the cache of the first one)
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+import requests
+
+import corpusgenius
+import mock_genius
+from corpus_batch import artist_run
+from genius_cache import ResponseCache
+from genius_client import AsyncGenius
+from lyrics_normalizer import LyricsNormalizer, NormalizationStage
+from project_store import ProjectStore
+from run_metrics import peak_rss, reset_peak_rss
+from spill_store import SpillStore
+
+
+def reset_peak_memory(python_only=False):
+    # peak memory from now on, rather than since the process started (see peak_memory)
+    if python_only:
+        tracemalloc.reset_peak()
+    else:
+        reset_peak_rss()
+
+
+def peak_memory(python_only=False):
+    """
+:return: peak memory since reset_peak_memory in MB : peak RSS of the process (see run_metrics.peak_rss) or, if
+python_only, of the Python allocations traced by tracemalloc
+:rtype: float or None
+"""
+    if python_only:
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    return peak_rss()
+
+
+def csv_rows(file_name):
+    """
+:return: number of rows of a csv file, header left aside
+:rtype: int
+"""
+    with open(file_name, encoding="utf-8") as data:
+        return sum(1 for _ in csv.reader(data)) - 1
+
+
+def server_stats(address):
+    return requests.get(address + "/_mock/stats").json()
+
+
+def measure(stage, run, songs, address, metrics, cache=None, python_only=False):
+    """
+:param stage: name of the stage
+:type stage: str
+:param run: runs the stage
+:type run: callable
+:param songs: number of songs the stage went through, given what run returned (None for a stage that isn't about
+songs, e.g artist_albums)
+:type songs: callable
+:param address: of the stand-in (see mock_genius.start)
+:type address: str
+:param metrics: metrics of the run, the stage is timed (and profiled, with --profile) there too
+:type metrics: run_metrics.RunMetrics
+:param cache: cache of the run, if any
+:type cache: genius_cache.ResponseCache or None
+:param python_only: see doc. for peak_memory
+:type python_only: bool
+:return: what run returned, and the numbers of the stage
+:rtype: tuple
+"""
+    before = server_stats(address)
+    hits = cache.stats()["hits"] if cache is not None else 0
+    reset_peak_memory(python_only)
+    start = time.perf_counter()
+    with metrics.stage(stage):
+        result = run()
+    seconds = time.perf_counter() - start
+    memory = peak_memory(python_only)
+    after = server_stats(address)
+    statuses = {status: number - before["statuses"].get(status, 0) for status, number in after["statuses"].items()}
+    sent = after["requests"] - before["requests"]
+    done = songs(result)
+    return result, {
+        "stage": stage,
+        "seconds": seconds,
+        "requests": sent,
+        "requests_per_second": sent / seconds if seconds else 0.0,
+        "songs": done,
+        "songs_per_second": done / seconds if done is not None and seconds else None,
+        "throttled": statuses.get("429", 0),
+        "server_errors": sum(number for status, number in statuses.items() if status.startswith("5")),
+        "cache_hits": (cache.stats()["hits"] if cache is not None else 0) - hits,
+        "megabytes": (after["bytes"] - before["bytes"]) / 1024 ** 2,
+        "peak_memory_mb": memory,
+    }
+
+
+def benchmark(options, address, directory, cache=None):
+    """
+a whole run of CorpusGenius for options.artist against the stand-in, its files going in directory.
+:param options: parsed options (see corpusgenius.add_options & mock_genius.add_options)
+:type options: argparse.Namespace
+:param address: of the stand-in (see mock_genius.start)
+:type address: str
+:param directory: where the files of the run go
+:type directory: str
+:param cache: cache shared by the runs, if any
+:type cache: genius_cache.ResponseCache or None
+:return: numbers of every stage (see measure)
+:rtype: list of dict
+"""
+    os.makedirs(directory, exist_ok=True)
+    run = artist_run()
+    genius, controller = run.connect("mock-token", options, cache=cache)
+    genius.verbose = False
+    engine = AsyncGenius(genius, concurrency=options.concurrency) if options.concurrency > 1 else None
+    mock_genius.route(genius._session, address, connections=max(options.concurrency, 10))
+    band_members = mock_genius.ARTISTS[options.artist]["band_members"]
+    run.genius, run.engine = genius, engine
+    run.artist_name = options.artist
+    run.first_last = run.artist_name.split()
+    run.band_members = set(band_members) if band_members else None
+    run.output_dir = directory
+    run.normalizer = LyricsNormalizer(line_breaks=options.keep_line_breaks)
+    run.normalization = NormalizationStage(run.normalizer, processes=options.normalize_processes)
+    if not options.no_store:
+        run.project = ProjectStore(run.output_file(run.first_last[-1] + "_project.sqlite"))
+    run.low_memory = options.low_memory
+    if run.low_memory and run.project is None:
+        run.spill = SpillStore()
+    run.metrics.labels["artist"] = run.artist_name
+    if options.profile:
+        run.metrics.profile_dir = run.output_file(run.first_last[-1] + "_profile")
+    measure_stage = partial(measure, address=address, metrics=run.metrics, cache=cache,
+                            python_only=options.tracemalloc)
+    stages = []
+    with open(os.path.join(directory, "corpusgenius.log"), "a", encoding="utf-8") as log:
+        # what the stages print goes to the log, the numbers are what's of interest here
+        run.print = partial(print, file=log, flush=True)
+        try:
+            run.artist_id = genius.search_artist(
+                artist_name=run.artist_name, max_songs=1, per_page=50, get_full_info=False)._id
+            if run.project is not None:
+                run.project.set_artist(run.artist_id, run.artist_name, run.band_members)
+            if options.pipeline:
+                lyrics_csv, numbers = measure_stage("run_pipeline", lambda: run.run_pipeline(
+                    run.artist_id, workers=options.workers, by_id=options.by_id, retries=options.retries,
+                    corpus_format=options.corpus_format, compress=options.gzip, writers_first=options.writers_first),
+                    lambda _: csv_rows(run.output_file(run.first_last[-1] + "_tracks.csv")))
+                stages.append(numbers)
+            else:
+                albums_csv, numbers = measure_stage(
+                    "artist_albums", lambda: run.artist_albums(run.artist_id), lambda _: None)
+                stages.append(numbers)
+                tracks_csv, numbers = measure_stage(
+                    "album_tracks", lambda: run.album_tracks(albums_csv[1], workers=options.workers),
+                    lambda result: csv_rows(result[1]))
+                stages.append(numbers)
+                lyrics_csv, numbers = measure_stage(
+                    "lyrics_by_song", lambda: run.lyrics_by_song(tracks_csv[1], by_id=options.by_id,
+                                                                 retries=options.retries,
+                                                                 writers_first=options.writers_first),
+                    lambda _: csv_rows(tracks_csv[1]))
+                stages.append(numbers)
+                _, numbers = measure_stage(
+                    "corpus_generator", lambda: run.corpus_generator(
+                        lyrics_csv[3], corpus_format=options.corpus_format, compress=options.gzip),
+                    lambda _: csv_rows(lyrics_csv[3]))
+                stages.append(numbers)
+            # --metrics, --prometheus : the run's own metrics, as corpusgenius has them
+            run.export_metrics(options, cache, controller)
+        finally:
+            if engine is not None:
+                engine.close()
+            run.normalization.close()
+            if run.spill is not None:
+                run.spill.close()
+            if run.project is not None:
+                run.project.close()
+    return stages
+
+
+def report(number, stages):
+    # one line per stage (and one for the whole run), the way they're printed
+    total = {"stage": "total", "seconds": sum(stage["seconds"] for stage in stages),
+             "requests": sum(stage["requests"] for stage in stages),
+             "throttled": sum(stage["throttled"] for stage in stages),
+             "server_errors": sum(stage["server_errors"] for stage in stages),
+             "cache_hits": sum(stage["cache_hits"] for stage in stages),
+             "peak_memory_mb": max((stage["peak_memory_mb"] or 0 for stage in stages), default=0)}
+    total["requests_per_second"] = total["requests"] / total["seconds"] if total["seconds"] else 0.0
+    total["songs"] = max((stage["songs"] or 0 for stage in stages), default=0)
+    total["songs_per_second"] = total["songs"] / total["seconds"] if total["seconds"] else None
+    for stage in stages + [total]:
+        songs = "-" if stage["songs"] is None else stage["songs"]
+        songs_per_second = "-" if stage["songs_per_second"] is None else f"{stage['songs_per_second']:.1f}"
+        memory = "-" if stage["peak_memory_mb"] is None else f"{stage['peak_memory_mb']:.1f}"
+        print(f"{number:>3}  {stage['stage']:<17}{stage['seconds']:>9.2f}{stage['requests']:>9}"
+              f"{stage['requests_per_second']:>9.1f}{songs:>8}{songs_per_second:>9}{stage['throttled']:>7}"
+              f"{stage['server_errors']:>7}{stage['cache_hits']:>8}{memory:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Time every stage of CorpusGenius against a stand-in for genius.com (see mock_genius.py)")
+    parser.add_argument("--artist", choices=sorted(mock_genius.ARTISTS), default="Bob Dylan",
+                        help="artist of 'Sample Corpus' to generate the corpus of (default: Bob Dylan)")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="number of runs, one after another. Runs share the cache (if any), i.e every run but "
+                             "the first one is a warm cache run (default: 1)")
+    parser.add_argument("--output-dir", default=None,
+                        help="directory the files of the runs are kept in (default: a temporary directory, "
+                             "thrown away)")
+    parser.add_argument("--json", default=None, metavar="FILE",
+                        help="also write the numbers, along with the options, to FILE")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="peak memory of Python allocations (tracemalloc, slows things down) rather than of the "
+                             "whole process")
+    mock_genius.add_options(parser)
+    corpusgenius.add_options(parser)
+    # no cache file left behind in the current directory, unless asked for
+    parser.set_defaults(cache=None)
+    args = parser.parse_args()
+
+    server, address = mock_genius.start(**mock_genius.server_options(args))
+    with tempfile.TemporaryDirectory() as scratch:
+        output_dir = args.output_dir or scratch
+        os.makedirs(output_dir, exist_ok=True)
+        cache = None
+        if not args.no_cache:
+            cache = ResponseCache(args.cache or os.path.join(output_dir, "benchmark_cache.sqlite"),
+                                  max_bytes=args.cache_size * 1024 * 1024, refresh=args.refresh)
+        if args.tracemalloc:
+            tracemalloc.start()
+        print(f"\nBenchmarking {args.artist} against {address} (latency {args.latency}s, errors {args.errors:.0%}, "
+              f"throttled {args.throttle:.0%}, rate limit {args.rate_limit or 'none'})\n")
+        print(f"run  {'stage':<17}{'seconds':>9}{'requests':>9}{'req/s':>9}{'songs':>8}{'songs/s':>9}{'429':>7}"
+              f"{'5xx':>7}{'cached':>8}{'peak MB':>10}")
+        runs = []
+        try:
+            for number in range(1, args.runs + 1):
+                stages = benchmark(args, address, os.path.join(output_dir, f"run_{number}"), cache=cache)
+                report(number, stages)
+                runs.append(stages)
+        finally:
+            if cache is not None:
+                cache.close()
+            server.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as numbers:
+            json.dump({"options": vars(args), "python": platform.python_version(), "runs": runs}, numbers, indent=2)
+        print(f"\nNumbers written to {args.json}")
@@ -0,0 +1,256 @@
+"""
+File : corpus_batch.py
+
+CorpusGenius for a whole list of artists in one go, without a single prompt. This is what the Procfile worker runs.
+
+The artists (along with their band members / aliases) come from a JSON manifest -->
+
+    [
+        {"artist": "Bob Dylan"},
+        {"artist": "The Beatles", "band_members": ["John Lennon", "Paul McCartney", "George Harrison",
+                                                   "Ringo Starr", "Lennon-McCartney"]}
+    ]
+
+and the Client Side Token Id from --token or the GENIUS_ACCESS_TOKEN environment variable.
+
+Several artists are processed at once (--artists), all of them through the very same client, i.e a single pool of
+keep-alive connections, a single request budget (--max-rate), cache and requests in flight (--concurrency) for the
+whole batch rather than one of each per process. Every artist gets a directory of its own for its files (and its
+log), and an artist that fails (not on genius.com, a crash ...) is reported at the end without stopping the others.
+
+Example : python corpus_batch.py artists.json --artists 4 --concurrency 16 --max-rate 8 --pipeline --by-id
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+
+from colorama import Fore, Style, init
+
+import corpusgenius
+from genius_cache import ResponseCache
+from genius_client import AsyncGenius
+from lyrics_normalizer import LyricsNormalizer, NormalizationStage
+from project_store import ProjectStore
+from run_metrics import write_json, write_prometheus
+from spill_store import SpillStore
+
+
+def load_manifest(path):
+    """
+:param path: JSON manifest of the artists (see the doc. above)
+:type path: str
+:return: the artists, as {"artist": ..., "band_members": set or None}
+:rtype: list of dict
+"""
+    with open(path, encoding="utf-8") as data:
+        entries = json.load(data)
+    artists = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"artist": entry}
+        if not entry.get("artist"):
+            raise ValueError(f"{path}: every artist needs a name, got {entry!r}")
+        band_members = entry.get("band_members")
+        if isinstance(band_members, str):
+            # the way the interactive prompt takes them, i.e "John Lennon, Paul McCartney, ..."
+            band_members = band_members.split(",")
+        artists.append({"artist": entry["artist"].strip(),
+                        "band_members": {member.strip() for member in band_members} if band_members else None})
+    return artists
+
+
+def artist_directory(output_dir, artist_name):
+    """
+:return: the directory an artist's files go in, named after the artist
+:rtype: str
+"""
+    return os.path.join(output_dir, re.sub(r"[^\w.-]+", "_", artist_name).strip("_"))
+
+
+def artist_run():
+    """
+:return: a copy of corpusgenius of its own, for an artist. corpusgenius keeps the artist (artist_name, band_members,
+the project store ...) in module globals, hence artists processed at the same time need a copy each.
+:rtype: module
+"""
+    spec = importlib.util.find_spec("corpusgenius")
+    run = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(run)
+    return run
+
+
+def build_artist(entry, genius, engine, options, pool=None, reports=None):
+    """
+:param entry: the artist, as load_manifest has it
+:type entry: dict
+:param genius: the client shared by every artist
+:type genius: genius_client.GeniusClient
+:param engine: the engine shared by every artist (if --concurrency)
+:type engine: genius_client.AsyncGenius or None
+:param options: parsed options
+:type options: argparse.Namespace
+:param pool: processes lyrics are normalized by, shared by every artist (if --normalize-processes)
+:type pool: concurrent.futures.ProcessPoolExecutor or None
+:param reports: where to put the artist's metrics (see run_metrics), once done with it (or failed)
+:type reports: list or None
+:return: the artist's directory
+:rtype: str
+
+Same as running corpusgenius for the artist, with everything it prints going to corpusgenius.log in the artist's
+directory rather than to the console. Its metrics leave out requests, the client being shared (see the batch's own).
+"""
+    directory = artist_directory(options.output_dir, entry["artist"])
+    os.makedirs(directory, exist_ok=True)
+    run = artist_run()
+    run.genius, run.engine = genius, engine
+    run.artist_name = entry["artist"]
+    run.first_last = run.artist_name.split()
+    run.band_members = entry["band_members"]
+    run.output_dir = directory
+    run.normalizer = LyricsNormalizer(line_breaks=options.keep_line_breaks)
+    run.normalization = NormalizationStage(run.normalizer, processes=options.normalize_processes, pool=pool)
+    run.metrics.labels["artist"] = run.artist_name
+    if options.profile:
+        run.metrics.profile_dir = run.output_file(run.first_last[-1] + "_profile")
+    if not options.no_store:
+        run.project = ProjectStore(run.output_file(run.first_last[-1] + "_project.sqlite"))
+    run.low_memory = options.low_memory
+    if run.low_memory and run.project is None:
+        run.spill = SpillStore()
+    with open(os.path.join(directory, "corpusgenius.log"), "a", encoding="utf-8") as log:
+        # the module's own print, so that artists processed at the same time don't end up all mixed up
+        run.print = partial(print, file=log, flush=True)
+        try:
+            artist_search = genius.search_artist(
+                artist_name=run.artist_name, max_songs=1, per_page=50, get_full_info=False)
+            if artist_search is None:
+                raise LookupError(f"{run.artist_name} not found on genius.com")
+            run.artist_id = artist_search._id
+            if run.project is not None:
+                run.project.set_artist(run.artist_id, run.artist_name, run.band_members)
+            # artists done with on an earlier batch are just brought up to date (see corpusgenius.update_corpus)
+            update = options.update and run.project is not None and len(run.project) > 0
+            run.build_corpus(run.artist_id, options, update=update)
+        except Exception:
+            traceback.print_exc(file=log)
+            raise
+        finally:
+            run.normalization.close()
+            if run.spill is not None:
+                run.spill.close()
+            if run.project is not None:
+                run.project.close()
+            report = run.metrics.report()
+            if reports is not None:
+                reports.append(report)
+            if options.metrics:
+                write_json(run.output_file(run.first_last[-1] + "_metrics.json"), report)
+    return directory
+
+
+def build_batch(artists, genius, engine, options, pool=None, reports=None):
+    """
+:param artists: the artists, as load_manifest has them
+:type artists: list of dict
+:return: the artists that failed, along with what they failed with
+:rtype: dict
+
+build_artist for every artist, options.artists at a time. An artist that fails is reported as it does, the others
+carry on.
+"""
+    failed = {}
+    with ThreadPoolExecutor(max_workers=options.artists) as executor:
+        builds = {executor.submit(build_artist, entry, genius, engine, options, pool, reports): entry["artist"]
+                  for entry in artists}
+        for build in as_completed(builds):
+            artist = builds[build]
+            try:
+                directory = build.result()
+            except Exception as e:
+                failed[artist] = e
+                print(f"{Fore.RED}{artist} : failed ({e!r}), see its corpusgenius.log{Style.RESET_ALL}")
+            else:
+                print(f"{artist} : done, files in {Fore.BLUE}{directory}{Style.RESET_ALL}")
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Generate corpora for a whole list of artists at once, without any prompt")
+    parser.add_argument("manifest",
+                        help="JSON file listing the artists, along with their band members (see corpus_batch.py)")
+    parser.add_argument("--token", default=os.environ.get("GENIUS_ACCESS_TOKEN"),
+                        help="Client Side Token Id from genius.com (default: the GENIUS_ACCESS_TOKEN environment "
+                             "variable)")
+    parser.add_argument("--artists", type=int, default=4,
+                        help="number of artists processed at the same time (default: 4)")
+    parser.add_argument("--output-dir", default="corpora",
+                        help="directory the artists' directories are made in (default: corpora)")
+    parser.add_argument("--update", action="store_true",
+                        help="for artists done with on an earlier batch, fetch only the songs that are new or "
+                             "changed on genius.com since (e.g a nightly refresh)")
+    corpusgenius.add_options(parser)
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("no token, give --token or set GENIUS_ACCESS_TOKEN")
+    if args.profile and args.artists > 1:
+        # from Python 3.12 on, a single profiler runs at a time whatever the thread
+        parser.error("--profile profiles one artist at a time, give --artists 1")
+    init(convert=True)
+
+    artists = load_manifest(args.manifest)
+    start = time.time()
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, max_bytes=args.cache_size * 1024 * 1024, refresh=args.refresh)
+    genius, controller = corpusgenius.connect(args.token, args, cache=cache)
+    # lyricsgenius' own "Searching for ..." would be all mixed up for artists processed at the same time
+    genius.verbose = False
+    engine = None
+    if args.concurrency > 1:
+        engine = AsyncGenius(genius, concurrency=args.concurrency)
+    # every artist's requests go through the very same keep-alive connections
+    genius.pool_size(max(args.concurrency, args.artists))
+    pool = ProcessPoolExecutor(args.normalize_processes) if args.normalize_processes > 1 else None
+
+    print(f"\n{len(artists)} artists, {args.artists} at a time\n")
+    reports = []
+    corpusgenius.metrics.labels["batch"] = os.path.basename(args.manifest)
+    failed = build_batch(artists, genius, engine, args, pool, reports)
+
+    if engine is not None:
+        engine.close()
+    if pool is not None:
+        pool.shutdown()
+    if controller is not None:
+        controller_stats = controller.stats()
+        print(
+            f"\nRequests : {controller_stats['requests']} sent, {controller_stats['throttled']} throttled, "
+            f"{controller_stats['server_errors']} server errors, {controller_stats['timeouts']} timed out, "
+            f"{controller_stats['retries']} retried (ended with {controller_stats['limit']:.0f} in flight)")
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(
+            f"\nCache : {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"(hit ratio {cache_stats['hit_ratio']:.0%})")
+    # requests, retries, the cache ... are the batch's, stages and songs are every artist's
+    report = corpusgenius.metrics.report(cache, controller)
+    if args.metrics:
+        write_json(os.path.join(args.output_dir, "batch_metrics.json"), {"batch": report, "artists": reports})
+        print(f"\nMetrics of the batch exported as {Fore.BLUE}{os.path.join(args.output_dir, 'batch_metrics.json')}"
+              f"{Style.RESET_ALL}")
+    if args.prometheus:
+        write_prometheus(args.prometheus, [report] + reports)
+    if cache is not None:
+        cache.close()
+    print(f"\n{len(artists) - len(failed)} of {len(artists)} artists done in {(time.time() - start) / 60:.1f} "
+          f"minutes")
+    if failed:
+        raise SystemExit(f"{len(failed)} artists failed : {', '.join(failed)}")
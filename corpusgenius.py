@@ -15,23 +15,85 @@ Such as EPs,demos,bootlegs/singles/live performances/specials/etc.
 songwriters and the album it originally appears on for the specified artist in question.
 4) CSV file containing lyrics of all songs
 5) CSV file containing lyrics of all songs re-leased by year.
-6) CSV file containing a single corpus of all songs stored in one single cell of csv file.
+6) CSV file containing a single corpus of all songs stored in one single cell of csv file (or, for big catalogs, a
+plain text / JSONL file streamed one song at a time, see --corpus-format).
 
 All the data will be fetched from genius.com
 """
 
 # importing necessary modules
 
+import argparse
+import ast
 import csv
+import gzip
+import heapq
+import itertools
+import json
+import os
+import queue
+import threading
 import time
 from collections import defaultdict
-from difflib import SequenceMatcher
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 
 from unidecode import unidecode
-import lyricsgenius
 import pandas as pd
 from colorama import Fore, Style, init
-from requests.exceptions import Timeout
+from lyricsgenius.song import Song
+from requests.exceptions import RequestException, Timeout
+
+from genius_cache import ResponseCache
+from genius_client import AdaptiveController, AsyncGenius, GeniusClient, backoff, page_entries, paginate
+from lyrics_index import build_index, corpus_songs
+from lyrics_journal import RETRY, LyricsJournal
+from lyrics_normalizer import LyricsNormalizer, NormalizationStage
+from near_duplicates import VariantIndex, word_diff
+from project_store import ProjectStore, lyrics_digest
+from run_metrics import RunMetrics, write_json, write_prometheus
+from spill_store import SpillStore
+from term_stats import TermStats
+from token_corpus import build_tokens
+from title_matcher import TitleMatcher
+
+# set up in __main__ when requests are to be sent concurrently (--concurrency)
+engine = None
+# set up in __main__ when memory is to be kept to a minimum (--low-memory) : CSV files are written one row at a
+# time, and lyrics aggregations are kept on disk, in the project store or (--no-store) a spill store of their own
+low_memory = False
+spill = None
+# set up in __main__ unless told otherwise (--no-store), see project_store
+project = None
+# how lyrics are normalized (see lyrics_normalizer), set up in __main__ along with the pool of processes
+# doing it (--normalize-processes)
+normalizer = LyricsNormalizer()
+normalization = None
+
+# braces to strip from the lyrics going in the corpus (see export_corpus)
+BRACES = str.maketrans("", "", "{}")
+
+# search results are double checked against the titles of the tracks csv (see song_outcome)
+title_matcher = TitleMatcher()
+
+# version of every song listed on genius.com, by song id (see song_version), until the project store has them (see
+# export_tracks). Not kept without a project store.
+listed_versions = {}
+
+# what the run spends its time on, requests, songs ... (see run_metrics), profiled stage by stage in __main__ if
+# asked to (--profile)
+metrics = RunMetrics()
+
+# directory all the files are written to, the current working directory unless told otherwise (see corpus_batch)
+output_dir = ""
+
+
+def output_file(file_name):
+    """
+:return: where file_name goes, i.e in output_dir
+:rtype: str
+"""
+    return os.path.join(output_dir, file_name)
 
 
 def create_csv(data_structure, fav_filename):
@@ -65,6 +127,13 @@ separated file (csv file)
             .transpose()
             .to_csv(fav_filename, encoding="utf-8")
         )
+    elif isinstance(data_structure, list) and low_memory and data_structure:
+        # same file as below, minus the copy of everything a DataFrame would make
+        with open(fav_filename, "w", encoding="utf-8", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(data_structure[0]), lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(data_structure)
+        csv_file = None
     elif isinstance(data_structure, list):
         csv_file = pd.DataFrame(data_structure).to_csv(
             fav_filename, index=False, encoding="UTF-8"
@@ -77,6 +146,51 @@ separated file (csv file)
     return csv_file
 
 
+def album_records(genius_artist_id):
+    """
+:param genius_artist_id: unique number that genius.com assigns to each of their artist.
+:type genius_artist_id: type int
+:return: all albums by the artist (see doc. for artist_albums), each as soon as it's fetched and just once, in
+fashion {"year": "1966", "album title": "Blonde on Blonde", "album id": 26024}
+:rtype: generator of dict
+"""
+    # initializing album_set as set() to hold list of albums along with their
+    # meta information
+    albums_set = set()
+    if engine is not None:
+        # the next page is requested on the engine while the current one is dealt with, see AsyncGenius.pages
+        albums = page_entries(engine.pages(
+            genius.artist_albums, artist_id=genius_artist_id, per_page=50))
+    else:
+        # each page of albums is fetched once, the next one being on its way
+        # while the current one is dealt with.
+        albums = paginate(
+            genius.artist_albums, prefetch=True, artist_id=genius_artist_id, per_page=50)
+
+    for entry in albums:
+        # dive deep into the data_structure and extract useful info.
+        # Not all albums have their release date info, if they
+        # do --> store album along with their release year and
+        # genius Id (will be useful later)
+        if entry["release_date_components"] is not None:
+            res = (("year", str(
+                entry["release_date_components"]["year"]),), ("album title", unidecode(
+                    entry["name"])), ("album id", entry["id"]),)
+
+        # if year info. not available, set it to "N/A" (NOT
+        # AVAILABLE)
+        else:
+            res = (
+                ("year", "N/A"),
+                ("album title", unidecode(entry["name"])),
+                ("album id", entry["id"]),
+            )
+        # keep on updating the set.
+        if res not in albums_set:
+            albums_set.add(res)
+            yield dict(res)
+
+
 def artist_albums(genius_artist_id):
     """
 :param genius_artist_id: unique number that genius.com assigns to each of their artist.
@@ -135,72 +249,156 @@ these are included is because more often or not, it's a common fact that:
 Lastly, Genius.com is a ever-changing website. A single word change for a song that is a live song will make
 it a unique song.
 """
-    # initializing album_set as set() to hold list of albums along with their
-    # meta information
-    albums_set = set()
-    # searching and initializing total number of pages in which artist's albums
-    # are stored on genius.com
-
-    total_pages = genius.artist_albums(genius_artist_id, per_page=50, page=1)[
-        "next_page"
-    ]
-
-    if total_pages is None:
-        total_pages = (
-            0  # if None, zero. i.e, all the albums are available on first page itself
-        )
+    return export_albums(album_records(genius_artist_id))
 
-    for curr_page in range(
-        1, total_pages + 2
-    ):  # iterate over total number of pages to traverse i.e from page 1 to total_pages
-        artist_album = genius.artist_albums(
-            artist_id=genius_artist_id, per_page=50, page=curr_page
-        )  # search for albums on the current page
-        # dive deep into the data_structure and extract useful info.
-        for master_value in artist_album.values():
-            if isinstance(master_value, list):
-                for entry in master_value:
-                    # Not all albums have their release date info, if they
-                    # do --> store album along with their release year and
-                    # genius Id (will be useful later)
-                    if entry["release_date_components"] is not None:
-                        res = [
-                            (("year", str(
-                                entry["release_date_components"]["year"]),), ("album title", unidecode(
-                                    entry["name"])), ("album id", entry["id"]),)]
-                        albums_set.update(res)
-
-                    # if year info. not available, set it to "N/A" (NOT
-                    # AVAILABLE)
-                    else:
-                        res = [
-                            (
-                                ("year", "N/A"),
-                                ("album title", unidecode(entry["name"])),
-                                ("album id", entry["id"]),
-                            )
-                        ]
-                        # keep on updating the set.
-                        albums_set.update(res)
 
+def export_albums(albums):
+    """
+:param albums: albums by the artist, as album_records hands them over
+:type albums: iterable of dict
+:return: the albums csv (see doc. for artist_albums) & the filename it is saved as
+:rtype: CSV file (None type) and type str for file_name
+"""
     albums_list = sorted(
-        [dict(album_set) for album_set in albums_set], key=lambda key: key["year"]
+        albums, key=lambda key: key["year"]
     )  # sort chronologically , by release year
-    file_name = first_last[-1] + "_albums.csv"
+    if project is not None:
+        project.add_albums(albums_list)
+    file_name = output_file(first_last[-1] + "_albums.csv")
     print(
         f"List of albums generated. (Number of albums : {len(albums_list)}) Now exporting to "
         f"CSV as {Fore.BLUE}{file_name}{Style.RESET_ALL}")
-    artist_album_csv = create_csv(
-        albums_list, file_name)  # export data as a CSV
+    with metrics.timed("csv_export"):
+        artist_album_csv = create_csv(
+            albums_list, file_name)  # export data as a CSV
 
     return artist_album_csv, file_name
 
 
-def album_tracks(all_albums_csv):
+def song_version(song):
+    """
+:param song: a song as genius.com lists it (album tracks, artist songs)
+:type song: dict
+:return: what tells whether the song changed on genius.com since it was last fetched, i.e its title, the state of its
+lyrics and when they were last edited, as far as the listing tells
+:rtype: str
+"""
+    return json.dumps([song.get(field)
+                       for field in ("title", "lyrics_state", "lyrics_updated_at", "updated_by_human_at")])
+
+
+def tracks_by_album(song_set):
+    """
+:param song_set: a single row of the albums csv (see doc. for artist_albums), i.e year, album title and album id
+:type song_set: dict
+:return: set of all tracks on that album, each stored as ((album title), (song title), (song id), (year))
+:rtype: set
+
+Kept separate from album_tracks so that albums can be fetched independently, and hence concurrently.
+"""
+    tracks_set = set()
+    album_id = song_set["album id"]
+    # iterate over every page of tracks on the album, each fetched just once
+    for entry in paginate(genius.album_tracks, album_id=album_id, per_page=50):
+        # dive deep into the data_structure and extract useful
+        # info.
+        if entry["song"] is not None:
+            if project is not None:
+                listed_versions[str(entry["song"]["id"])] = song_version(entry["song"])
+            res = [
+                (("album title", song_set["album title"]), ("song title", unidecode(
+                    entry["song"]["title"].replace(
+                        '’', "'"))), ("song id", entry["song"]["id"]), ("year", song_set["year"]))]
+            # keep on updating the set.
+            tracks_set.update(res)
+    return tracks_set
+
+
+def track_records(albums, workers=1):
+    """
+:param albums: albums by the artist, be it rows of the albums csv or as album_records hands them over
+:type albums: iterable of dict
+:param workers: number of albums to fetch tracks for at the same time. (default 1, i.e one album after another)
+:type workers: int
+:return: all tracks by the artist (see doc. for album_tracks), each as soon as it's fetched and just once, in
+fashion {"album title": "Blonde on Blonde", "song title": "4th Time Around", "song id": 105774, "year": "1966"}
+:rtype: generator of dict
+"""
+    album_tracks_set = set()
+    # initializing album_set as set() to hold list of albums along with their
+    # meta information
+    pool = None
+    if engine is not None:
+        album_batches = (
+            tracks.result() for _, tracks in engine.imap(tracks_by_album, albums))
+    elif workers > 1:
+        # albums are independent of each other, hence fetched side by side. The
+        # request budget is global (see genius_client.TokenBucket), so adding
+        # workers never means hammering genius.com harder than asked for.
+        pool = ThreadPoolExecutor(max_workers=workers)
+        album_batches = pool.map(tracks_by_album, albums)
+    else:
+        album_batches = (tracks_by_album(song_set) for song_set in albums)
+    try:
+        for tracks in album_batches:
+            for res in tracks:
+                if res not in album_tracks_set:
+                    album_tracks_set.add(res)
+                    yield dict(res)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(
+        f"Tracks by each album generated. (Total number of songs in all albums : {Fore.YELLOW}"
+        f"{len(album_tracks_set)}{Style.RESET_ALL})\n"
+        f"Next, moving on to tracks released independently as singles,EPs,demos,unreleased etc.")
+    print(f"{Fore.GREEN}A few more moments please!{Style.RESET_ALL}")
+    # Edge case, genius stores their songs in two ways:
+    # 1) By albums ( that we just scrapped )
+    # 2) In a master list that along with album songs also contain un-categorized songs i.e Demos,singles,
+    # compilations,Live etc.
+    # those songs are what we are going after here.
+    # For example Bob Dylan's all songs are stored in total of 39 pages
+    # (with each page containing no more than 50 entries)!
+    if engine is not None:
+        artist_songs = page_entries(engine.pages(
+            genius.artist_songs, artist_id=artist_id, per_page=50))
+    else:
+        artist_songs = paginate(
+            genius.artist_songs, prefetch=True, artist_id=artist_id, per_page=50)
+    # since there will be lot of repetition, better to initialize it as a
+    # set()
+    album_tracks_edge_set = set()
+    for entry in artist_songs:
+        if entry["primary_artist"]["name"] == artist_name:
+            if project is not None:
+                listed_versions[str(entry["id"])] = song_version(entry)
+            res = (("album title",
+                    "N/A"),
+                   ("song title",
+                    unidecode(
+                        entry["title"].replace(
+                            '’',
+                            "'"))),
+                   ("song id",
+                    entry["id"]),
+                   ("year",
+                    "N/A"))
+            if res not in album_tracks_edge_set:
+                album_tracks_edge_set.add(res)
+                yield dict(res)
+    print(
+        f"List of uncategorized songs generated. (Total number of uncategorized songs : {Fore.YELLOW}"
+        f"{len(album_tracks_edge_set)}{Style.RESET_ALL})")
+
+
+def album_tracks(all_albums_csv, workers=1):
     """
 :param all_albums_csv: file_name of the csv file containing all albums by specified artist.
 (For contents or the fashion it is stored as , see doc. for artist_albums.)
 :type all_albums_csv: str
+:param workers: number of albums to fetch tracks for at the same time. (default 1, i.e one album after another)
+:type workers: int
 :return: a CSV file containg all tracks by the sepcified artist & the file_name it is stored as
 :rtype: a final CSV file (None type) and str type for the file_name
 
@@ -272,115 +470,248 @@ along  with their 'years' (not shown here)
 For songs that have no album info. on Genius.com will be set as "N/A" (Not available)
 
 """
-    album_tracks_set = set()
-    # initializing album_set as set() to hold list of albums along with their
-    # meta information
     with open(all_albums_csv, encoding="utf-8") as data:
-        for song_set in csv.DictReader(data):
-            album_id = song_set["album id"]
-            pages_to_traverse = genius.album_tracks(
-                album_id=album_id, per_page=50, page=1
-            )["next_page"]
-            # searching and initializing total number of pages in which artist's tracks
-            # are stored on genius.com
-            if pages_to_traverse is None:
-                # if None, zero. i.e, all the albums are available on first
-                # page itself
-                pages_to_traverse = 0
-            for curr_page in range(1, pages_to_traverse + 2):
-                # iterate over total number of pages to traverse i.e from
-                # page 1 to total_pages
-                tracks_in_curr_album = genius.album_tracks(
-                    album_id=album_id, per_page=50, page=curr_page
-                )
-                for (
-                    master_value
-                ) in (
-                    tracks_in_curr_album.values()
-                ):  # search for tracks on the current page
-                    # dive deep into the data_structure and extract useful
-                    # info.
-                    if master_value is not None and isinstance(
-                            master_value, list):
-                        for entry in master_value:
-                            if entry["song"] is not None:
-                                res = [
-                                    (("album title", song_set["album title"]), ("song title", unidecode(
-                                        entry["song"]["title"].replace(
-                                            '’', "'"))), ("song id", entry["song"]["id"]), ("year", song_set["year"]))]
-                                # keep on updating the set.
-                                album_tracks_set.update(res)
-    print(
-        f"Tracks by each album generated. (Total number of songs in all albums : {Fore.YELLOW}"
-        f"{len(album_tracks_set)}{Style.RESET_ALL})\n"
-        f"Next, moving on to tracks released independently as singles,EPs,demos,unreleased etc.")
-    print(f"{Fore.GREEN}A few more moments please!{Style.RESET_ALL}")
-    pages = 1
-    # Edge case, genius stores their songs in two ways:
-    # 1) By albums ( that we just scrapped )
-    # 2) In a master list that along with album songs also contain un-categorized songs i.e Demos,singles,
-    # compilations,Live etc.
-    # those songs are what we are going after here.
-    while True:
-        # finding total number of pages in which all songs are stored. For example Bob Dylan's all songs are
-        # stored in total of 39 pages(with each page containing no more than 50
-        # entries)!
-        check_tot_pages = genius.artist_songs(
-            artist_id=artist_id, per_page=50, page=pages
-        )
-        if check_tot_pages["next_page"] is not None:
-            pages += 1
-        else:
-            break
+        all_albums = list(csv.DictReader(data))
+    return export_tracks(track_records(all_albums, workers=workers))
 
-    total_pages = pages
-    # since there will be lot of repetition, better to initialize it as a
-    # set()
-    album_tracks_edge_set = set()
-    for curr_page in range(1, total_pages + 1):
-        artist_songs = genius.artist_songs(
-            artist_id=artist_id, per_page=50, page=curr_page
-        )
-        for master_value in artist_songs.values():
-            if isinstance(master_value, list):
-                for entry in master_value:
-                    if entry["primary_artist"]["name"] == artist_name:
-                        res = [
-                            (("album title",
-                              "N/A"),
-                             ("song title",
-                                unidecode(
-                                    entry["title"].replace(
-                                        '’',
-                                        "'"))),
-                                ("song id",
-                                 entry["id"]),
-                                ("year",
-                                 "N/A"))]
-                        album_tracks_edge_set.update(res)
-    print(
-        f"List of uncategorized songs generated. (Total number of uncategorized songs : {Fore.YELLOW}"
-        f"{len(album_tracks_edge_set)}{Style.RESET_ALL})")
-    album_tracks_edge_set.update(album_tracks_set)
+
+def export_tracks(tracks):
+    """
+:param tracks: tracks by the artist, as track_records hands them over
+:type tracks: iterable of dict
+:return: the tracks csv (see doc. for album_tracks) & the file_name it is stored as
+:rtype: a final CSV file (None type) and str type for the file_name
+"""
     album_tracks_list = sorted(
-        [dict(song_set) for song_set in album_tracks_edge_set],
+        tracks,
         key=lambda key: key["song title"],
     )
+    if project is not None:
+        project.add_tracks(album_tracks_list, listed_versions)
+        # the store has them from now on
+        listed_versions.clear()
 
-    file_name = first_last[-1] + "_tracks.csv"
+    file_name = output_file(first_last[-1] + "_tracks.csv")
     print(
         f"List of all tracks generated. (Final number of tracks : {Fore.YELLOW}{len(album_tracks_list)}"
         f"{Style.RESET_ALL})\n"
         f"Now exporting to CSV as {Fore.BLUE}{file_name}{Style.RESET_ALL}")
-    tracks_by_album_csv = create_csv(album_tracks_list, file_name)
+    with metrics.timed("csv_export"):
+        tracks_by_album_csv = create_csv(album_tracks_list, file_name)
     # exporting as a csv file
     return tracks_by_album_csv, file_name
 
 
-def lyrics_by_song(tracks_csv):
+def clean_lyrics(raw_lyrics):
+    """
+:param raw_lyrics: lyrics as scrapped from genius.com
+:type raw_lyrics: str
+:return: lyrics on a single line, transliterated to ascii and without apostrophes
+:rtype: str
+"""
+    return normalizer(raw_lyrics)
+
+
+def song_metadata(lyrics):
+    """
+:param lyrics: search result for the song on genius.com
+:type lyrics: lyricsgenius.song.Song or None
+:return: the raw metadata song_outcome goes by, as plain data (so that it can be stored, see project_store) -->
+
+    {"id": 27, "title": "...", "artist": "...", "writers": [...], "lyrics": "..."}
+
+None if there's no song.
+:rtype: dict or None
+"""
+    if lyrics is None:
+        return None
+    return {"id": lyrics._id, "title": lyrics.title, "artist": lyrics.artist,
+            "writers": sorted({song_writer["name"] for song_writer in lyrics.writer_artists}),
+            "lyrics": lyrics.lyrics}
+
+
+def attribution(lyrics, song_title, master_artists=None, match_title=True):
+    """
+:param lyrics: raw metadata of the search result for the song on genius.com (see song_metadata), its lyrics aside
+:type lyrics: dict or None
+:return: what becomes of the song, as song_outcome has it ("original", "not_by_artist", "no_writer", "mismatch" or
+"missing"), without a word printed
+:rtype: str
+
+Goes by the title, the primary artist and the song-writers alone, i.e tells whether the lyrics are worth fetching at
+all (see fetch_lyrics' writers_first).
+"""
+    if lyrics is None:
+        return "missing"
+    # titles are matched by their normalized keys, so "A Hard Rain's A-Gonna Fall [Gaslight 1962]" is the
+    # same song as "A Hard Rains A-Gonna Fall", each search result resolved once against the tracks (see title_matcher)
+    with metrics.timed("title_matching"):
+        title_found = not match_title or title_matcher.matches(lyrics["title"], song_title)
+    if not title_found or lyrics["artist"] != artist_name:
+        return "mismatch"
+    # to check for the original song_writer
+    # storing in a set, to skip out duplicates
+    total_writers = set(lyrics["writers"])
+    if not total_writers:
+        return "no_writer"
+    # if artist_name (or any of the band members) is in the above set(), that's
+    # precisely what we are looking for!
+    if master_artists is not None:
+        by_artist = bool(total_writers.intersection(master_artists))
+    else:
+        by_artist = artist_name in total_writers
+    return "original" if by_artist else "not_by_artist"
+
+
+def song_outcome(lyrics, song_title, master_artists=None, match_title=True, normalize=True):
+    """
+:param lyrics: raw metadata of the search result for the song on genius.com (see song_metadata)
+:type lyrics: dict or None
+:param song_title: title of the song as listed in the tracks csv
+:type song_title: str
+:param master_artists: band members (along with the band itself) if the artist is a band, else None
+:type master_artists: set or None
+:param match_title: double check the title of the search result against song_title. Not needed for songs fetched
+by their id.
+:type match_title: bool
+:param normalize: clean the lyrics of original songs (see clean_lyrics) right away. If False, they're left as they
+are, for normalize_outcomes to clean in batches.
+:type normalize: bool
+:return: what became of the song, as plain data (so that it can be journaled, see lyrics_journal) -->
+
+    {"status": "original", "lyrics": "..."}                  written by the artist, lyrics are kept
+    {"status": "not_by_artist", "writers": [...]}            performed but not written by the artist
+    {"status": "no_writer"}                                  no song-writer info. on genius.com
+    {"status": "mismatch"}                                   genius.com returned some other song
+    {"status": "missing"}                                    no lyrics on genius.com
+    {"status": "failed"}                                     written by the artist, but its lyrics were never
+                                                             fetched (a --writers-first run reclassified with
+                                                             other band members), left for the next update
+
+:rtype: dict
+"""
+    status = attribution(lyrics, song_title, master_artists, match_title)
+    if status == "missing":
+        print(
+            f'{Fore.GREEN}Lyrics for the song "{song_title}" is N/A on genius.com, hence skipped.\n'
+            f"{Style.RESET_ALL}")  # skipping since no data is available.
+        return {"status": "missing"}
+
+    if status == "mismatch":
+        # Because of the way data is stored on genius and lyricsgenius is written, it tries
+        # to return the next best song if the given song doesn't exist.
+        # Even if we specify song and artist name
+        # it still returns false data, hence just a double
+        # check measure!
+        print(
+            f"{Fore.GREEN}Song information not available on genius.com, "
+            f"hence skipped{Style.RESET_ALL}\n")
+        return {"status": "mismatch"}
+
+    # if No singer data is available -- set to Not available.
+    if status == "no_writer":
+        print(
+            f'{Fore.GREEN}Song "{song_title}" skipped since '
+            f"not enough information on genius.com "
+            f"for "
+            f'songwriter, hence setting to "N/A"{Style.RESET_ALL}')
+        print(
+            f"{Fore.GREEN}Song writer info. not available on genius.com, "
+            f"hence skipped{Style.RESET_ALL}\n")
+        return {"status": "no_writer"}
+
+    if status == "original":
+        if lyrics["lyrics"] is None:
+            print(
+                f'{Fore.YELLOW}Song "{song_title}" is written by {artist_name} but its lyrics were never fetched, '
+                f"they will be on the next update.{Style.RESET_ALL}\n")
+            return {"status": "failed"}
+        return {"status": "original", "lyrics": clean_lyrics(lyrics["lyrics"]) if normalize else lyrics["lyrics"]}
+
+    total_writers = set(lyrics["writers"])
+    print(
+        f'{Fore.GREEN}Song "{lyrics["title"]}" skipped since {artist_name} '
+        f'is not the original '
+        f"writer."
+        f"\nOriginal author(s) : {list(total_writers)}\n{Style.RESET_ALL}")
+    return {"status": "not_by_artist", "writers": sorted(total_writers)}
+
+
+def normalize_outcomes(stage, line=None, outcome=None):
+    """
+hands a song, and what became of it (see song_outcome), over to the normalization stage (see lyrics_normalizer), or
+everything that is left in it if no song is given.
+:param stage: the normalization stage
+:type stage: lyrics_normalizer.NormalizationStage
+:return: songs done with, in the order they were handed over, as (line, outcome) with the lyrics normalized
+:rtype: list of tuple
+"""
+    with metrics.timed("normalization"):
+        if outcome is None:
+            done = stage.drain()
+        else:
+            # lyrics of a song already done with (see fetch_lyrics' by_id) are normalized already, if not yet there
+            done = stage.put((line, outcome), outcome.get("lyrics") if outcome["status"] == "original" else None)
+    return [(line, outcome if lyrics is None else dict(outcome, lyrics=lyrics))
+            for (line, outcome), lyrics in done]
+
+
+def apply_outcome(outcome, song_title, album_title, song_year, lyrics_set, lyrics_by_years, not_by_artist,
+                  texts=None):
+    """
+adds a song, given what became of it (see song_outcome), to the data structures lyrics_by_song exports.
+:param lyrics_set: lyrics by song title
+:type lyrics_set: defaultdict(set)
+:param lyrics_by_years: lyrics by year
+:type lyrics_by_years: defaultdict(set)
+:param not_by_artist: album and original writers (if available) of songs not written by the artist, by song title
+:type not_by_artist: defaultdict(list)
+:param texts: lyrics already in lyrics_set / lyrics_by_years, by content hash (default: none, every text kept as is,
+e.g spilled to disk)
+:type texts: dict or None
+"""
+    status = outcome["status"]
+    if status == "original":
+        # the same text (a song on several albums, a live version word for word the same ...) is kept
+        # once, by content hash, and shared by every title / year it belongs to. Sets then tell it's
+        # already there by identity rather than by comparing it character by character.
+        lyrics = outcome["lyrics"]
+        if texts is not None:
+            lyrics = texts.setdefault(lyrics_digest(lyrics), lyrics)
+        lyrics_set[song_title].add(lyrics)
+        lyrics_by_years[song_year].add(lyrics)
+    elif status == "not_by_artist":
+        # skipping songs for which artist is not the
+        # original writer and adding to the other
+        # dict.
+        not_by_artist[song_title].append(
+            [album_title, set(outcome["writers"])]
+        )
+    elif status == "no_writer":
+        # songs without writer info. are listed twice with writers set to "N/A",
+        # as they always have been.
+        total_writers = ["N/A"]
+        not_by_artist[song_title].append(
+            [song_year, album_title, total_writers]
+        )
+        not_by_artist[song_title].append(
+            [song_year, album_title, total_writers]
+        )
+
+
+def lyrics_by_song(tracks_csv, by_id=False, retries=2, writers_first=False):
     """
 :param tracks_csv: file_name of the CSV file containing all the tracks by the specified artist
 :type tracks_csv: type --> str
+:param by_id: fetch songs by their genius id rather than searching for them by title. Since the tracks csv lists a
+song once for every album it appears on, each song is then fetched just once and its lyrics added to every album/year
+it belongs to. Being fetched by id, search results don't need to be double checked against the title either.
+:type by_id: bool
+:param retries: number of times a song that timed out / failed is tried again (later on, with an exponential backoff)
+before leaving it for the next run.
+:type retries: int
+:param writers_first: see doc. for fetch_lyrics
+:type writers_first: bool
 :return: 3 separate CSV files with first containing lyrics for all original songs written by specified artist
 (that are available on genius.com) & A csv file that contains songs NOT by specified artist by performed
 nonetheless. Final CSV containing lyrics of all songs released by album release year
@@ -471,140 +802,280 @@ Mr. Bojangles,              "['N/A', {'Jerry Jeff Walker'}]","['Dylan (1973)', {
 For songs that have no album info. or song-writer info. on Genius.com will be set as "N/A" (Not available)
 """
 
-    lyrics_set = defaultdict(set)
-    not_by_artist = defaultdict(list)
-    lyrics_by_years = defaultdict(set)
-    # a little nifty trick to take a break after every 'n' songs in order to prevent
-    # it from timeout or api calls exceptions etc.
+    # every song is journaled as soon as it's done with, hence if an earlier run got
+    # interrupted, songs it had already processed are not fetched again.
+    journal = LyricsJournal(
+        output_file(first_last[-1] + "_lyrics.journal"), artist_name, band_members)
+    if project is not None and not journal.resumed:
+        project.reset()
+    with open(tracks_csv, encoding="UTF-8") as data:
+        title_matcher.add(line["song title"].strip() for line in csv.DictReader(data))
+    with open(tracks_csv, encoding="UTF-8") as data:
+        lyrics_set, lyrics_by_years, not_by_artist = fetch_lyrics(
+            csv.DictReader(data), journal, by_id=by_id, retries=retries, store=project, writers_first=writers_first)
+    return export_lyrics(lyrics_set, lyrics_by_years, not_by_artist, journal)
+
+
+def lyrics_aggregates():
+    """
+:return: empty lyrics by song title, lyrics by year, and songs not written by the artist (see doc. for lyrics_by_song)
+:rtype: defaultdict(set), defaultdict(set), defaultdict(list) (or their spill_store stand-ins, with --low-memory)
+"""
+    if spill is not None:
+        return spill.sets("lyrics"), spill.sets("lyrics_by_years"), spill.lists("not_by_artist")
+    return defaultdict(set), defaultdict(set), defaultdict(list)
+
+
+def master_artist_names():
+    """
+:return: band members (along with the band itself) if the artist is a band, else None
+:rtype: set or None
+"""
+    if band_members is None:
+        return None
+    master_artists = {artist for artist in band_members}
+    master_artists.update(artist_name.split("''"))
+    return master_artists
+
+
+def fetch_lyrics(tracks, journal, by_id=False, retries=2, store=None, writers_first=False):
+    """
+:param tracks: tracks to fetch lyrics for, be it rows of the tracks csv or as track_records hands them over (with
+every value as a str, like the csv would have it)
+:type tracks: iterable of dict
+:param journal: journal songs are recorded in as they're done with (and that an interrupted run is resumed from)
+:type journal: lyrics_journal.LyricsJournal
+:param by_id: see doc. for lyrics_by_song
+:type by_id: bool
+:param retries: see doc. for lyrics_by_song
+:type retries: int
+:param store: project songs and what became of them are recorded in (default: none, kept in memory / spilled)
+:type store: project_store.ProjectStore or None
+:param writers_first: tell who wrote a song from its API metadata before fetching its lyrics page, and fetch (and
+parse) that page only for songs written by the artist. Covers (and songs without song-writer info.) are listed in
+songs_not_by_[artist's_last_name].csv all the same, whether genius.com has their lyrics or not.
+:type writers_first: bool
+:return: lyrics by song title, lyrics by year, and songs not written by the artist (see doc. for lyrics_by_song)
+:rtype: defaultdict(set), defaultdict(set), defaultdict(list) (or their spill_store stand-ins, with --low-memory, or
+views over the project store)
+"""
+    if store is not None:
+        lyrics_set, lyrics_by_years, not_by_artist = store.views()
+    else:
+        lyrics_set, lyrics_by_years, not_by_artist = lyrics_aggregates()
+    # lyrics gathered in memory, by content hash (see apply_outcome), for as long as they are. Spilled lyrics are
+    # stored once by the spill store itself.
+    texts = {} if store is None and spill is None else None
+    # songs found so far, a line is printed between every 10 of them to keep the output readable (requests are paced
+    # by the client, see connect)
     counter = 0
-    master_artists = None
-    if band_members is not None:
-        master_artists = {artist for artist in band_members}
-        master_artists.update(artist_name.split("''"))
+    master_artists = master_artist_names()
+
+    # songs an earlier (interrupted) run is done with are not fetched again (the
+    # project store, if any, already has them)
+    for record in journal.replay() if store is None else ():
+        apply_outcome(record, record["title"], record["album"], record["year"],
+                      lyrics_set, lyrics_by_years, not_by_artist, texts)
+    if journal.resumed:
+        print(
+            f"{Fore.YELLOW}Resuming an earlier run from {journal.path} : {len(journal.done)} songs already "
+            f"processed, {len(journal.outstanding)} to be retried.{Style.RESET_ALL}\n")
+
+    done = journal.done
+    if store is not None and journal.resumed:
+        # songs are committed to the store before they're journaled (see record), the ones an interrupted run
+        # didn't get to journal are done with all the same
+        done = done | store.done()
+    tracks = (line for line in tracks
+              if journal.key(line) not in done)
+
+    def find(song_id, song_title):
+        # the song (along with its lyrics), None if there's none
+        if not writers_first:
+            if by_id:
+                return genius.song_with_lyrics(song_id)
+            return genius.search_song(song_title, artist_name)
+        # who wrote it first (API metadata alone), then its lyrics page only if it's going to be kept
+        song_info = genius.song_credits(song_id) if by_id else genius.search_song_credits(song_title, artist_name)
+        if song_info is None:
+            return None
+        song = Song(song_info, None)
+        if attribution(song_metadata(song), song_title, master_artists, match_title=not by_id) != "original":
+            metrics.count("lyrics_pages_skipped")
+            return song
+        return genius.with_lyrics(song_info)
+
+    # songs by id (see fetch) : the song while it's being fetched and dealt with, then just what became of it
+    songs_by_id = {}
+    songs_lock = threading.Lock()
+    stored = object()
+
+    if by_id:
+        # the tracks list a song once for every album it appears on. It's fetched just
+        # once nonetheless (the first time it shows up) and shared by all of them. Once
+        # it's done with (see settled), the tracks after get what became of it, rather than
+        # the song (lyrics and all) being kept around until the end of the run.
+        def fetch(line):
+            song_id = line["song id"].strip()
+            with songs_lock:
+                song = songs_by_id.get(song_id)
+                first_seen = song is None
+                if first_seen:
+                    song = songs_by_id[song_id] = Future()
+            if not isinstance(song, Future):
+                return song
+            if first_seen:
+                try:
+                    song.set_result(find(song_id, line["song title"].strip()))
+                except BaseException as e:
+                    # not kept around, the next album listing the song (or its retry) fetches it again
+                    with songs_lock:
+                        del songs_by_id[song_id]
+                    song.set_exception(e)
+            return song.result()
     else:
-        pass
+        def fetch(line):
+            return find(None, line["song title"].strip())
+
+    def settled(line, outcome):
+        # what became of a song fetched by id, for the tracks listing it after line : read back from the project
+        # store, or as little as can be kept of it, its lyrics as their hash (see resolve)
+        if not by_id or outcome["status"] in RETRY:
+            return
+        if store is not None:
+            outcome = stored
+        elif outcome["status"] == "original":
+            outcome = {"status": "original", "digest": lyrics_digest(outcome["lyrics"])}
+        with songs_lock:
+            songs_by_id[line["song id"].strip()] = outcome
+
+    def resolve(outcome):
+        # the lyrics of an outcome settled kept the hash of, as lyrics_set / lyrics_by_years have them
+        if "digest" not in outcome:
+            return outcome
+        return {"status": "original",
+                "lyrics": texts[outcome["digest"]] if texts is not None else spill.text(outcome["digest"])}
+
+    def attempt(line, get, retry_in=None):
+        # fetches the song (get() returns it, or raises) and returns what became of it
+        song_title = line["song title"].strip()
+        then = (f"retrying in {retry_in:.0f}s" if retry_in is not None
+                else "it will be retried on the next run")
+        try:
+            song = get()
+            if isinstance(song, dict):
+                # a song done with already
+                return song
+            lyrics = store.song(line["song id"].strip()) if song is stored else song_metadata(song)
+        except Timeout:
+            print(f'{Fore.RED}Song "{song_title}" timed out, {then}.{Style.RESET_ALL}\n')
+            return {"status": "timeout"}
+        except RequestException as e:
+            print(f'{Fore.RED}Song "{song_title}" failed ({e}), {then}.{Style.RESET_ALL}\n')
+            return {"status": "failed"}
+        if store is not None:
+            store.add_song(line, lyrics, match_title=not by_id)
+        return song_outcome(lyrics, song_title, master_artists, match_title=not by_id, normalize=False)
+
+    # lyrics are normalized in a stage of their own, in batches by a pool of processes (--normalize-processes)
+    # or right away otherwise, before the songs are settled in the order they were fetched
+    stage = normalization if normalization is not None else NormalizationStage(normalizer)
+
+    def settle(line, outcome):
+        for line, outcome in normalize_outcomes(stage, line, outcome):
+            record(line, outcome)
+
+    def record(line, outcome):
+        outcome = resolve(outcome)
+        metrics.song(outcome["status"])
+        if store is not None:
+            # committed to the store before the journal has the song as done, so that a crash in between doesn't
+            # lose it (see done above)
+            store.add_outcome(line, outcome)
+            journal.record(line, outcome)
+        else:
+            journal.record(line, outcome)
+            apply_outcome(outcome, line["song title"].strip(), line["album title"].strip(), line["year"].strip(),
+                          lyrics_set, lyrics_by_years, not_by_artist, texts)
+        settled(line, outcome)
+
+    # songs that timed out / failed wait here for another try, each after a jittered exponential
+    # backoff, rather than being left for the next run right away. (due, n, line, attempts so far)
+    retry_queue = []
+    queued = itertools.count()
+    if engine is not None:
+        # upcoming songs are already in flight while the
+        # current one is being processed
+        rows = engine.imap(fetch, tracks)
+    else:
+        rows = ((line, None) for line in tracks)
+    for line, pending in rows:
+        if counter != 0 and counter % 10 == 0:
+            print(
+                "_____________________________________________________________________________________"
+            )
+        # searching for song details by song_tile and artist_name (or song id)
+        delay = backoff(0) if retries else None
+        outcome = attempt(line, pending.result if pending is not None else partial(fetch, line), delay)
+        if outcome["status"] in RETRY and retries:
+            metrics.count("songs_retried")
+            heapq.heappush(retry_queue, (time.monotonic() + delay, next(queued), line, 1))
+            continue
+        # not all songs necessarily are available on Genius.com some
+        # return None.
+        if outcome["status"] not in ("missing", "timeout", "failed"):
+            counter += 1  # basically +1 point since song exists!
+        settle(line, outcome)
+
+    while retry_queue:
+        due, _, line, attempts = heapq.heappop(retry_queue)
+        time.sleep(max(0.0, due - time.monotonic()))
+        delay = backoff(attempts) if attempts < retries else None
+        outcome = attempt(line, partial(fetch, line), delay)
+        if outcome["status"] in RETRY and delay is not None:
+            metrics.count("songs_retried")
+            heapq.heappush(retry_queue, (time.monotonic() + delay, next(queued), line, attempts + 1))
+            continue
+        settle(line, outcome)
+    for line, outcome in normalize_outcomes(stage):
+        record(line, outcome)
+    return lyrics_set, lyrics_by_years, not_by_artist
+
+
+def export_lyrics(lyrics_set, lyrics_by_years, not_by_artist, journal=None):
+    """
+exports what fetch_lyrics came up with as the 3 CSV files lyrics_by_song returns (see its doc.), then closes the
+journal (if any).
+:rtype: 3 csv files (None type) and type(str) for file_name
+"""
+    with metrics.timed("csv_export"):
+        if not isinstance(lyrics_set, dict):
+            lyrics_csv, not_by_artist_csv, by_years_csv = stream_lyrics(lyrics_set, lyrics_by_years, not_by_artist)
+        else:
+            lyrics_csv, not_by_artist_csv, by_years_csv = frame_lyrics(lyrics_set, lyrics_by_years, not_by_artist)
 
-    with open(tracks_csv, encoding="UTF-8") as data:
-        for line in csv.DictReader(data):
-            song_title = line["song title"].strip()
-            album_title = line["album title"].strip()
-            song_year = line["year"].strip()
-            try:
-
-                if counter != 0 and counter % 10 == 0:
-                    print(
-                        "_____________________________________________________________________________________"
-                    )
-                    time.sleep(0.25)
-                # searching for song details by song_tile and artist_name
-                lyrics = genius.search_song(song_title, artist_name)
-                # not all songs necessarily are available on Genius.com some
-                # return None.
-                if lyrics is not None:
-                    counter += 1  # basically +1 point since song exists!
-                    # noinspection PyArgumentEqualDefault
-                    title_ratio = SequenceMatcher(
-                        None, lyrics.title, song_title).ratio()
-                    # noinspection PyArgumentEqualDefault
-                    artist_ratio = SequenceMatcher(
-                        None, lyrics.artist, artist_name).ratio()
-                    if round(title_ratio, 2) >= 0.93 and artist_ratio == 1.0:
-                        # Because of the way data is stored on genius and lyricsgenius is written, it tries
-                        # to return the next best song if the given song doesn't exist.
-                        # Even if we specify song and artist name
-                        # it still returns false data, hence just a double
-                        # check measure!
-                        writer = (
-                            lyrics.writer_artists
-                        )  # to check for the original song_writer
-                        # storing in a set, to skip out duplicates
-                        total_writers = {
-                            song_writer["name"] for song_writer in writer}
-
-                        # if No singer data is available -- set to Not
-                        # available.
-                        if len(total_writers) == 0:
-                            total_writers = ["N/A"]
-                            not_by_artist[song_title].append(
-                                [song_year, album_title, total_writers]
-                            )
-
-                        if not writer:  # if writer set() is empty i.e False:
-                            print(
-                                f'{Fore.GREEN}Song "{song_title}" skipped since '
-                                f"not enough information on genius.com "
-                                f"for "
-                                f'songwriter, hence setting to "N/A"{Style.RESET_ALL}')
-                            not_by_artist[song_title].append(
-                                [song_year, album_title, total_writers]
-                            )
-
-                        # if artist_name is in the above set(), that's
-                        # precisely what we are looking for! Hence adding to
-                        # the lyrics_set.
-                        if not isinstance(total_writers, list):
-                            if band_members is not None:
-                                if total_writers.intersection(master_artists):
-                                    pure_lyrics = lyrics.lyrics
-                                    pure_lyrics = pure_lyrics.replace(
-                                        "\n", " ")
-                                    pure_lyrics = unidecode(
-                                        pure_lyrics).strip()
-                                    pure_lyrics = pure_lyrics.replace("\'", "")
-                                    lyrics_set[song_title].add(pure_lyrics)
-                                    lyrics_by_years[song_year].add(pure_lyrics)
-                                else:
-                                    print(
-                                        f'{Fore.GREEN}Song "{lyrics.title}" skipped since {artist_name} '
-                                        f'is not the original '
-                                        f"writer."
-                                        f"\nOriginal author(s) : {list(total_writers)}\n{Style.RESET_ALL}")
-                                    # skipping songs for which artist is not the
-                                    # original writer and adding to the other
-                                    # dict.
-
-                                    not_by_artist[song_title].append(
-                                        [album_title, total_writers]
-                                    )
-                            else:
-                                if artist_name in total_writers:
-                                    pure_lyrics = lyrics.lyrics
-                                    pure_lyrics = pure_lyrics.replace(
-                                        "\n", " ")
-                                    pure_lyrics = unidecode(
-                                        pure_lyrics).strip()
-                                    pure_lyrics = pure_lyrics.replace("\'", "")
-                                    lyrics_set[song_title].add(pure_lyrics)
-                                    lyrics_by_years[song_year].add(pure_lyrics)
-                                else:
-                                    print(
-                                        f'{Fore.GREEN}Song "{lyrics.title}" skipped since {artist_name} '
-                                        f'is not the original '
-                                        f"writer."
-                                        f"\nOriginal author(s) : {list(total_writers)}\n{Style.RESET_ALL}")
-                                    # skipping songs for which artist is not the
-                                    # original writer and adding to the other
-                                    # dict.
-
-                                    not_by_artist[song_title].append(
-                                        [album_title, total_writers]
-                                    )
-                        else:
-                            print(
-                                f"{Fore.GREEN}Song writer info. not available on genius.com, "
-                                f"hence skipped{Style.RESET_ALL}\n")
-                    else:
-                        print(
-                            f"{Fore.GREEN}Song information not available on genius.com, "
-                            f"hence skipped{Style.RESET_ALL}\n")
+    print(
+        f"\nCSV file containing lyrics exported as {Fore.BLUE}{output_file(first_last[-1] + '_lyrics.csv')}"
+        f"{Style.RESET_ALL}"
+    )
+    print(
+        f"CSV file containing songs not written (but performed) by {artist_name} exported "
+        f"as {Fore.BLUE}{output_file('songs_not_by_' + first_last[-1] + '.csv')}{Style.RESET_ALL}")
+    print(
+        f"CSV file containing songs by year for artist : {artist_name} exported "
+        f"as {Fore.BLUE}{output_file(first_last[-1] + '_lyrics_by_years.csv')} {Style.RESET_ALL}")
+
+    left_to_retry = journal.close() if journal is not None else 0
+    if left_to_retry:
+        print(
+            f"{Fore.RED}{left_to_retry} songs timed out or failed and are missing from the CSV files above. "
+            f"Re-run CorpusGenius to retry just those (progress is kept in {journal.path}).{Style.RESET_ALL}")
 
-                else:
-                    print(
-                        f'{Fore.GREEN}Lyrics for the song "{song_title}" is N/A on genius.com, hence skipped.\n'
-                        f"{Style.RESET_ALL}")  # skipping since no data is available.
-            except Timeout:
-                continue
+    return lyrics_csv, not_by_artist_csv, by_years_csv, output_file(first_last[-1] + "_lyrics.csv")
 
+
+def frame_lyrics(lyrics_set, lyrics_by_years, not_by_artist):
+    # writes the 3 CSV files of export_lyrics through pandas DataFrames
     # storing data as Pandas dataframe n rows (total number of songs) x 2
     # columns (song title and lyrics)
     lyrics_set_final = pd.DataFrame(
@@ -626,59 +1097,693 @@ For songs that have no album info. or song-writer info. on Genius.com will be se
 
     # exporting to 2 separate CSV files
     lyrics_csv = lyrics_set_final.to_csv(
-        first_last[-1] + "_lyrics.csv", encoding="utf-8"
+        output_file(first_last[-1] + "_lyrics.csv"), encoding="utf-8"
     )
     not_by_artist_csv = not_by_artist_final.to_csv(
-        "songs_not_by_" + first_last[-1] + ".csv", encoding="utf-8"
+        output_file("songs_not_by_" + first_last[-1] + ".csv"), encoding="utf-8"
     )
 
     by_years_csv = by_years_final.to_csv(
-        first_last[-1] + "_lyrics_by_years.csv", encoding="utf-8"
+        output_file(first_last[-1] + "_lyrics_by_years.csv"), encoding="utf-8"
     )
+    return lyrics_csv, not_by_artist_csv, by_years_csv
+
+
+def stream_lyrics(lyrics_set, lyrics_by_years, not_by_artist):
+    # writes the very same 3 CSV files as frame_lyrics, one row at a time straight from the
+    # spill store (--low-memory) or the project store rather than through DataFrames of everything.
+    def write_rows(file_name, header, rows):
+        with open(file_name, "w", encoding="utf-8", newline="") as data:
+            writer = csv.writer(data, lineterminator="\n")
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+
+    write_rows(output_file(first_last[-1] + "_lyrics.csv"), ["", "lyrics"],
+               ([title, str(values)] for title, values in lyrics_set.items()))
+    longest = not_by_artist.longest()
+    write_rows(output_file("songs_not_by_" + first_last[-1] + ".csv"), [""] + [str(n) for n in range(longest)],
+               ([title] + [str(value) for value in values] + [""] * (longest - len(values))
+                for title, values in not_by_artist.items()))
+    write_rows(output_file(first_last[-1] + "_lyrics_by_years.csv"), ["", "lyrics"],
+               ([year, str(values)] for year, values in lyrics_by_years.items()))
+    return None, None, None
+
+
+def reclassify(corpus_format="csv", compress=False):
+    """
+:param corpus_format: see doc. for export_corpus
+:type corpus_format: str
+:param compress: see doc. for export_corpus
+:type compress: bool
+:return: same CSV files as lyrics_by_song & corpus_generator, rebuilt from the project store
+
+Every song lyrics_by_song looks up is stored along with who wrote it (see project_store), thus the very same songs can
+be sorted out again, into the lyrics or into songs_not_by_[artist's_last_name].csv, for another list of band members
+/ aliases without a single request to genius.com. A matter of seconds rather than hours.
+
+Example : a run for The Beatles with band members John Lennon, Paul McCartney, George Harrison, Ringo Starr leaves
+out everything credited to "Lennon-McCartney". Running 'python corpusgenius.py reclassify' with
+John Lennon, Paul McCartney, George Harrison, Ringo Starr, Lennon-McCartney then puts them back in.
+"""
+    master_artists = master_artist_names()
+    tracks = project.tracks()
+    title_matcher.add(line["song title"] for line, lyrics, match_title in tracks)
+    # every distinct search result is resolved against the tracks at once, song_outcome looks them up
+    with metrics.timed("title_matching"):
+        title_matcher.resolve_all(lyrics["title"] for line, lyrics, match_title in tracks
+                                  if lyrics is not None and match_title)
+    stage = normalization if normalization is not None else NormalizationStage(normalizer)
+    for line, lyrics, match_title in tracks:
+        outcome = song_outcome(lyrics, line["song title"], master_artists, match_title=match_title, normalize=False)
+        for line_done, outcome_done in normalize_outcomes(stage, line, outcome):
+            metrics.song(outcome_done["status"])
+            project.add_outcome(line_done, outcome_done)
+    for line_done, outcome_done in normalize_outcomes(stage):
+        metrics.song(outcome_done["status"])
+        project.add_outcome(line_done, outcome_done)
+    print(f"\n{len(tracks)} tracks reclassified from {Fore.BLUE}{project.path}{Style.RESET_ALL}")
+    lyrics_set, lyrics_by_years, not_by_artist = project.views()
+    all_lyrics = export_lyrics(lyrics_set, lyrics_by_years, not_by_artist)
+    corpus_generator(lyrics_csv=all_lyrics[3], corpus_format=corpus_format, compress=compress)
+    return all_lyrics
+
+
+def corpus_generator(lyrics_csv, corpus_format="csv", compress=False):
+    """
+:param lyrics_csv: file_name of the CSV file that contains all the lyrics
+:type lyrics_csv: str
+:param corpus_format: see doc. for export_corpus
+:type corpus_format: str
+:param compress: see doc. for export_corpus
+:type compress: bool
+:return: CSV file containing all the unique songs by the specified artis in a single cell (or a txt/jsonl file, see
+export_corpus) & the file_name it is stored as
+:rtype: CSV file, (None type) and str for the file_name
+
+"""
+    with open(lyrics_csv, encoding="utf-8") as data, metrics.timed("csv_export"):
+        return export_corpus(((line[''], line['lyrics']) for line in csv.DictReader(data)),
+                             corpus_format=corpus_format, compress=compress)
 
+
+def export_corpus(songs, corpus_format="csv", compress=False):
+    """
+:param songs: song title and cell of the lyrics column of the lyrics csv (i.e every lyrics of the song as str(set))
+:type songs: iterable of (str, str)
+:param corpus_format: 'csv' for the whole corpus in a single cell, 'txt' for a plain text file with one song after
+the other (a blank line in between) or 'jsonl' for one {"title": ..., "lyrics": ...} json object per line.
+:type corpus_format: str
+:param compress: if True, the corpus file is gzipped (.gz appended to its name)
+:type compress: bool
+:return: the corpus & the file_name it is stored as
+:rtype: CSV/txt/jsonl file (None type) and str for the file_name
+
+The 'txt' and 'jsonl' corpora are written one song at a time as they're read, only a digest of every song written
+so far is kept around (to leave out duplicates), thus they take about as much memory for 50 songs as for 5000.
+"""
+    file_name = output_file(first_last[-1] + "_corpus." + corpus_format + (".gz" if compress else ""))
+    if corpus_format == "csv":
+        res = {}
+        # initializing res by content hash, since we need only unique songs in our final
+        # corpus
+        for title, temp in songs:
+            temp = temp.translate(BRACES)
+            res.setdefault(lyrics_digest(temp), temp)
+        single_list = ["".join(res.values())]
+        # joining all the separate songs into one sing string!
+        corpus_dataframe = pd.DataFrame(single_list)
+        corpus_dataframe.columns = [first_last[-1] + " corpus"]
+        corpus = corpus_dataframe.to_csv(file_name, encoding='utf-8', compression="gzip" if compress else None)
+    else:
+        written = set()
+        with (gzip.open if compress else open)(file_name, "wt", encoding="utf-8") as corpus:
+            for title, temp in songs:
+                # every version of the song's lyrics (see lyrics_by_song) goes in, duplicates left aside
+                for lyrics in sorted(ast.literal_eval(temp)):
+                    lyrics = lyrics.translate(BRACES)
+                    digest = lyrics_digest(lyrics)
+                    if digest in written:
+                        continue
+                    written.add(digest)
+                    if corpus_format == "jsonl":
+                        corpus.write(json.dumps({"title": title, "lyrics": lyrics}) + "\n")
+                    else:
+                        corpus.write(lyrics + "\n\n")
+        corpus = None
     print(
-        f"\nCSV file containing lyrics exported as {Fore.BLUE}{first_last[-1] + '_lyrics.csv'}{Style.RESET_ALL}"
-    )
+        f"{corpus_format.upper()} file containing corpus for artist: {artist_name} generated and exported as "
+        f"{Fore.BLUE}{file_name}{Style.RESET_ALL}")
+    return corpus, file_name
+
+
+def index_corpus(lyrics_csv):
+    """
+:param lyrics_csv: file_name of the CSV file that contains all the lyrics
+:type lyrics_csv: str
+:return: the file_name the index is stored as
+:rtype: str
+
+Positional index of the lyrics (see lyrics_index), [artist's_last_name]_lyrics.index : which songs (and years) use a
+word or a phrase, in milliseconds, e.g 'python lyrics_index.py search "blowin in the wind" Dylan_lyrics.index'.
+Song ids and years come from the tracks CSV & the lyrics by years CSV next to lyrics_csv.
+"""
+    file_name = output_file(first_last[-1] + "_lyrics.index")
+    songs, vocabulary = build_index(corpus_songs(lyrics_csv), file_name, artist=artist_name)
     print(
-        f"CSV file containing songs not written (but performed) by {artist_name} exported "
-        f"as {Fore.BLUE}{'songs_not_by_' + first_last[-1] + '.csv'}{Style.RESET_ALL}")
+        f"Index of {songs} lyrics ({vocabulary} words) for artist: {artist_name} generated and exported as "
+        f"{Fore.BLUE}{file_name}{Style.RESET_ALL}")
+    return file_name
+
+
+def tokenize_corpus(lyrics_csv):
+    """
+:param lyrics_csv: file_name of the CSV file that contains all the lyrics
+:type lyrics_csv: str
+:return: the directory the tokenized corpus is stored in
+:rtype: str
+
+The corpus tokenized once and for all (see token_corpus), [artist's_last_name]_tokens/ : a vocabulary and the word
+ids of every lyrics, by song and by year, memory mapped by token_corpus.TokenCorpus for gensim to train on (Word2Vec,
+LDA ...) without loading or tokenizing anything.
+"""
+    directory = output_file(first_last[-1] + "_tokens")
+    songs, tokens, vocabulary = build_tokens(corpus_songs(lyrics_csv), directory, artist=artist_name)
     print(
-        f"CSV file containing songs by year for artist : {artist_name} exported "
-        f"as {Fore.BLUE}{first_last[-1] + '_lyrics_by_years.csv'} {Style.RESET_ALL}")
+        f"Corpus of {songs} lyrics tokenized ({tokens} words, {vocabulary} distinct) for artist: {artist_name} and "
+        f"exported as {Fore.BLUE}{directory}{Style.RESET_ALL}")
+    return directory
 
-    return lyrics_csv, not_by_artist_csv, by_years_csv, first_last[-1] + "_lyrics.csv"
+
+def term_statistics(ngrams=2):
+    """
+:param ngrams: see doc. for term_stats.TermStats
+:type ngrams: int
+:return: the file_name the statistics are stored as (None without a project store)
+:rtype: str or None
+
+Word statistics of the lyrics by song, album and year (see term_stats), [artist's_last_name]_stats.npz : sparse
+matrices of the counts of every word and n-gram, for frequencies, TF-IDF, distinctive words or vocabulary growth by
+year without going through the lyrics again, e.g 'python term_stats.py Dylan_stats.npz distinctive --by year'. Kept
+from one run to the next : only the words of lyrics not counted yet are counted (i.e of the ones an update fetched).
+"""
+    if project is None:
+        print(f"{Fore.YELLOW}No term statistics without the project store (--no-store).{Style.RESET_ALL}")
+        return None
+    file_name = output_file(first_last[-1] + "_stats.npz")
+    stats = TermStats(file_name, ngrams=ngrams, artist=artist_name)
+    added = stats.update(project)
+    stats.save()
+    print(
+        f"Term statistics of {len(stats)} lyrics ({added} new, {len(stats.vocabulary)} terms of up to {ngrams} words) "
+        f"for artist: {artist_name} generated and exported as {Fore.BLUE}{file_name}{Style.RESET_ALL}")
+    return file_name
 
 
-def corpus_generator(lyrics_csv):
+def variant_clusters(lyrics_csv, threshold=0.8, canonical_corpus=False, compress=False):
     """
 :param lyrics_csv: file_name of the CSV file that contains all the lyrics
 :type lyrics_csv: str
-:return: CSV file containing all the unique songs by the specified artis in a single cell.
-:rtype: CSV file, (None type)
-
+:param threshold: see doc. for near_duplicates.VariantIndex
+:type threshold: float
+:param canonical_corpus: if True, a 'canonical plus diffs' corpus is written as well (see below)
+:type canonical_corpus: bool
+:param compress: see doc. for export_corpus
+:type compress: bool
+:return: CSV file labelling every lyrics with the cluster of live/demo/bootleg/etc. versions of the very same song
+it belongs to & the file_name it is stored as
+:rtype: CSV file (None type) and str for the file_name
+
+Bob Dylan has about as many live versions as songs on genius.com, each with lyrics of its own that are just a few
+words off the studio version, and all of them go in the corpus. Songs are clustered by how similar their lyrics are
+(see near_duplicates), with the most representative version of each as the canonical one.
+
+With canonical_corpus, [artist's_last_name]_corpus_canonical.jsonl has one json object per cluster : the canonical
+version's title and lyrics, and for every other version its title and what changes from the canonical lyrics
+(near_duplicates.apply_diff gets the version's lyrics back, as is).
 """
-    res = set()
-    # initializing res as a set, since we need only unique songs in our final
-    # corpus
+    index = VariantIndex(threshold=threshold)
+    texts = {}
     with open(lyrics_csv, encoding="utf-8") as data:
         for line in csv.DictReader(data):
-            temp = line['lyrics']
-            res.add(''.join(word for word in temp if word not in '{}'))
-    single_list = ["".join(res)]
-    # joining all the separate songs into one sing string!
-    file_name = first_last[-1] + "_corpus.csv"
-    corpus_dataframe = pd.DataFrame(single_list)
-    corpus_dataframe.columns = [first_last[-1] + " corpus"]
-    corpus_dataframe.to_csv(file_name, encoding='utf-8')
+            for lyrics in sorted(ast.literal_eval(line['lyrics'])):
+                lyrics = lyrics.translate(BRACES)
+                digest = lyrics_digest(lyrics)
+                if digest in texts:
+                    continue
+                texts[digest] = lyrics if canonical_corpus else None
+                index.add((line[''], digest), lyrics)
+    clusters = index.clusters()
+
+    file_name = output_file(first_last[-1] + "_variants.csv")
+    with open(file_name, "w", encoding="utf-8", newline="") as data:
+        writer = csv.writer(data, lineterminator="\n")
+        writer.writerow(["cluster", "versions", "song title", "canonical song title", "similarity"])
+        for number, cluster in enumerate(clusters):
+            for (title, digest), similarity in cluster:
+                writer.writerow([number, len(cluster), title, cluster[0][0][0], f"{similarity:.2f}"])
+    variants = sum(len(cluster) - 1 for cluster in clusters)
     print(
-        f"CSV file containing corpus for artist: {artist_name} generated and exported as "
-        f"{Fore.BLUE}{file_name}{Style.RESET_ALL}")
+        f"\n{variants} of {len(texts)} lyrics are live/demo/etc. versions of {len(texts) - variants} songs, "
+        f"CSV file labelling them exported as {Fore.BLUE}{file_name}{Style.RESET_ALL}")
+
+    if canonical_corpus:
+        corpus_name = output_file(first_last[-1] + "_corpus_canonical.jsonl" + (".gz" if compress else ""))
+        with (gzip.open if compress else open)(corpus_name, "wt", encoding="utf-8") as corpus:
+            for number, cluster in enumerate(clusters):
+                (title, digest), similarity = cluster[0]
+                corpus.write(json.dumps({
+                    "cluster": number, "title": title, "lyrics": texts[digest],
+                    "variants": [{"title": variant_title, "diff": word_diff(texts[digest], texts[variant_digest])}
+                                 for (variant_title, variant_digest), similarity in cluster[1:]]}) + "\n")
+        print(
+            f"Canonical plus diffs corpus for artist: {artist_name} exported as "
+            f"{Fore.BLUE}{corpus_name}{Style.RESET_ALL}")
+    return None, file_name
+
+
+def collect(records, sink):
+    """
+hands records over as they come, keeping a copy of each in sink.
+:type records: iterable
+:type sink: list
+:rtype: generator
+"""
+    for record in records:
+        sink.append(record)
+        yield record
+
+
+def staged(name, records):
+    """
+:param name: name of the stage (see run_metrics)
+:type name: str
+:param records: a stage of the pipeline (see run_pipeline)
+:type records: iterable
+:return: the very same records, timed (and profiled, with --profile) as stage name from the first one asked for to the
+last one, in whatever thread they're produced in
+:rtype: generator
+"""
+    with metrics.stage(name):
+        yield from records
+
+
+def background(records, maxsize=1000):
+    """
+:param records: a stage of the pipeline (see run_pipeline)
+:type records: iterable
+:param maxsize: largest number of records handed over but not yet taken, the stage waits for its consumer past it
+:type maxsize: int
+:return: the very same records, produced by a thread of its own
+:rtype: generator
+
+Whatever the stage raises is raised again on the consumer's side.
+"""
+    handoff = queue.Queue(maxsize=maxsize)
+    done = object()
+    failure = []
+
+    def produce():
+        try:
+            for record in records:
+                handoff.put(record)
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            handoff.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        record = handoff.get()
+        if record is done:
+            break
+        yield record
+    if failure:
+        raise failure[0]
+
+
+def run_pipeline(genius_artist_id, workers=1, by_id=False, retries=2, queue_size=1000, corpus_format="csv",
+                 compress=False, writers_first=False):
+    """
+:param genius_artist_id: unique number that genius.com assigns to each of their artist.
+:type genius_artist_id: type int
+:param workers: see doc. for album_tracks
+:type workers: int
+:param by_id: see doc. for lyrics_by_song
+:type by_id: bool
+:param retries: see doc. for lyrics_by_song
+:type retries: int
+:param queue_size: largest number of tracks found but not yet fetched lyrics for
+:type queue_size: int
+:param corpus_format: see doc. for export_corpus
+:type corpus_format: str
+:param compress: see doc. for export_corpus
+:type compress: bool
+:param writers_first: see doc. for fetch_lyrics
+:type writers_first: bool
+:return: same CSV files as artist_albums, album_tracks, lyrics_by_song and corpus_generator put together
+
+Pipeline mode. Rather than each stage writing a CSV for the next one to read back, records are handed over from
+stage to stage as soon as they are fetched -->
+
+    album_records --> track_records ==(bounded queue)==> fetch_lyrics
+
+Albums and tracks are discovered in a background thread, so lyrics for the first album's tracks are being fetched
+while the rest of the discography is still being listed. All CSV files are written at the very end, as sinks, with
+the same contents as in the step by step mode.
+
+Stages are timed (see run_metrics) under the names they have in the step by step mode, from the moment they start to
+the moment they're done, i.e overlapping : album_tracks (artist_albums within) in the background thread, and
+lyrics_by_song then corpus_generator in the calling one.
+"""
+    albums = []
+    tracks = []
+    # albums and tracks are a stage of their own, running in a thread of its own (see staged)
+    track_stream = background(staged("album_tracks", collect(track_records(
+        collect(staged("artist_albums", album_records(genius_artist_id)), albums), workers=workers), tracks)),
+        maxsize=queue_size)
+    journal = LyricsJournal(
+        output_file(first_last[-1] + "_lyrics.journal"), artist_name, band_members)
+    if project is not None and not journal.resumed:
+        project.reset()
+
+    def lines():
+        # the stage downstream expects tracks like the tracks csv has them, i.e str values. The title matcher learns
+        # of each track as it comes off the queue, i.e before its lyrics are looked up (see title_matcher.add)
+        for track in track_stream:
+            line = {column: str(value) for column, value in track.items()}
+            title_matcher.add([line["song title"].strip()])
+            yield line
+
+    with metrics.stage("lyrics_by_song"):
+        lyrics_set, lyrics_by_years, not_by_artist = fetch_lyrics(
+            lines(), journal, by_id=by_id, retries=retries, store=project, writers_first=writers_first)
+
+        export_albums(albums)
+        export_tracks(tracks)
+        # rows in the order lyrics_by_song would have them, i.e as if songs were processed in song title order
+        titles = set(lyrics_set.keys())
+        years = list(dict.fromkeys(
+            str(track["year"]).strip() for track in sorted(tracks, key=lambda key: key["song title"])
+            if str(track["song title"]).strip() in titles))
+        if not isinstance(lyrics_set, dict):
+            lyrics_set.reorder(sorted(titles))
+            not_by_artist.reorder(sorted(not_by_artist.keys()))
+            lyrics_by_years.reorder(years)
+        else:
+            lyrics_set = dict(sorted(lyrics_set.items()))
+            not_by_artist = dict(sorted(not_by_artist.items()))
+            lyrics_by_years = {year: lyrics_by_years[year] for year in years if year in lyrics_by_years}
+        all_lyrics = export_lyrics(lyrics_set, lyrics_by_years, not_by_artist, journal)
+    with metrics.stage("corpus_generator"), metrics.timed("csv_export"):
+        export_corpus(((title, str(values)) for title, values in lyrics_set.items()),
+                      corpus_format=corpus_format, compress=compress)
+    return all_lyrics
+
+
+def update_corpus(genius_artist_id, workers=1, by_id=False, retries=2, corpus_format="csv", compress=False,
+                  writers_first=False):
+    """
+:param genius_artist_id: unique number that genius.com assigns to each of their artist.
+:type genius_artist_id: type int
+:param workers: see doc. for album_tracks
+:type workers: int
+:param by_id: see doc. for lyrics_by_song
+:type by_id: bool
+:param retries: see doc. for lyrics_by_song
+:type retries: int
+:param corpus_format: see doc. for export_corpus
+:type corpus_format: str
+:param compress: see doc. for export_corpus
+:type compress: bool
+:param writers_first: see doc. for fetch_lyrics
+:type writers_first: bool
+:return: same CSV files as artist_albums, album_tracks, lyrics_by_song and corpus_generator put together, brought
+up to date with genius.com
+
+Incremental refresh of an earlier run (see project_store). genius.com is an ever-changing website, but from one run
+to the next only a handful of songs are new or had their lyrics edited. Albums and tracks are listed again (a few
+dozen requests), and lyrics are fetched only for tracks that are new, were left to retry, or whose song's listed
+version (see song_version) isn't the one it was fetched at. Tracks no longer listed are dropped. All the CSV files
+and the corpus are then written again from the project store, the same as a full run would have them.
+"""
+    with metrics.stage("artist_albums"):
+        albums = list(album_records(genius_artist_id))
+        export_albums(albums)
+    with metrics.stage("album_tracks"):
+        tracks = list(track_records(albums, workers=workers))
+        export_tracks(tracks)
+    with metrics.stage("lyrics_by_song"):
+        pruned = project.prune(tracks)
+        stale = project.stale()
+        print(
+            f"\n{Fore.YELLOW}{len(stale)}{Style.RESET_ALL} of {len(tracks)} tracks are new or changed on genius.com "
+            f"({pruned} no longer listed), fetching lyrics for just those.\n")
+        title_matcher.add(str(track["song title"]).strip() for track in tracks)
+        # the project store tells what's left to fetch (an interrupted run included, songs being committed to it
+        # before they're journaled). A journal left behind by a full run keys songs without their version, and
+        # would have songs changed on genius.com since skipped as done : it's started over.
+        journal_file = output_file(first_last[-1] + "_lyrics.journal")
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        journal = LyricsJournal(journal_file, artist_name, band_members)
+        lyrics_set, lyrics_by_years, not_by_artist = fetch_lyrics(
+            stale, journal, by_id=by_id, retries=retries, store=project, writers_first=writers_first)
+        # rows in the order lyrics_by_song would have them, i.e as if every track had just been processed
+        # in song title order
+        project.resequence(sorted(tracks, key=lambda key: key["song title"]))
+        all_lyrics = export_lyrics(lyrics_set, lyrics_by_years, not_by_artist, journal)
+    with metrics.stage("corpus_generator"), metrics.timed("csv_export"):
+        export_corpus(((title, str(values)) for title, values in lyrics_set.items()),
+                      corpus_format=corpus_format, compress=compress)
+    return all_lyrics
+
+
+def add_options(parser):
+    """
+adds every option of a run (--workers, --pipeline ...) to parser, for corpus_batch to share.
+:type parser: argparse.ArgumentParser
+"""
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of albums to fetch tracks for concurrently (default: 1)")
+    parser.add_argument("--max-rate", type=float, default=None,
+                        help="request budget per second for genius.com, i.e the API quota. Replaces the fixed "
+                             "sleeps between requests (default: none)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of requests kept in flight at once by all stages (default: 1)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adapt the number of requests in flight (up to --concurrency) to how genius.com copes: "
+                             "more while it answers fast, fewer on 429/5xx, Retry-After or slow answers. Throttled "
+                             "requests are sent again rather than given up on")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="number of times a song that timed out / failed is tried again, with exponential "
+                             "backoff, before leaving it for the next run (default: 2)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run all stages at once, handing records over in memory rather than through CSV files "
+                             "(which are still written at the end)")
+    parser.add_argument("--by-id", action="store_true",
+                        help="fetch each song once, by its genius id, rather than searching for it by title once "
+                             "for every album it appears on")
+    parser.add_argument("--writers-first", action="store_true",
+                        help="tell who wrote each song from its API metadata first, and fetch lyrics pages only for "
+                             "songs written by the artist (covers cost no page at all)")
+    parser.add_argument("--corpus-format", choices=("csv", "txt", "jsonl"), default="csv",
+                        help="csv: whole corpus in a single cell (default), txt: plain text, one song after the "
+                             "other, jsonl: one json object (title, lyrics) per song. txt and jsonl are written one "
+                             "song at a time, for catalogs too big for a single cell")
+    parser.add_argument("--gzip", action="store_true",
+                        help="gzip the corpus file")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="keep lyrics on disk rather than in memory while they're being gathered (in the project "
+                             "store, or a temporary file with --no-store) and write the CSV files one row at a time, "
+                             "for very large catalogs on small machines (best along with --corpus-format txt or "
+                             "jsonl)")
+    parser.add_argument("--cache", default="corpusgenius_cache.sqlite",
+                        help="file genius.com responses are cached in (default: corpusgenius_cache.sqlite)")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="size limit of the cache in MB, least recently used responses go first (default: 1024)")
+    parser.add_argument("--normalize-processes", type=int, default=1,
+                        help="number of processes lyrics are normalized (transliterated to ascii etc.) by, in batches. "
+                             "Worth it when songs come in faster than a single core normalizes them, e.g reclassify "
+                             "or a run replayed from the cache (default: 1)")
+    parser.add_argument("--keep-line-breaks", action="store_true",
+                        help="keep the line breaks of the lyrics rather than putting each song on a single line")
+    parser.add_argument("--keep-headers", action="store_true",
+                        help="keep the section headers of the lyrics ([Verse 1], [Chorus] ...). Applies to songs "
+                             "fetched from now on")
+    parser.add_argument("--variants", type=float, default=None, metavar="THRESHOLD",
+                        help="cluster live/demo/bootleg/etc. versions of the same song, i.e lyrics at least about "
+                             "THRESHOLD similar (0 to 1, e.g 0.8), into [artist's_last_name]_variants.csv "
+                             "(default: off)")
+    parser.add_argument("--canonical-corpus", action="store_true",
+                        help="along with --variants, also write a corpus of one canonical version per song plus "
+                             "what every other version changes ([artist's_last_name]_corpus_canonical.jsonl)")
+    parser.add_argument("--index", action="store_true",
+                        help="also write a positional index of the lyrics, [artist's_last_name]_lyrics.index, for "
+                             "word, phrase and boolean searches (see lyrics_index.py)")
+    parser.add_argument("--tokens", action="store_true",
+                        help="also write the corpus tokenized, [artist's_last_name]_tokens/ : vocabulary and word ids "
+                             "by song and by year, memory mapped for gensim (see token_corpus.py)")
+    parser.add_argument("--stats", action="store_true",
+                        help="also write word statistics (counts of words and n-grams) by song, album and year, "
+                             "[artist's_last_name]_stats.npz, updated from one run to the next (see term_stats.py)")
+    parser.add_argument("--ngrams", type=int, default=2, metavar="N",
+                        help="along with --stats, n-grams of up to N words are counted (default: 2)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="don't keep the project store ([artist's_last_name]_project.sqlite), only the CSV files "
+                             "(reclassify needs it)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't cache anything, always fetch from genius.com")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore cached responses and fetch everything again (the cache gets refreshed with it)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="write what the run spent its time on (wall time per stage, requests per endpoint and "
+                             "their latency, retries, timeouts, cache hit ratio, songs by outcome, peak RSS) to "
+                             "[artist's_last_name]_metrics.json")
+    parser.add_argument("--prometheus", default=None, metavar="FILE",
+                        help="write the same metrics as a Prometheus textfile to FILE, e.g for node_exporter's "
+                             "textfile collector")
+    parser.add_argument("--profile", action="store_true",
+                        help="run every stage under cProfile, [stage].pstats (and [stage].txt, the top functions) "
+                             "in [artist's_last_name]_profile/")
+
+
+def export_metrics(options, cache=None, controller=None):
+    """
+writes the metrics of the run (see run_metrics) wherever options tell to (--metrics, --prometheus) and prints how
+long every stage took.
+:param options: parsed options (see add_options)
+:type options: argparse.Namespace
+:return: the report (see run_metrics.RunMetrics.report)
+:rtype: dict
+"""
+    report = metrics.report(cache, controller)
+    if options.metrics:
+        file_name = output_file(first_last[-1] + "_metrics.json")
+        write_json(file_name, report)
+        print("\nTime by stage : " + ", ".join(
+            f"{stage['stage']} {stage['seconds']:.1f}s" for stage in report["stages"]))
+        print(f"Metrics of the run exported as {Fore.BLUE}{file_name}{Style.RESET_ALL}")
+    if options.prometheus:
+        write_prometheus(options.prometheus, [report])
+    return report
+
+
+def connect(token, options, cache=None):
+    """
+:param token: Client Side Token Id from genius.com
+:type token: str
+:param options: parsed options (see add_options)
+:type options: argparse.Namespace
+:param cache: see doc. for genius_client.GeniusClient
+:type cache: genius_cache.ResponseCache or None
+:return: the client all requests to genius.com go through, and the controller adapting them (if --adaptive)
+:rtype: genius_client.GeniusClient, genius_client.AdaptiveController or None
+"""
+    controller = None
+    if options.adaptive:
+        controller = AdaptiveController(max_concurrency=options.concurrency)
+    genius = GeniusClient(token.strip(), max_rate=options.max_rate, cache=cache, controller=controller,
+                          metrics=metrics)
+    genius.remove_section_headers = not options.keep_headers
+    # Increasing genius.timeout in-order to prevent timeout exceptions and
+    # battle weak api_calls
+    genius.timeout = 200
+    # requests are paced by the shared budget (--max-rate) or, with --adaptive, by the controller. Only without
+    # either does lyricsgenius' own sleep between requests apply (see GeniusClient._pace)
+    genius.sleep_time = 0.75
+    return genius, controller
+
+
+def build_corpus(artist_id, options, update=False):
+    """
+:param artist_id: genius id of the artist
+:type artist_id: int
+:param options: parsed options (see add_options)
+:type options: argparse.Namespace
+:param update: only bring the project store up to date (see update_corpus) rather than starting over
+:type update: bool
+:return: see doc. for lyrics_by_song
+
+every step, from the artist's albums to the corpus, for the artist set up in __main__ (or corpus_batch).
+"""
+    if update:
+        print(f"\nUpdating all CSV files and the corpus with what's new on genius.com for artist: {artist_name}\n")
+        # timed (and profiled) stage by stage within
+        all_lyrics = update_corpus(artist_id, workers=options.workers, by_id=options.by_id,
+                                   retries=options.retries, corpus_format=options.corpus_format,
+                                   compress=options.gzip, writers_first=options.writers_first)
+    elif options.pipeline:
+        print(
+            f"\nGenerating all CSV files and the corpus at once (pipeline mode) for artist: {artist_name}\n")
+        # timed (and profiled) stage by stage within, stages running side by side
+        all_lyrics = run_pipeline(artist_id, workers=options.workers, by_id=options.by_id,
+                                  retries=options.retries, corpus_format=options.corpus_format,
+                                  compress=options.gzip, writers_first=options.writers_first)
+    else:
+        print(
+            f"\nGenerating CSV file containing all albums released by artist: {artist_name}"
+        )
+        with metrics.stage("artist_albums"):
+            artist_albums_csv = artist_albums(artist_id)
+
+        print(
+            f"Done!\n\nGenerating CSV file containing all tracks by albums/demos/EPs etc. released by artist: "
+            f"{artist_name}")
+        with metrics.stage("album_tracks"):
+            album_tracks_csv = album_tracks(
+                all_albums_csv=artist_albums_csv[1], workers=options.workers)
+
+        print(
+            f"Done!\n\nGenerating 2 CSV files\n"
+            f"1) A CSV file containing lyrics for all original songs for which {artist_name} "
+            f"is credited "
+            f"as "
+            f"the original songwriter\n")
+        print(
+            f"2) A CSV file containing songs that are not written "
+            f"but released/performed nonetheless by artist: "
+            f"{artist_name}\n "
+            f"   along with their original writers and the "
+            f"specified artist's album on which it appears\n"
+        )
+        print("----------------------------------------------------------------------------------\n")
+        with metrics.stage("lyrics_by_song"):
+            all_lyrics = lyrics_by_song(tracks_csv=album_tracks_csv[1], by_id=options.by_id,
+                                        retries=options.retries, writers_first=options.writers_first)
+        with metrics.stage("corpus_generator"):
+            corpus_generator(lyrics_csv=all_lyrics[3], corpus_format=options.corpus_format, compress=options.gzip)
+    if options.index:
+        with metrics.stage("lyrics_index"):
+            index_corpus(all_lyrics[3])
+    if options.tokens:
+        with metrics.stage("token_corpus"):
+            tokenize_corpus(all_lyrics[3])
+    if options.stats:
+        with metrics.stage("term_stats"):
+            term_statistics(ngrams=options.ngrams)
+    if options.variants is not None:
+        with metrics.stage("variant_clusters"):
+            variant_clusters(all_lyrics[3], threshold=options.variants, canonical_corpus=options.canonical_corpus,
+                             compress=options.gzip)
+    return all_lyrics
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Generate a corpus of all the lyrics by an artist, scrapped from genius.com")
+    parser.add_argument("command", nargs="?", choices=("scrape", "reclassify", "update"), default="scrape",
+                        help="scrape: fetch everything from genius.com (default). reclassify: rebuild the lyrics CSV "
+                             "files and the corpus from the songs stored by an earlier run, for another list of band "
+                             "members, without any request to genius.com. update: fetch only the songs that are new "
+                             "or changed on genius.com since an earlier run")
+    add_options(parser)
+    args = parser.parse_args()
+
     print("\nWelcome to CorpusGenius!\n"
           "Jatan J. Pandya (jpandya) © 2020 / https://github.com/jatanjay/")
-    token = input("\nPlease enter your unique Client Side Token Id: ")
+    if args.command != "reclassify":
+        token = input("\nPlease enter your unique Client Side Token Id: ")
     artist_name = input(
         "\nPlease enter the artist's name you'd like to generate CSV and other metadata for: "
     )
@@ -713,21 +1818,53 @@ if __name__ == '__main__':
         print("Great! Onwards!")
         band_members = None
 
+    normalizer = LyricsNormalizer(line_breaks=args.keep_line_breaks)
+    normalization = NormalizationStage(normalizer, processes=args.normalize_processes)
+    metrics.labels["artist"] = artist_name
+    if args.profile:
+        metrics.profile_dir = first_last[-1] + "_profile"
+    if not args.no_store:
+        project = ProjectStore(first_last[-1] + "_project.sqlite")
+    if args.command == "reclassify":
+        start = time.time()
+        if project is None or not len(project):
+            raise SystemExit(f"Nothing to reclassify, no songs stored in {first_last[-1]}_project.sqlite yet.")
+        with metrics.stage("reclassify"):
+            all_lyrics = reclassify(corpus_format=args.corpus_format, compress=args.gzip)
+        if args.index:
+            with metrics.stage("lyrics_index"):
+                index_corpus(all_lyrics[3])
+        if args.tokens:
+            with metrics.stage("token_corpus"):
+                tokenize_corpus(all_lyrics[3])
+        if args.stats:
+            with metrics.stage("term_stats"):
+                term_statistics(ngrams=args.ngrams)
+        if args.variants is not None:
+            with metrics.stage("variant_clusters"):
+                variant_clusters(all_lyrics[3], threshold=args.variants, canonical_corpus=args.canonical_corpus,
+                                 compress=args.gzip)
+        normalization.close()
+        project.close()
+        export_metrics(args)
+        print(f"\nProcess completed in {time.time() - start:.1f} seconds")
+        raise SystemExit
+
     print(
         "\n----------------------------\nConnecting to Genius.com...\n----------------------------\n"
     )
 
     start = time.time()
 
-    genius = lyricsgenius.Genius(token.strip())
-    genius.remove_section_headers = True
-    # Increasing genius.timeout in-order to prevent timeout exceptions and
-    # battle weak api_calls
-    genius.timeout = 200
-    # Increasing time out between requests since sometime excessive requests
-    # create
-    genius.sleep_time = 0.75
-    # exceptions
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, max_bytes=args.cache_size * 1024 * 1024, refresh=args.refresh)
+    low_memory = args.low_memory
+    if low_memory and project is None:
+        spill = SpillStore()
+    genius, controller = connect(token, args, cache=cache)
+    if args.concurrency > 1:
+        engine = AsyncGenius(genius, concurrency=args.concurrency)
     print(
         f"\nIn order to double check if the details for the specified artist : {artist_name} is available on\n"
         f"genius.com, let us check for one random song.\n"
@@ -741,36 +1878,39 @@ if __name__ == '__main__':
     print("\n-----------------------------------")
     print(f"Artist's name : {Fore.YELLOW}{artist_name}{Style.RESET_ALL}")
     print(f"Artist's Genius Id : {Fore.YELLOW}{artist_id}{Style.RESET_ALL}")
+    if project is not None:
+        project.set_artist(artist_id, artist_name, band_members)
 
     print("-----------------------------------\n")
 
-    print(
-        f"\nGenerating CSV file containing all albums released by artist: {artist_name}"
-    )
-    artist_albums_csv = artist_albums(artist_id)
-
-    print(
-        f"Done!\n\nGenerating CSV file containing all tracks by albums/demos/EPs etc. released by artist: "
-        f"{artist_name}")
-    album_tracks_csv = album_tracks(all_albums_csv=artist_albums_csv[1])
-
-    print(
-        f"Done!\n\nGenerating 2 CSV files\n"
-        f"1) A CSV file containing lyrics for all original songs for which {artist_name} "
-        f"is credited "
-        f"as "
-        f"the original songwriter\n")
-    print(
-        f"2) A CSV file containing songs that are not written "
-        f"but released/performed nonetheless by artist: "
-        f"{artist_name}\n "
-        f"   along with their original writers and the "
-        f"specified artist's album on which it appears\n"
-    )
-    print("----------------------------------------------------------------------------------\n")
-    all_lyrics = lyrics_by_song(tracks_csv=album_tracks_csv[1])
-    corpus_generator(lyrics_csv=all_lyrics[3])
+    update = args.command == "update"
+    if update and (project is None or not len(project)):
+        print(f"{Fore.YELLOW}Nothing to update from (no earlier run in the project store), fetching everything."
+              f"{Style.RESET_ALL}")
+        update = False
+    all_lyrics = build_corpus(artist_id, args, update=update)
+    if engine is not None:
+        engine.close()
+    normalization.close()
+    if spill is not None:
+        spill.close()
+    if project is not None:
+        project.close()
     end = time.time()
+    if controller is not None:
+        controller_stats = controller.stats()
+        print(
+            f"\nRequests : {controller_stats['requests']} sent, {controller_stats['throttled']} throttled, "
+            f"{controller_stats['server_errors']} server errors, {controller_stats['timeouts']} timed out, "
+            f"{controller_stats['retries']} retried (ended with {controller_stats['limit']:.0f} in flight)")
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(
+            f"\nCache : {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"(hit ratio {cache_stats['hit_ratio']:.0%})")
+    export_metrics(args, cache, controller)
+    if cache is not None:
+        cache.close()
     print(
         "\n__________________________________________"
         "_______________________________________________________\n"
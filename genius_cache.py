@@ -0,0 +1,181 @@
+"""
+File : genius_cache.py
+
+Persistent, on-disk cache of everything fetched from genius.com: API responses (albums, tracks, artist songs,
+search results, song info) and lyrics pages alike.
+
+Responses are stored in a single SQLite file, keyed by the url of the endpoint along with its parameters. Each kind
+of endpoint has a time-to-live of its own (artist listings go stale much faster than the lyrics page of a song
+released in 1963) and the file is kept under a size limit by throwing away the least recently used responses first.
+
+Re-running CorpusGenius for the same artist (say, after adding a band member's alias) thus hardly touches the network.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+DAY = 24 * 60 * 60
+
+# how long (seconds) a response stays fresh, by endpoint. Listings of an artist change
+# as soon as something gets uploaded on genius.com, a song page very rarely does.
+DEFAULT_TTLS = {
+    "artists": 1 * DAY,  # artist_albums, artist_songs, search_artist
+    "albums": 7 * DAY,  # album_tracks
+    "search": 7 * DAY,  # search_song
+    "songs": 30 * DAY,  # song info, writer credits
+    "pages": 30 * DAY,  # lyrics pages
+}
+
+# returned by ResponseCache.get when there's nothing (fresh) stored, since None is a
+# perfectly valid value to cache (i.e 404 pages)
+MISS = object()
+
+
+class ResponseCache:
+    """
+:param path: file the cache is stored in
+:type path: str
+:param max_bytes: size limit for the stored responses. Least recently used ones are evicted past it.
+:type max_bytes: int
+:param ttls: time-to-live in seconds by endpoint, overrides DEFAULT_TTLS. Endpoints not listed never expire.
+:type ttls: dict or None
+:param refresh: if True, every lookup is a miss, i.e everything is fetched again and the cache refreshed with it.
+:type refresh: bool
+
+hits and misses are counted per endpoint, see stats().
+
+Example : cache = ResponseCache("corpusgenius_cache.sqlite")
+          key = cache.key("https://genius.com/api/albums/26515/tracks", {"page": 1, "per_page": 50})
+          response = cache.get(key, "albums")
+          if response is MISS:
+              response = ... # fetch it
+              cache.put(key, "albums", response)
+"""
+
+    def __init__(self, path, max_bytes=1024 * 1024 * 1024, ttls=None, refresh=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.refresh = refresh
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, endpoint TEXT, value TEXT, size INTEGER, "
+            "created REAL, accessed REAL)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def endpoint(url):
+        """
+:param url: full url of the request
+:return: the kind of endpoint the url belongs to i.e 'artists', 'albums', 'search', 'songs' or 'pages' (web pages)
+:rtype: str
+
+Example : endpoint("https://api.genius.com/artists/181/songs") --> "artists"
+          endpoint("https://genius.com/Bob-dylan-like-a-rolling-stone-lyrics") --> "pages"
+"""
+        for root in ("https://api.genius.com/", "https://genius.com/api/"):
+            if url.startswith(root):
+                return url[len(root):].split("/", 1)[0]
+        return "pages"
+
+    @staticmethod
+    def key(url, params=None):
+        """
+:return: digest identifying a request by its url and parameters (unset parameters left out)
+:rtype: str
+"""
+        params = sorted((name, str(value)) for name, value in (params or {}).items() if value is not None)
+        return hashlib.sha1(json.dumps([url, params]).encode("utf-8")).hexdigest()
+
+    def get(self, key, endpoint):
+        """
+:return: the stored response, MISS if there isn't any or it has expired.
+"""
+        value = MISS
+        now = time.time()
+        with self._lock:
+            if not self.refresh:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] <= self.ttls.get(endpoint, float("inf")):
+                    # committed right away, so that the order responses are evicted in survives a crash
+                    self._db.execute(
+                        "UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+            # counted under the lock as well, worker threads share the cache
+            if value is MISS:
+                self.misses[endpoint] += 1
+            else:
+                self.hits[endpoint] += 1
+        return value
+
+    def put(self, key, endpoint, value):
+        """
+stores a response (anything json serializable), evicting least recently used ones if over max_bytes.
+"""
+        value = json.dumps(value)
+        size = len(value)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, value, size, now, now))
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # drops least recently used responses until back to 90% of the limit,
+        # so that eviction doesn't run again on the very next put.
+        target = 0.9 * self.max_bytes
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed")
+        stale = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            stale.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        """
+:return: hits, misses and hit ratio, in total and by endpoint
+:rtype: dict
+
+Example : {"hits": 1890, "misses": 12, "hit_ratio": 0.99, "by_endpoint": {"pages": {"hits": 1800, "misses": 4}, ...}}
+"""
+        with self._lock:
+            by_endpoint = {endpoint: {"hits": self.hits[endpoint], "misses": self.misses[endpoint]}
+                           for endpoint in sorted(set(self.hits) | set(self.misses))}
+        hits = sum(counts["hits"] for counts in by_endpoint.values())
+        misses = sum(counts["misses"] for counts in by_endpoint.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "by_endpoint": by_endpoint,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
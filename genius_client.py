@@ -0,0 +1,617 @@
+"""
+File : genius_client.py
+
+Thin layer over the lyricsgenius wrapper that every call made by corpusgenius.py goes through.
+
+lyricsgenius keeps a single requests.Session for the whole process and paces itself by sleeping 'sleep_time'
+seconds after each request. That is fine as long as one request is in flight at a time, but as soon as several
+workers share the client a few things need taking care of:
+1) A global budget on the number of requests per second, shared by all the workers (TokenBucket).
+2) The authorization header. lyricsgenius pops it off the shared session before every public API call and puts it
+back afterwards, so a concurrent official API call may go out without a token. GeniusClient sends it per request
+instead.
+3) Lyrics pages. lyricsgenius scrapes them with a bare requests.get(), i.e a brand new connection (and no timeout)
+for every single song. GeniusClient fetches them over the pooled session, within the same budget, and gets their
+lyrics out of them with lyrics_page rather than BeautifulSoup.
+4) Caching. Given a genius_cache.ResponseCache, API responses and lyrics pages alike are looked up there before
+anything is sent out.
+5) Throttling. Given an AdaptiveController, the number of requests in flight follows what genius.com can take at
+the moment (more while it answers fast, fewer as soon as it answers 429/5xx or slows down), and throttled requests
+are sent again after a while rather than given up on.
+6) Metrics. Given a run_metrics.RunMetrics, every request is counted along with its latency, retries and timeouts,
+and the time spent parsing lyrics pages is kept track of.
+
+AsyncGenius then keeps many such calls in flight at once (see its doc.).
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
+import lyricsgenius
+from lyricsgenius.song import Song
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, Timeout
+
+from genius_cache import MISS, ResponseCache
+from lyrics_page import page_lyrics
+
+
+def follow_pages(fetch, prefetch=False, **params):
+    """
+:param fetch: paginated Genius call, i.e genius.artist_albums, genius.artist_songs or genius.album_tracks
+:param prefetch: if True, the next page is requested in the background as soon as the current one arrives, i.e while
+the caller is still busy with it.
+:type prefetch: bool
+:param params: arguments of fetch other than page
+:return: every page of the listing, in order, each fetched exactly once
+:rtype: generator of dict
+
+Genius doesn't tell how many pages a listing has, only which one comes next ('next_page'), hence that's what is
+followed.
+"""
+    if not prefetch:
+        page = 1
+        while page is not None:
+            response = fetch(page=page, **params)
+            page = response["next_page"]
+            yield response
+        return
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(fetch, page=1, **params)
+        while pending is not None:
+            response = pending.result()
+            pending = None
+            if response["next_page"] is not None:
+                pending = executor.submit(fetch, page=response["next_page"], **params)
+            yield response
+
+
+def page_entries(pages):
+    """
+:param pages: pages of a Genius listing (see follow_pages and AsyncGenius.pages)
+:return: entries of the listing, i.e whatever the pages hold in a list ('albums', 'songs', 'tracks' ...)
+:rtype: generator
+"""
+    for page in pages:
+        for master_value in page.values():
+            if isinstance(master_value, list):
+                yield from master_value
+
+
+def paginate(fetch, prefetch=False, **params):
+    """
+:return: every entry of a paginated Genius listing, fetching each page just once (see follow_pages)
+:rtype: generator
+
+Example : for album in paginate(genius.artist_albums, prefetch=True, artist_id=181, per_page=50):
+              print(album["name"])
+"""
+    return page_entries(follow_pages(fetch, prefetch=prefetch, **params))
+
+
+class TokenBucket:
+    """
+Token-bucket rate limiter, shared by every thread (and coroutine) of the process.
+:param rate: number of tokens (requests) added to the bucket per second, i.e the API quota. None (or 0) means no
+limit at all.
+:type rate: float or None
+:param capacity: largest burst of requests allowed to go out back to back. (default: one second worth of tokens)
+:type capacity: float or None
+
+Example : TokenBucket(rate=4) lets at most 4 requests per second go out on average, be it from 1 worker or 10,
+while a worker that has been idle for a second can send 4 requests right away.
+"""
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate or 0
+        self.capacity = capacity or max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+takes a token out of the bucket and returns how long the caller has to wait before it's actually there.
+(tokens can go below zero, which is just the queue of callers already waiting for one)
+"""
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            deficit = -self._tokens
+        return deficit / self.rate if deficit > 0 else 0
+
+    def wait(self):
+        """
+blocks the calling thread until it's allowed to send its request.
+"""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire(self):
+        """
+same as wait, without blocking the event loop.
+"""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def backoff(attempt, base=1.0, cap=60.0):
+    """
+:param attempt: number of attempts that failed so far, minus one (i.e 0 after the first failure)
+:type attempt: int
+:return: how long (seconds) to wait before the next attempt --> exponential (base, 2 x base, 4 x base ... up to cap)
+with a random half of it taken off, so that callers failing at the same time don't all come back at the same time.
+:rtype: float
+"""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_after(response):
+    """
+:return: how long genius.com asks to wait before sending anything again (the Retry-After header, in seconds or as
+a date), None if it doesn't say.
+:rtype: float or None
+"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveController:
+    """
+AIMD (additive increase, multiplicative decrease) control over the number of requests in flight, shared by every
+thread of the process.
+:param max_concurrency: most requests ever let in flight at once (i.e the number of workers sending them)
+:type max_concurrency: int
+:param min_concurrency: fewest requests let in flight at once, however bad things get
+:type min_concurrency: int
+:param latency_factor: a response taking this many times longer than usual counts as congestion
+:type latency_factor: float
+:param max_retries: number of times a throttled (429) or failed (5xx) request is sent again before giving up
+:type max_retries: int
+
+Starting from min_concurrency, every healthy response adds 1/limit to the limit (i.e about one more request in flight
+per round trip), every sign of congestion (429, 5xx, timeout, latency spike) halves it, at most once per round trip.
+A Retry-After header holds back every request until it's due.
+
+Example : controller = AdaptiveController(max_concurrency=8)
+          controller.acquire()
+          ... # send the request
+          controller.release(latency=0.4, status=200)
+"""
+
+    def __init__(self, max_concurrency=1, min_concurrency=1, latency_factor=3.0, max_retries=5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.latency_factor = latency_factor
+        self.max_retries = max_retries
+        self.limit = float(self.min_concurrency)
+        self.latency = None  # moving average of healthy responses' latency (seconds)
+        self.counts = defaultdict(int)
+        self._samples = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+blocks the calling thread until a request may go out, i.e there's room under the limit and no Retry-After pending.
+"""
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                self._cond.wait(pause if pause > 0 else None)
+
+    def release(self, latency=None, status=None, wait=None):
+        """
+hands back the slot taken by acquire, along with how the request went.
+:param latency: seconds the response took, None if there was none (timeout, connection error)
+:type latency: float or None
+:param status: http status of the response, None if there was none
+:type status: int or None
+:param wait: Retry-After of the response (seconds), if any
+:type wait: float or None
+"""
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            self.counts["requests"] += 1
+            if status is None:
+                self.counts["timeouts"] += 1
+                congested = True
+            elif status == 429:
+                self.counts["throttled"] += 1
+                congested = True
+            elif status >= 500:
+                self.counts["server_errors"] += 1
+                congested = True
+            elif (self.latency is not None and self._samples >= 10
+                  and latency > self.latency_factor * self.latency):
+                self.counts["slow"] += 1
+                congested = True
+            else:
+                congested = False
+                self._samples += 1
+                self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+            if wait:
+                self._paused_until = max(self._paused_until, now + wait)
+            if congested:
+                # one decrease per round trip, requests already in flight when it happened
+                # are likely to run into the very same congestion.
+                if now - self._last_decrease >= (self.latency or 1.0):
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                    self.counts["decreases"] += 1
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def retried(self):
+        with self._cond:
+            self.counts["retries"] += 1
+
+    def stats(self):
+        """
+:return: requests sent, how many were throttled / failed / timed out / slow, retries and current limit
+:rtype: dict
+
+Example : {"requests": 2002, "throttled": 14, "server_errors": 0, "timeouts": 1, "slow": 3, "retries": 14,
+           "decreases": 6, "limit": 7.4, "latency": 0.41}
+"""
+        with self._cond:
+            stats = {name: self.counts[name] for name in
+                     ("requests", "throttled", "server_errors", "timeouts", "slow", "retries", "decreases")}
+            stats["limit"] = round(self.limit, 2)
+            stats["latency"] = round(self.latency, 3) if self.latency is not None else None
+        return stats
+
+
+class GeniusClient(lyricsgenius.Genius):
+    """
+lyricsgenius.Genius that is safe to share between worker threads.
+:param client_access_token: Client Side Token Id from genius.com
+:type client_access_token: str
+:param max_rate: request budget per second for the whole process (see TokenBucket)
+:type max_rate: float or None
+:param cache: where responses are looked up before being fetched, and stored after. (default: no caching)
+:type cache: genius_cache.ResponseCache or None
+:param controller: adapts the number of requests in flight and retries throttled ones (default: neither)
+:type controller: AdaptiveController or None
+:param metrics: where requests are counted (default: nowhere)
+:type metrics: run_metrics.RunMetrics or None
+
+All other keyword arguments are handed over to lyricsgenius.Genius as is.
+When max_rate (or a controller) is given, it alone paces the requests and lyricsgenius' fixed sleep after every
+request is dropped.
+"""
+
+    def __init__(self, client_access_token, max_rate=None, cache=None, controller=None, metrics=None, **kwargs):
+        super().__init__(client_access_token, **kwargs)
+        self.limiter = TokenBucket(max_rate)
+        self.cache = cache
+        self.controller = controller
+        self.metrics = metrics
+        # token is sent along with each official API request rather than
+        # living on the (shared) session, see module doc.
+        self._authorization = self._session.headers.pop("authorization", None)
+
+    def pool_size(self, connections):
+        """
+keeps up to 'connections' keep-alive connections open to genius.com (requests' default is 10), so that
+concurrent workers don't keep opening and throwing away connections.
+"""
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=connections)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def _pace(self):
+        # either the shared budget / controller or lyricsgenius' own sleep, never both.
+        if not self.limiter.rate and self.controller is None:
+            time.sleep(max(self._SLEEP_MIN, self.sleep_time))
+
+    def _make_request(self, path, method="GET", params_=None, public_api=False):
+        """
+same as lyricsgenius' Sender._make_request, minus the shared header juggling and plus the global budget and the
+cache.
+"""
+        if public_api:
+            uri = self.PUBLIC_API_ROOT
+            headers = None
+        else:
+            uri = self.API_ROOT
+            headers = {"authorization": self._authorization}
+        uri += path
+
+        if self.cache is not None:
+            endpoint = self.cache.endpoint(uri)
+            key = self.cache.key(uri, params_)
+            cached = self.cache.get(key, endpoint)
+            if cached is not MISS:
+                return cached
+
+        # unlike lyricsgenius, a Timeout is not swallowed (which only made the caller
+        # choke on a None response a moment later) but left for the caller to handle.
+        response = self._send(method, uri, params=params_ if params_ else {}, headers=headers)
+        result = response.json()["response"] if response else None
+        # failures are not cached, they'll be tried again next time
+        if self.cache is not None and result is not None:
+            self.cache.put(key, endpoint, result)
+        return result
+
+    def _send(self, method, url, **kwargs):
+        """
+sends a request within the budget (and under the controller, if any), sending it again as long as genius.com
+throttles it (429) or fails (5xx), up to controller.max_retries times.
+:return: the response
+:rtype: requests.Response
+:raises requests.HTTPError: if still throttled / failing after that
+"""
+        controller = self.controller
+        metrics = self.metrics
+        endpoint = ResponseCache.endpoint(url) if metrics is not None else None
+        attempt = 0
+        while True:
+            if controller is not None:
+                controller.acquire()
+            self.limiter.wait()
+            start = time.monotonic()
+            try:
+                response = self._session.request(method, url, timeout=self.timeout, **kwargs)
+            except RequestException as e:
+                if controller is not None:
+                    controller.release()
+                if metrics is not None and isinstance(e, Timeout):
+                    metrics.timed_out(endpoint)
+                raise
+            status = response.status_code
+            latency = time.monotonic() - start
+            wait = retry_after(response) if status == 429 or status >= 500 else None
+            if controller is not None:
+                controller.release(latency, status, wait)
+            if metrics is not None:
+                metrics.request(endpoint, latency, status)
+            self._pace()
+            if status != 429 and status < 500:
+                return response
+            if controller is None or attempt >= controller.max_retries:
+                response.raise_for_status()
+            controller.retried()
+            if metrics is not None:
+                metrics.retried(endpoint)
+            time.sleep(wait if wait is not None else backoff(attempt))
+            attempt += 1
+
+    def _get_page(self, url):
+        """
+fetches a lyrics page over the shared session.
+:return: html of the page, None if genius.com says 404
+:rtype: str or None
+"""
+        if self.cache is not None:
+            key = self.cache.key(url)
+            cached = self.cache.get(key, "pages")
+            if cached is not MISS:
+                return cached
+
+        page = self._send("GET", url)
+        text = None if page.status_code == 404 else page.text
+        if self.cache is not None and page.status_code in (200, 404):
+            self.cache.put(key, "pages", text)
+        return text
+
+    def song_credits(self, song_id):
+        """
+:param song_id: genius id of the song
+:type song_id: int or str
+:return: the song info (title, primary artist, writer_artists, url ...) without its lyrics, None if it isn't a song
+at all (liner notes, track lists etc.)
+:rtype: dict or None
+
+A single request to the API, i.e the lightweight half of song_with_lyrics : enough to tell who wrote the song before
+bothering with its lyrics page (see with_lyrics).
+"""
+        song_info = self.song(song_id)["song"]
+        if self.skip_non_songs and not self._result_is_lyrics(song_info["title"]):
+            if self.verbose:
+                print('Specified song does not contain lyrics. Rejecting.')
+            return None
+        return song_info
+
+    def search_song_credits(self, title, artist=""):
+        """
+:return: same as song_credits, for the song search_song(title, artist) would end up with (picked out of the search
+results the very same way), None if there's no such song
+:rtype: dict or None
+"""
+        if self.verbose:
+            print(f'Searching for "{title}" by {artist}...' if artist else f'Searching for "{title}"...')
+        search_term = f"{title} {artist}".strip()
+        result = self._get_item_from_search_response(self.search_all(search_term), title, type_="song",
+                                                     result_type="title")
+        if not result:
+            if self.verbose:
+                print(f"No results found for: '{search_term}'")
+            return None
+        if self.skip_non_songs and not self._result_is_lyrics(result["title"]):
+            if self.verbose:
+                print('Specified song does not contain lyrics. Rejecting.')
+            return None
+        song_info = result.copy()
+        song_info.update(self.song(result["id"])["song"])
+        return song_info
+
+    def with_lyrics(self, song_info):
+        """
+:param song_info: song info, as song_credits / search_song_credits have it
+:type song_info: dict
+:return: the song along with its lyrics (its lyrics page is fetched and parsed), None if it has no lyrics
+:rtype: lyricsgenius.song.Song or None
+"""
+        lyrics = self.lyrics(song_info["url"])
+        if not lyrics:
+            if self.verbose:
+                print(('Specified song does not have a valid URL with lyrics.'
+                       'Rejecting.'))
+            return None
+        return Song(song_info, lyrics)
+
+    def song_with_lyrics(self, song_id):
+        """
+:param song_id: genius id of the song
+:type song_id: int or str
+:return: the song along with its lyrics, None if it has no lyrics (or isn't a song at all, i.e liner notes, track
+lists etc.)
+:rtype: lyricsgenius.song.Song or None
+
+What search_song(title, artist) ends up with, minus the search itself (and the guesswork over which search result
+is the song). One request for the song info and one for its lyrics page.
+"""
+        song_info = self.song_credits(song_id)
+        return self.with_lyrics(song_info) if song_info is not None else None
+
+    def lyrics(self, urlthing):
+        """
+same as lyricsgenius' Genius.lyrics, with the page itself fetched by _get_page and its lyrics extracted by
+lyrics_page rather than by BeautifulSoup.
+"""
+        if isinstance(urlthing, int):
+            url = self.song(urlthing)["song"]["url"]
+        else:
+            url = urlthing
+
+        if not url.startswith("https://genius.com/"):
+            if self.verbose:
+                print("Song URL is not valid.")
+            return None
+
+        page = self._get_page(url)
+        if page is None:
+            if self.verbose:
+                print("Song URL returned 404.")
+            return None
+
+        # Scrape the song lyrics from the HTML
+        with self.metrics.timed("page_parsing") if self.metrics is not None else nullcontext():
+            return self._scrape(page)
+
+    def _scrape(self, page):
+        # lyrics out of the html of a lyrics page, the same as lyricsgenius' BeautifulSoup scrapping (see lyrics_page)
+        lyrics, by_soup = page_lyrics(page, self.remove_section_headers)
+        if by_soup and self.metrics is not None:
+            self.metrics.count("pages_parsed_by_soup")
+        if lyrics is None and self.verbose:
+            print("Couldn't find the lyrics section.")
+        return lyrics
+
+
+class AsyncGenius:
+    """
+asyncio engine that keeps up to 'concurrency' Genius calls in flight at once.
+:param client: the client all the calls are made with
+:type client: GeniusClient
+:param concurrency: largest number of calls in flight at the same time
+:type concurrency: int
+
+lyricsgenius (and requests underneath) is blocking, hence this isn't an asyncio HTTP client : the event loop runs in a
+background thread of its own and hands each (blocking) call over to a pool of 'concurrency' workers with
+run_in_executor, the workers sharing the client's keep-alive connections. How fast the
+requests actually go out is up to the client's TokenBucket, sized to the API quota, rather than fixed sleeps.
+
+The pipeline itself stays plain synchronous code: submit() returns a concurrent.futures.Future, imap() and pages()
+are ordinary generators.
+
+Example : engine = AsyncGenius(genius, concurrency=8)
+          for line, song in engine.imap(lambda line: genius.search_song(line["song title"]), rows):
+              song.result()  # raises whatever search_song raised, if anything
+"""
+
+    def __init__(self, client, concurrency=8):
+        self.client = client
+        self.concurrency = concurrency
+        client.pool_size(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    async def call(self, func, *args, **kwargs):
+        """
+coroutine running func(*args, **kwargs) on one of the workers.
+"""
+        return await self._loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def submit(self, func, *args, **kwargs):
+        """
+schedules func(*args, **kwargs) on the engine from synchronous code.
+:rtype: concurrent.futures.Future
+"""
+        return asyncio.run_coroutine_threadsafe(self.call(func, *args, **kwargs), self._loop)
+
+    def imap(self, func, iterable, window=None):
+        """
+:param func: called once per item
+:param iterable: items to call func with
+:param window: largest number of calls submitted ahead of the consumer (default: 4 x concurrency), keeps memory
+bounded for very long iterables.
+:return: (item, future) pairs, in the same order as iterable
+:rtype: generator
+"""
+        window = window or 4 * self.concurrency
+        pending = deque()
+        for item in iterable:
+            pending.append((item, self.submit(func, item)))
+            if len(pending) >= window:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def pages(self, func, **params):
+        """
+:param func: paginated Genius call, i.e genius.artist_albums, genius.artist_songs or genius.album_tracks
+:param params: arguments of func other than page
+:return: every page of the listing, in order
+:rtype: generator of dict
+
+Genius only tells which page comes next ('next_page'), not how many there are, hence no page is requested before
+the one ahead of it says it's there : the next page goes out on one of the workers as soon as the current one
+arrives, i.e while the caller is still busy with it (see follow_pages), and every page is requested exactly once.
+Listings of their own (e.g the tracks of every album) are what go out concurrently.
+"""
+        pending = self.submit(func, page=1, **params)
+        while pending is not None:
+            response = pending.result()
+            pending = None
+            if response["next_page"] is not None:
+                pending = self.submit(func, page=response["next_page"], **params)
+            yield response
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown()
@@ -0,0 +1,399 @@
+"""
+File : lyrics_index.py
+
+Positional inverted index of the lyrics of a corpus : for every word, the songs using it (along with their song id
+and years) and where in their lyrics. Which songs (and years) use the phrase "blowin in the wind" is then a lookup of
+a few words rather than going through every cell of [artist's_last_name]_lyrics.csv, literal_eval()ing it and
+searching it.
+
+The index of an artist is a single file, [artist's_last_name]_lyrics.index, written after corpus_generator (see
+corpusgenius --index) or out of the CSV files of an earlier run -->
+
+    magic, length of the header, header (zlib compressed json : artist, songs, vocabulary), postings
+
+where the postings of a word are a run of varints : number of songs, then for every song the gap from the previous
+song, the number of times the word shows up in it, and the gaps between those positions (in words). Nothing but the
+header is read when opening an index, the postings of a word are read (memory mapped) when it's looked up.
+
+Queries -->
+
+    blowin                          songs with the word
+    "blowin in the wind"            songs with the phrase
+    rain AND (hard OR heavy)        AND (the default, i.e  rain hard  is the same as  rain AND hard), OR, NOT and
+    wind NOT "blowin in the wind"   parentheses, in capitals (and, or & not are words like any other)
+
+Words are matched the way the lyrics are normalized (see lyrics_normalizer), i.e case, accents and apostrophes left
+aside : "Blowin' in the Wind" is the same phrase as "blowin in the wind".
+
+Example : python lyrics_index.py build "Sample Corpus/Dylan_lyrics.csv" "Sample Corpus/Beatles_lyrics.csv"
+          python lyrics_index.py search '"blowin in the wind"' "Sample Corpus/Dylan_lyrics.index"
+          python lyrics_index.py search 'love NOT "i love you"' corpora/*/*_lyrics.index --year 1965
+"""
+
+import argparse
+import ast
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from collections import Counter, defaultdict
+
+from unidecode import unidecode
+
+from project_store import lyrics_digest
+
+MAGIC = b"CGIDX1\n"
+WORD = re.compile(r"[a-z0-9]+")
+# a query : a quoted phrase, a parenthesis or anything else up to the next space
+QUERY_TOKENS = re.compile(r'"([^"]*)"?|([()])|([^\s()"]+)')
+OPERATORS = {"AND", "OR", "NOT"}
+
+
+def words(text):
+    """
+:return: the words of text as they're indexed, i.e lowercased, transliterated to ascii and without apostrophes
+:rtype: list of str
+"""
+    if not text.isascii():
+        text = unidecode(text)
+    return WORD.findall(text.lower().replace("'", ""))
+
+
+def varints(numbers):
+    """
+:return: numbers (none of them negative) as varints, 7 bits a byte
+:rtype: bytearray
+"""
+    encoded = bytearray()
+    for number in numbers:
+        while number > 0x7f:
+            encoded.append(number & 0x7f | 0x80)
+            number >>= 7
+        encoded.append(number)
+    return encoded
+
+
+def read_varints(buffer, start, end):
+    # the numbers varints() encoded in buffer[start:end]
+    numbers = []
+    number = shift = 0
+    for byte in buffer[start:end]:
+        number |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(number)
+            number = shift = 0
+    return numbers
+
+
+def corpus_songs(lyrics_csv, tracks_csv=None, years_csv=None):
+    """
+:param lyrics_csv: file_name of the CSV file that contains all the lyrics, [artist's_last_name]_lyrics.csv
+:type lyrics_csv: str
+:param tracks_csv: [artist's_last_name]_tracks.csv, for the song ids (default: next to lyrics_csv, if there)
+:type tracks_csv: str or None
+:param years_csv: [artist's_last_name]_lyrics_by_years.csv, for the years (default: next to lyrics_csv, if there)
+:type years_csv: str or None
+:return: every lyrics of every song title, as {"title": ..., "song_id": ..., "years": [...], "lyrics": ...}
+:rtype: generator of dict
+"""
+    prefix = lyrics_csv[:-len("_lyrics.csv")] if lyrics_csv.endswith("_lyrics.csv") else None
+    if tracks_csv is None and prefix is not None and os.path.exists(prefix + "_tracks.csv"):
+        tracks_csv = prefix + "_tracks.csv"
+    if years_csv is None and prefix is not None and os.path.exists(prefix + "_lyrics_by_years.csv"):
+        years_csv = prefix + "_lyrics_by_years.csv"
+    csv.field_size_limit(sys.maxsize)
+
+    song_ids = {}
+    if tracks_csv is not None:
+        with open(tracks_csv, encoding="utf-8") as data:
+            for line in csv.DictReader(data):
+                song_ids.setdefault(line["song title"].strip(), line["song id"].strip())
+    years = defaultdict(set)
+    if years_csv is not None:
+        with open(years_csv, encoding="utf-8") as data:
+            for line in csv.DictReader(data):
+                # songs of albums without a release date are under "N/A", which isn't a year
+                if line[""] == "N/A":
+                    continue
+                for lyrics in ast.literal_eval(line["lyrics"]):
+                    years[lyrics_digest(lyrics)].add(line[""])
+    with open(lyrics_csv, encoding="utf-8") as data:
+        for line in csv.DictReader(data):
+            for lyrics in sorted(ast.literal_eval(line["lyrics"])):
+                yield {"title": line[""], "song_id": song_ids.get(line[""]),
+                       "years": sorted(years.get(lyrics_digest(lyrics), ())), "lyrics": lyrics}
+
+
+def build_index(songs, file_name, artist=None):
+    """
+:param songs: songs to index, as corpus_songs has them
+:type songs: iterable of dict
+:param file_name: where the index goes (see module doc. for the format), written in one go
+:type file_name: str
+:param artist: artist of the songs
+:type artist: str or None
+:return: number of songs and of distinct words indexed
+:rtype: tuple of int
+"""
+    documents = []
+    postings = defaultdict(lambda: defaultdict(list))
+    for number, song in enumerate(songs):
+        documents.append([song["title"], song["song_id"], song["years"]])
+        for position, word in enumerate(words(song["lyrics"])):
+            postings[word][number].append(position)
+
+    vocabulary = sorted(postings)
+    offsets = []
+    blob = bytearray()
+    for word in vocabulary:
+        offsets.append(len(blob))
+        numbers = [len(postings[word])]
+        previous = 0
+        for number, positions in postings[word].items():
+            numbers += [number - previous, len(positions), positions[0]]
+            numbers += [after - before for before, after in zip(positions, positions[1:])]
+            previous = number
+        blob += varints(numbers)
+    offsets.append(len(blob))
+
+    header = zlib.compress(json.dumps(
+        {"artist": artist, "songs": documents, "words": vocabulary, "offsets": offsets}).encode("utf-8"))
+    with open(file_name + ".tmp", "wb") as index:
+        index.write(MAGIC)
+        index.write(struct.pack("<Q", len(header)))
+        index.write(header)
+        index.write(blob)
+    os.replace(file_name + ".tmp", file_name)
+    return len(documents), len(vocabulary)
+
+
+class LyricsIndex:
+    """
+:param path: file_name of an index (see build_index)
+:type path: str
+
+Example : index = LyricsIndex("Dylan_lyrics.index")
+          index.search('"blowin in the wind"')
+          # --> [{"artist": "Bob Dylan", "title": "Blowin in the Wind", "song_id": "...", "years": ["1963", ...],
+          #       "offsets": [8, 40, ...]}, ...]
+
+offsets are where (in words) the query matches in the lyrics : every occurrence of a word, the first word of every
+occurrence of a phrase, those of every word or phrase a boolean query matched on. What a song doesn't have is nowhere
+in it, i.e songs matched by a NOT alone (e.g  NOT love) have no offsets and come in title order (NOT NOT love being
+love, offsets and all).
+"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} isn't a lyrics index")
+        length, = struct.unpack_from("<Q", self._map, len(MAGIC))
+        self._start = len(MAGIC) + 8 + length
+        header = json.loads(zlib.decompress(self._map[len(MAGIC) + 8:self._start]))
+        self.artist = header["artist"]
+        self.songs = header["songs"]
+        self._offsets = header["offsets"]
+        self._words = {word: number for number, word in enumerate(header["words"])}
+
+    def __len__(self):
+        return len(self.songs)
+
+    def postings(self, word):
+        """
+:return: positions of word (as indexed, see words) by song, song being its number in songs
+:rtype: dict
+"""
+        number = self._words.get(word)
+        if number is None:
+            return {}
+        numbers = read_varints(self._map, self._start + self._offsets[number], self._start + self._offsets[number + 1])
+        found = {}
+        song = 0
+        at = 1
+        for _ in range(numbers[0]):
+            song += numbers[at]
+            count = numbers[at + 1]
+            positions = []
+            position = 0
+            for gap in numbers[at + 2:at + 2 + count]:
+                position += gap
+                positions.append(position)
+            found[song] = positions
+            at += 2 + count
+        return found
+
+    def phrase(self, phrase_words):
+        """
+:param phrase_words: words of a phrase, as indexed (see words)
+:type phrase_words: list of str
+:return: where the phrase starts by song (see postings)
+:rtype: dict
+"""
+        if not phrase_words:
+            return {}
+        found = self.postings(phrase_words[0])
+        for shift, word in enumerate(phrase_words[1:], start=1):
+            if not found:
+                break
+            following = self.postings(word)
+            narrowed = {}
+            for song, positions in found.items():
+                if song in following:
+                    after = set(following[song])
+                    positions = [position for position in positions if position + shift in after]
+                    if positions:
+                        narrowed[song] = positions
+            found = narrowed
+        return found
+
+    def matches(self, query):
+        """
+:param query: a query (see module doc.)
+:type query: str
+:return: where the query matches by song (see postings)
+:rtype: dict
+"""
+        tokens = []
+        for phrase, parenthesis, word in QUERY_TOKENS.findall(query):
+            if parenthesis:
+                tokens.append(parenthesis)
+            elif word in OPERATORS:
+                tokens.append(word)
+            else:
+                tokens.append(words(phrase or word))
+        tokens.append(None)
+        found, at = self._or(tokens, 0)
+        if tokens[at] is not None:
+            raise ValueError(f"can't make sense of the query {query!r} (unmatched parenthesis?)")
+        return {song: sorted(positions) for song, positions in found.items()}
+
+    # recursive descent of the query : OR of ANDs of (NOT) words, phrases and (queries), each returning what it
+    # matches and where the next one starts
+
+    def _or(self, tokens, at):
+        found, at = self._and(tokens, at)
+        while tokens[at] == "OR":
+            more, at = self._and(tokens, at + 1)
+            for song, positions in more.items():
+                found.setdefault(song, set()).update(positions)
+        return found, at
+
+    def _and(self, tokens, at):
+        found, at = self._not(tokens, at)
+        while tokens[at] is not None and tokens[at] not in ("OR", ")"):
+            if tokens[at] == "AND":
+                at += 1
+            more, at = self._not(tokens, at)
+            found = {song: positions | more[song] for song, positions in found.items() if song in more}
+        return found, at
+
+    def _not(self, tokens, at):
+        # NOT NOT love is love, where it is included
+        negated = False
+        while tokens[at] == "NOT":
+            negated = not negated
+            at += 1
+        found, at = self._term(tokens, at)
+        if negated:
+            return {song: set() for song in range(len(self.songs)) if song not in found}, at
+        return found, at
+
+    def _term(self, tokens, at):
+        token = tokens[at]
+        if token == "(":
+            found, at = self._or(tokens, at + 1)
+            if tokens[at] != ")":
+                raise ValueError("unmatched parenthesis in the query")
+            return found, at + 1
+        if token is None or token in (")", "AND", "OR"):
+            raise ValueError(f"a word or a phrase was expected, got {token or 'the end of the query'}")
+        return {song: set(positions) for song, positions in self.phrase(token).items()}, at + 1
+
+    def search(self, query, years=None):
+        """
+:param query: a query (see module doc.)
+:type query: str
+:param years: only songs of these years (default: any year)
+:type years: collection of str or None
+:return: songs matching the query, those matching it most often first (see doc. for LyricsIndex)
+:rtype: list of dict
+"""
+        hits = []
+        for song, offsets in self.matches(query).items():
+            title, song_id, song_years = self.songs[song]
+            if years is not None and not set(song_years).intersection(years):
+                continue
+            hits.append({"artist": self.artist, "title": title, "song_id": song_id, "years": song_years,
+                         "offsets": offsets})
+        hits.sort(key=lambda hit: (-len(hit["offsets"]), hit["title"]))
+        return hits
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def search(indexes, query, years=None):
+    """
+:param indexes: indexes of several artists (or corpora)
+:type indexes: list of LyricsIndex
+:return: songs matching the query in any of them (see LyricsIndex.search), those matching it most often first
+:rtype: list of dict
+"""
+    hits = [hit for index in indexes for hit in index.search(query, years)]
+    hits.sort(key=lambda hit: (-len(hit["offsets"]), hit["artist"] or "", hit["title"]))
+    return hits
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build / search positional indexes of the lyrics of corpora")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index [artist's_last_name]_lyrics.csv files, each into a "
+                                              "[artist's_last_name]_lyrics.index next to it")
+    build.add_argument("lyrics_csv", nargs="+")
+    build.add_argument("--artist", default=None, help="name of the artist (default: none)")
+    find = commands.add_parser("search", help="search indexes, e.g across the corpora of a batch")
+    find.add_argument("query", help='e.g \'"blowin in the wind"\' or \'rain AND (hard OR heavy)\'')
+    find.add_argument("indexes", nargs="+")
+    find.add_argument("--year", action="append", default=None, help="only songs of this year (can be repeated)")
+    find.add_argument("--limit", type=int, default=20, help="number of songs listed (default: 20)")
+    find.add_argument("--json", action="store_true", help="every song found, as json")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for lyrics_csv in args.lyrics_csv:
+            start = time.perf_counter()
+            file_name = lyrics_csv[:-len(".csv")] + ".index"
+            songs, vocabulary = build_index(corpus_songs(lyrics_csv), file_name, artist=args.artist)
+            print(f"{file_name} : {songs} lyrics, {vocabulary} words, {os.path.getsize(file_name) / 1024:.0f} KB "
+                  f"({time.perf_counter() - start:.1f}s)")
+        raise SystemExit
+
+    indexes = [LyricsIndex(path) for path in args.indexes]
+    start = time.perf_counter()
+    try:
+        found = search(indexes, args.query, years=args.year)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(found, indent=2))
+        raise SystemExit
+    print(f"\n{len(found)} songs in {sum(map(len, indexes))} lyrics ({elapsed * 1000:.1f} ms)\n")
+    for hit in found[:args.limit]:
+        artist = f"{hit['artist']} - " if hit["artist"] else ""
+        print(f"{len(hit['offsets']):>4}  {artist}{hit['title']} (song id {hit['song_id']}, "
+              f"{', '.join(hit['years']) or 'year N/A'})")
+    by_year = Counter(year for hit in found for year in hit["years"])
+    if by_year:
+        print("\nBy year : " + ", ".join(f"{year} ({number})" for year, number in sorted(by_year.items())))
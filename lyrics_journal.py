@@ -0,0 +1,143 @@
+"""
+File : lyrics_journal.py
+
+Append-only journal of the songs lyrics_by_song is done with, so that a run that gets interrupted (crash, Ctrl-C,
+worker dyno restart ...) picks up where it stopped rather than scraping hours worth of lyrics all over again.
+
+Every song (i.e every row of the tracks csv) gets one line of json as soon as it's processed, flushed all the way
+to disk, along with what became of it (see corpusgenius.song_outcome). Songs that timed out or failed are journaled
+too, and are the only ones fetched again on the next run.
+
+The first line of the journal records who the run was for (artist and band members). A journal left behind by a
+run for someone else, or with other band members, is not resumed from but started over, since the outcomes would
+differ.
+"""
+
+import json
+import os
+
+# outcomes worth trying again on the next run
+RETRY = {"timeout", "failed"}
+
+
+class LyricsJournal:
+    """
+:param path: file the journal is kept in
+:type path: str
+:param artist_name: artist the run is for
+:type artist_name: str
+:param band_members: band members the run is for (None if not a band)
+:type band_members: set or None
+
+Example : journal = LyricsJournal("Dylan_lyrics.journal", "Bob Dylan", None)
+          for record in journal.replay():
+              ... # songs processed by an earlier run
+          for line in csv.DictReader(data):
+              if journal.key(line) not in journal.done:
+                  ... # process the song
+                  journal.record(line, outcome)
+          journal.close()
+"""
+
+    def __init__(self, path, artist_name, band_members=None):
+        self.path = path
+        self.header = {"artist": artist_name,
+                       "band_members": sorted(band_members) if band_members is not None else None}
+        self.done = set()  # keys of songs that won't be fetched again (records stay on disk, see replay)
+        self.outstanding = set()  # keys of songs that timed out / failed (last time they were tried)
+        self.resumed = self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        if not self.resumed:
+            self._write(self.header)
+
+    @staticmethod
+    def key(line):
+        """
+:param line: row of the tracks csv
+:type line: dict
+:return: what identifies a song in the journal, i.e its id along with the album, year and title it's listed with
+:rtype: str
+"""
+        return "\t".join(line[column].strip() for column in ("song id", "album title", "year", "song title"))
+
+    def _load(self):
+        # reads back an earlier journal, returns True if there's anything to resume from.
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as journal:
+            try:
+                header = json.loads(next(journal))
+            except (StopIteration, ValueError):
+                header = None
+            if header == self.header:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # last line is cut short if the run was killed mid-write
+                        continue
+                    if record["status"] in RETRY:
+                        self.outstanding.add(record["key"])
+                    else:
+                        self.outstanding.discard(record["key"])
+                        self.done.add(record["key"])
+        if header != self.header:
+            print(f"{self.path} was left behind by a run for {header}, starting over.")
+            os.remove(self.path)
+            return False
+        return True
+
+    def replay(self):
+        """
+:return: records of the songs an earlier run is done with, in the order they were processed. Read back from the
+journal one at a time rather than kept around.
+:rtype: iterator of dict
+"""
+        done = set(self.done)
+        with open(self.path, encoding="utf-8") as journal:
+            next(journal)  # header
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record["status"] not in RETRY and record["key"] in done:
+                    done.discard(record["key"])
+                    yield record
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, line, outcome):
+        """
+journals the outcome of a song.
+:param line: row of the tracks csv the song comes from
+:type line: dict
+:param outcome: what became of it, see corpusgenius.song_outcome
+:type outcome: dict
+:return: the journaled record, i.e the outcome along with the song's key, title, album and year
+:rtype: dict
+"""
+        record = dict(outcome, key=self.key(line), title=line["song title"].strip(),
+                      album=line["album title"].strip(), year=line["year"].strip())
+        self._write(record)
+        if record["status"] in RETRY:
+            self.outstanding.add(record["key"])
+        else:
+            self.outstanding.discard(record["key"])
+            self.done.add(record["key"])
+        return record
+
+    def close(self):
+        """
+closes the journal. Once every song made it through, the journal is of no use anymore and is removed,
+otherwise it stays around for the next run to retry the songs that didn't.
+:return: number of songs left to retry
+:rtype: int
+"""
+        self._file.close()
+        if not self.outstanding:
+            os.remove(self.path)
+        return len(self.outstanding)
@@ -0,0 +1,122 @@
+"""
+File : lyrics_normalizer.py
+
+Lyrics as they go in the CSV files & the corpus : on a single line, transliterated to ascii, without apostrophes.
+
+Nothing to it for a song or two, but unidecode over tens of thousands of lyrics (say reclassify, or a run replayed
+from the cache) keeps a core busy while the rest waits. Lyrics are then normalized in batches by a pool of processes,
+as a stage of its own between fetching songs and sorting them out, rather than one by one in the fetching loop.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from unidecode import unidecode
+
+NEWLINES = str.maketrans("\n", " ")
+APOSTROPHES = str.maketrans("", "", "'")
+
+
+class LyricsNormalizer:
+    """
+:param line_breaks: keep the line breaks of the lyrics rather than putting them on a single line
+:type line_breaks: bool
+
+Example : normalize = LyricsNormalizer()
+          normalize("I’ve stepped in the middle\\nof seven sad forests")   # 'Ive stepped in the middle of ...'
+
+The default is exactly what CorpusGenius always did, i.e replace("\\n", " "), unidecode, strip, replace("'", "").
+Any other callable taking the raw lyrics and returning them normalized can take its place (a module level function or
+a picklable object, to get through to the processes).
+"""
+
+    def __init__(self, line_breaks=False):
+        self.line_breaks = line_breaks
+
+    def __call__(self, raw_lyrics):
+        lyrics = raw_lyrics if self.line_breaks else raw_lyrics.translate(NEWLINES)
+        # unidecode leaves ascii as it is, most lyrics don't need it at all
+        if not lyrics.isascii():
+            lyrics = unidecode(lyrics)
+        return lyrics.strip().translate(APOSTROPHES)
+
+
+def normalize_batch(normalizer, batch):
+    # what each process of the pool runs, a whole batch at a time (None for nothing to normalize)
+    return [normalizer(raw_lyrics) if raw_lyrics is not None else None for raw_lyrics in batch]
+
+
+class NormalizationStage:
+    """
+:param normalizer: see LyricsNormalizer
+:type normalizer: callable
+:param processes: number of processes lyrics are normalized by. 1 normalizes them right away, in this process.
+:type processes: int
+:param batch_size: number of lyrics sent to a process at once
+:type batch_size: int
+:param pool: processes shared with other stages (e.g one per artist, see corpus_batch) rather than a pool of its own
+:type pool: concurrent.futures.ProcessPoolExecutor or None
+
+Example : stage = NormalizationStage(LyricsNormalizer(), processes=4)
+          for song in songs:
+              for song, lyrics in stage.put(song, song.raw_lyrics):
+                  ... # in the very order they were put
+          for song, lyrics in stage.drain():
+              ...
+          stage.close()
+
+Items come out in the order they went in, whatever the process that got to them first. Items with nothing to
+normalize (None) go through as well, so that they keep their place.
+"""
+
+    def __init__(self, normalizer, processes=1, batch_size=64, pool=None):
+        self.normalizer = normalizer
+        self.batch_size = batch_size
+        self._own_pool = pool is None
+        if pool is None and processes > 1:
+            pool = ProcessPoolExecutor(processes)
+        self._pool = pool
+        self._processes = processes
+        self._batch = []
+        self._in_flight = deque()
+
+    def put(self, item, raw_lyrics):
+        """
+:return: items done with so far (maybe none, maybe a few), as (item, normalized lyrics or None)
+:rtype: list of tuple
+"""
+        if self._pool is None:
+            return [(item, self.normalizer(raw_lyrics) if raw_lyrics is not None else None)]
+        self._batch.append((item, raw_lyrics))
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+        done = []
+        # a few batches ahead for every process, then wait for the oldest
+        while self._in_flight and (self._in_flight[0][1].done() or len(self._in_flight) > 2 * self._processes):
+            done.extend(self._take())
+        return done
+
+    def drain(self):
+        """
+:return: every item not done with yet, once normalized
+:rtype: list of tuple
+"""
+        if self._batch:
+            self._submit()
+        done = []
+        while self._in_flight:
+            done.extend(self._take())
+        return done
+
+    def _submit(self):
+        items, batch = zip(*self._batch)
+        self._in_flight.append((items, self._pool.submit(normalize_batch, self.normalizer, batch)))
+        self._batch = []
+
+    def _take(self):
+        items, future = self._in_flight.popleft()
+        return list(zip(items, future.result()))
+
+    def close(self):
+        if self._pool is not None and self._own_pool:
+            self._pool.shutdown()
@@ -0,0 +1,320 @@
+"""
+File : lyrics_page.py
+
+Lyrics out of the html of a lyrics page of genius.com.
+
+lyricsgenius parses the whole page with BeautifulSoup (a few hundred KB of html, scripts and all, turned into a tree
+of Python objects) only to look up the lyrics div and get its text. Once pages come from the cache rather than over
+the network, that is where most of the time per song goes. extract_lyrics skips all of it : it goes straight to the
+lyrics div and collects its text in a single scan of just that div, i.e what get_text() would have given, then strips
+the section headers off it the very same way lyricsgenius does.
+
+Its output is meant to be exactly the same as BeautifulSoup's (see soup_lyrics), hence anything it isn't sure to get
+the same way (a script / textarea / CDATA section in the lyrics, an entity BeautifulSoup would read some other way,
+tags that don't add up ...) is left to BeautifulSoup : extract_lyrics returns UNHANDLED, and page_lyrics falls back
+on soup_lyrics for that page.
+
+python lyrics_page.py checks it gives the same lyrics as BeautifulSoup for every page of the stand-in of mock_genius
+(and a few odd ones), then times both, e.g -->
+
+    python lyrics_page.py --songs 500 --repeat 3
+"""
+
+import argparse
+import html
+import random
+import re
+import time
+from html.entities import name2codepoint
+
+from bs4 import BeautifulSoup
+
+# what extract_lyrics returns for a page it leaves to BeautifulSoup (see module doc.)
+UNHANDLED = object()
+
+DIV = re.compile(r"<div(?=[\s/>])((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>", re.I)
+ATTRIBUTE = re.compile(r"([^\s/>=][^\s/>=]*)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]*))?")
+# a tag (name, attributes), a comment, or anything else starting with <! or <?
+MARKUP = re.compile(r"<(?:(/?)([a-zA-Z][^\t\n\r\f />\x00]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>|!--.*?-->|[!?])", re.S)
+UNQUOTED_SLASH = re.compile(r"=\s*[^\s\"'>]*/$")
+ENTITY = re.compile(r"&(?:#([0-9]+|[xX][0-9a-fA-F]+)|([a-zA-Z][a-zA-Z0-9]*));")
+# elements whose text isn't parsed (or kept) as is by html.parser / BeautifulSoup
+RAW_TEXT = {"script", "style", "textarea", "title", "pre", "template", "xmp", "iframe", "noembed", "noframes",
+            "noscript", "plaintext", "listing"}
+RAW_OPEN = re.compile(r"<(/?)(" + "|".join(sorted(RAW_TEXT)) + r")(?=[\s/>])", re.I)
+# void elements, as BeautifulSoup has them
+VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param",
+        "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer"}
+ASCII_SPACES = " \n\t\x0c\r"
+SECTION_HEADERS = re.compile(r"(\[.*?\])*")
+VERSE_GAPS = re.compile("\n{2}")
+
+
+def soup_lyrics(page, remove_section_headers=True):
+    """
+:param page: html of a lyrics page
+:type page: str
+:param remove_section_headers: strip [Verse], [Chorus] etc. off the lyrics
+:type remove_section_headers: bool
+:return: the lyrics, the way lyricsgenius scrapes them (BeautifulSoup), None if there's no lyrics div on the page
+:rtype: str or None
+"""
+    soup = BeautifulSoup(page, "html.parser")
+
+    # Determine the class of the div
+    old_div = soup.find("div", class_="lyrics")
+    if old_div:
+        lyrics = old_div.get_text()
+    else:
+        new_div = soup.find("div", class_=re.compile("Lyrics__Root"))
+        if not new_div:
+            return None
+        lyrics = new_div.get_text('\n').replace('\n[', '\n\n[')
+    return strip_headers(lyrics) if remove_section_headers else lyrics.strip("\n")
+
+
+def strip_headers(lyrics):
+    # Remove [Verse], [Bridge], etc. and the gaps between verses, as lyricsgenius does
+    return VERSE_GAPS.sub("\n", SECTION_HEADERS.sub("", lyrics)).strip("\n")
+
+
+def classes(attributes):
+    """
+:param attributes: attributes of a start tag, as the html has them
+:type attributes: str
+:return: its class attribute (the last one, if there are several) and the classes in it, None if there's none
+:rtype: tuple or None
+"""
+    value = None
+    for name, quoted in ATTRIBUTE.findall(attributes):
+        if name.lower() == "class":
+            value = quoted[1:-1] if quoted[:1] in ("'", '"') else quoted
+    if value is None:
+        return None
+    value = html.unescape(value)
+    return value, value.split()
+
+
+def lyrics_div(page):
+    """
+:return: where the lyrics div starts on the page (right after its start tag), and whether it's the old div.lyrics
+rather than the div.Lyrics__Root-... of current pages. None if there's none, UNHANDLED if it may be in a comment or
+a script rather than in the page.
+:rtype: tuple, None or UNHANDLED
+"""
+    found = None
+    for div in DIV.finditer(page):
+        attributes = div.group(1)
+        if "yrics" not in attributes:
+            continue
+        class_attribute = classes(attributes.rstrip("/"))
+        if class_attribute is None:
+            continue
+        value, names = class_attribute
+        if value == "lyrics" or "lyrics" in names:
+            found = div, True
+            break
+        if found is None and "Lyrics__Root" in value:
+            found = div, False
+    if found is None:
+        return None
+    div, old = found
+    # the first div BeautifulSoup would find, unless it's actually commented out or in a script
+    before = page[:div.start()]
+    if before.rfind("<!--") > before.rfind("-->"):
+        return UNHANDLED
+    raw = None
+    for raw in RAW_OPEN.finditer(before):
+        pass
+    if (raw is not None and not raw.group(1)) or div.group(1).endswith("/"):
+        return UNHANDLED
+    return div.end(), old
+
+
+def text_of(data):
+    """
+:return: a string of the lyrics div as BeautifulSoup has it (entities unescaped, whitespace only strings down to a
+single space or line break), UNHANDLED if BeautifulSoup may not read it the same way
+:rtype: str or UNHANDLED
+"""
+    if "<" in data:
+        return UNHANDLED
+    if "&" in data:
+        entities = ENTITY.findall(data)
+        if len(entities) != data.count("&"):
+            return UNHANDLED
+        for number, name in entities:
+            if name:
+                if name not in name2codepoint:
+                    return UNHANDLED
+                continue
+            code = int(number[1:], 16) if number[:1] in "xX" else int(number)
+            if not code or 0x80 <= code <= 0x9f or code > 0x10ffff or html.unescape(f"&#{number};") != chr(code):
+                return UNHANDLED
+        data = html.unescape(data)
+    if not data.strip(ASCII_SPACES):
+        return "\n" if "\n" in data else " "
+    return data
+
+
+def extract_lyrics(page, remove_section_headers=True):
+    """
+:param page: html of a lyrics page
+:type page: str
+:param remove_section_headers: strip [Verse], [Chorus] etc. off the lyrics
+:type remove_section_headers: bool
+:return: the very same lyrics as soup_lyrics, None if there's no lyrics div on the page, UNHANDLED if the page is best
+left to soup_lyrics (see module doc.)
+:rtype: str, None or UNHANDLED
+"""
+    start = lyrics_div(page)
+    if start is None or start is UNHANDLED:
+        return start
+    position, old = start
+    strings = []
+    # tags open in the div, the div itself first
+    open_tags = ["div"]
+    for markup in MARKUP.finditer(page, position):
+        if markup.start() > position:
+            data = text_of(page[position:markup.start()])
+            if data is UNHANDLED:
+                return UNHANDLED
+            strings.append(data)
+        position = markup.end()
+        end_tag, name, attributes = markup.groups()
+        if name is None:
+            if not markup.group().startswith("<!--"):
+                # CDATA, doctype, processing instruction ...
+                return UNHANDLED
+            continue
+        name = name.lower()
+        if name in RAW_TEXT:
+            return UNHANDLED
+        if not end_tag:
+            if UNQUOTED_SLASH.search(attributes):
+                # <a href=/b/> isn't a self closing tag to html.parser, but then who knows
+                return UNHANDLED
+            if name not in VOID and not attributes.endswith("/"):
+                open_tags.append(name)
+            continue
+        if name in VOID or name not in open_tags:
+            # closes nothing, or something the div is in (BeautifulSoup then closes the div along with it)
+            return UNHANDLED
+        del open_tags[len(open_tags) - 1 - open_tags[::-1].index(name):]
+        if not open_tags:
+            break
+    else:
+        # the div never ends
+        return UNHANDLED
+
+    if old:
+        lyrics = "".join(strings)
+    else:
+        lyrics = "\n".join(strings).replace('\n[', '\n\n[')
+    return strip_headers(lyrics) if remove_section_headers else lyrics.strip("\n")
+
+
+def page_lyrics(page, remove_section_headers=True):
+    """
+:return: the lyrics on a page (see extract_lyrics), by BeautifulSoup if extract_lyrics leaves it to it, and whether
+it did
+:rtype: tuple
+"""
+    lyrics = extract_lyrics(page, remove_section_headers)
+    if lyrics is UNHANDLED:
+        return soup_lyrics(page, remove_section_headers), True
+    return lyrics, False
+
+
+def odd_pages(number=200, seed=1):
+    """
+:return: pages the stand-in of mock_genius doesn't serve : the old div.lyrics, entities, inline tags, comments,
+nested divs, no lyrics at all, and random html in the lyrics div (for extract_lyrics to get right or leave to
+BeautifulSoup)
+:rtype: list of str
+"""
+    pages = [
+        '<html><body><div class="song_body"><div class="lyrics">\n<p>[Verse 1]<br>Hey Mr. Tambourine Man<br>'
+        'play a song &amp; for me</p>\n<!--sse--></div></div></body></html>',
+        '<div class="Lyrics__Root-sc-1 x"><div class="Lyrics__Container-sc-2">[Intro]<br/>Oh&#x27;<i>la</i> la'
+        '<br/><br/>[Chorus: Bob Dylan &amp; Joan Baez]<br/><b>How many</b> roads &quot;must&quot;&#8217;<br/>\n'
+        '  <br/>a&nbsp;man<a href="/x" data-x=\'a>b\'>walk</a></div><div class="RightSidebar"> </div></div>',
+        '<DIV CLASS=Lyrics__Root>A<BR>B<p>C</DIV>after',
+        '<div class="lyricsplus">no</div><p>no lyrics here</p>',
+        '<!-- <div class="lyrics">commented</div> --><div class="Lyrics__Root">[Verse]<br/>yes</div>',
+        '<script>var d = \'<div class="lyrics">\';</script><div class="Lyrics__Root">yes</div>',
+        '<div class="Lyrics__Root">A<script>x</script>B</div>',
+        '<div class="Lyrics__Root">A &apos; &foo; &amp B&#150;</div>',
+        '<div class="Lyrics__Root">A<![CDATA[B]]>C</div>',
+        '<main><div class="Lyrics__Root">A<span>B</main>C</div>',
+        '<div class="Lyrics__Root">unclosed',
+        '<div class="a" class="Lyrics__Root">last class attribute wins</div>',
+    ]
+    rand = random.Random(seed)
+    pieces = ["[Verse 1]", "[Chorus]", "[", "]", "la la", " ", "\n", "  \n ", "&amp;", "&#x27;", "&#39;", "&lt;",
+              "&nbsp;", "Don&#x27;t", "é", "<br/>", "<br>", "<i>", "</i>", "<b>", "</b>", "<span class='x'>",
+              "</span>", "<div>", "</div>", "<div class=\"Lyrics__Container\">", "<!-- c -->", "<p>", "</p>",
+              "<a href=\"/a?b=1&amp;c=2\">", "</a>", "<img src=x>", "\t", "Mr. Tambourine Man", "(Ooh)"]
+    for _ in range(number):
+        body = "".join(rand.choice(pieces) for _ in range(rand.randint(1, 60)))
+        pages.append(f'<html><body><h1>Song</h1><div class="Lyrics__Root-sc-1 abc">{body}</div>'
+                     f'<div class="footer">footer</div></body></html>')
+    return pages
+
+
+def check(pages):
+    """
+:return: pages extract_lyrics doesn't get the same lyrics of as BeautifulSoup (headers stripped or not), and the
+number of pages it left to BeautifulSoup
+:rtype: list of str, int
+"""
+    different, unhandled = [], 0
+    for page in pages:
+        for remove_section_headers in (True, False):
+            lyrics = extract_lyrics(page, remove_section_headers)
+            if lyrics is UNHANDLED:
+                unhandled += remove_section_headers
+            elif lyrics != soup_lyrics(page, remove_section_headers):
+                different.append(page)
+                break
+    return different, unhandled
+
+
+def pages_per_second(parse, pages, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    import mock_genius
+
+    parser = argparse.ArgumentParser(
+        description="Check extract_lyrics against BeautifulSoup on the pages of mock_genius, then time both")
+    parser.add_argument("--songs", type=int, default=None,
+                        help="number of songs of 'Sample Corpus' to take the pages of (default: all of them)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of times every page is parsed when timing (default: 3)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed of the random html of the odd pages (default: 1)")
+    args = parser.parse_args()
+
+    catalog = mock_genius.Catalog(songs=args.songs)
+    pages = [page for page in map(catalog.page, catalog.pages) if page is not None]
+    odd = odd_pages(seed=args.seed)
+    print(f"\n{len(pages)} lyrics pages of 'Sample Corpus' ({sum(map(len, pages)) / len(pages) / 1024:.0f} KB on "
+          f"average) and {len(odd)} odd ones")
+    different, unhandled = check(pages + odd)
+    print(f"Same lyrics as BeautifulSoup : {len(pages) + len(odd) - len(different)} of {len(pages) + len(odd)} pages "
+          f"({unhandled} of them left to BeautifulSoup)")
+    for page in different[:5]:
+        print(f"\n  differs on : {page[:300]!r}")
+
+    soup = pages_per_second(soup_lyrics, pages, args.repeat)
+    fast = pages_per_second(extract_lyrics, pages, args.repeat)
+    print(f"\n{'parser':<16}{'pages/s':>10}\n{'BeautifulSoup':<16}{soup:>10.1f}\n{'extract_lyrics':<16}{fast:>10.1f}"
+          f"\n\n{fast / soup:.1f} times as fast")
+    if different:
+        raise SystemExit(1)
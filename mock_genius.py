@@ -0,0 +1,579 @@
+"""
+File : mock_genius.py
+
+A stand-in for genius.com on localhost, serving the artists of 'Sample Corpus' (Bob Dylan & The Beatles) : their
+albums, tracks, songs (with writers) and lyrics pages, the way the API & genius.com have them. For benchmarks (see
+benchmark.py) and for trying things out, without a token, a quota or a network.
+
+It answers for all three of api.genius.com (the API), genius.com/api (the public API) and genius.com (lyrics pages),
+telling them apart by the Host header, so nothing in CorpusGenius needs changing : route() mounts an adapter on the
+client's session that sends everything meant for genius.com to the stand-in instead, urls and all left as they are.
+
+What genius.com is like on a bad day is up to the options : latency (and jitter) of every answer, a share of answers
+that are server errors (5xx) or throttled (429 along with a Retry-After), and a request budget per second beyond
+which everything is throttled, just like the quota. Random draws are seeded, a run can be replayed as is.
+
+Example : python mock_genius.py --port 8000 --latency 0.05 --errors 0.01 --throttle 0.02 --rate-limit 20
+
+          process, address = start(latency=0.05)    # in a process of its own, see start
+          route(genius._session, address)
+          genius.search_song("Desolation Row", "Bob Dylan")     # served by the stand-in
+"""
+
+import argparse
+import ast
+import csv
+import json
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from requests.adapters import HTTPAdapter
+from unidecode import unidecode
+
+from title_matcher import TitleMatcher
+
+SAMPLE_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Sample Corpus")
+
+# the artists of 'Sample Corpus', by name, along with the genius ids they have on genius.com. Original songs are
+# credited to 'writers', band_members is what one would answer corpusgenius with.
+ARTISTS = {
+    "Bob Dylan": {"id": 181, "files": "Dylan", "writers": ["Bob Dylan"], "band_members": None},
+    "The Beatles": {"id": 586, "files": "Beatles", "writers": ["John Lennon", "Paul McCartney"],
+                    "band_members": ["John Lennon", "Paul McCartney", "George Harrison", "Ringo Starr",
+                                     "Lennon-McCartney"]},
+}
+
+PUBLIC_HOST = "genius.com"
+API_HOST = "api.genius.com"
+
+# the CSV files of 'Sample Corpus' have the lyrics on a single line (verses apart by two spaces), pages have them
+# back on lines of their own : a new line starts at every capitalized word (but I, Im, Id & co.) following the end
+# of a word.
+LINE_BREAKS = re.compile(r"(?<=[a-z,.!?)]) (?=[A-Z](?![a-z]?\b))")
+SLUG = re.compile(r"[^a-z0-9]+")
+
+
+def slug(text):
+    """
+:return: text the way genius.com has it in urls, e.g "Bob-dylan-desolation-row-lyrics"
+:rtype: str
+"""
+    return SLUG.sub("-", unidecode(text).lower()).strip("-").capitalize()
+
+
+def csv_file(directory, name):
+    # beatles_albums.csv vs Dylan_albums.csv, 'Sample Corpus' isn't consistent about case
+    for file_name in os.listdir(directory):
+        if file_name.lower() == name.lower():
+            return os.path.join(directory, file_name)
+    raise FileNotFoundError(os.path.join(directory, name))
+
+
+class Catalog:
+    """
+:param directory: where the CSV files of the artists are, i.e 'Sample Corpus'
+:type directory: str
+:param artists: artists to serve, see ARTISTS
+:type artists: dict
+:param songs: number of songs served per artist (the first ones by title), all of them if None
+:type songs: int or None
+:param page_size: about how big a lyrics page is, in KB. genius.com pages are hundreds of KB, mostly scripts and
+markup around the lyrics, which is what scraping them mostly comes down to.
+:type page_size: int
+
+Everything genius.com would answer, as plain data : albums and their tracks out of [Artist]_albums.csv &
+[Artist]_tracks.csv, the lyrics of original songs out of [Artist]_lyrics.csv, and the writers of the other ones
+out of songs_not_by_[Artist].csv. Songs in none of them have no lyrics (their pages are 404), songs listed with
+writers 'N/A' have no writers at all.
+"""
+
+    def __init__(self, directory=SAMPLE_CORPUS, artists=None, songs=None, page_size=100):
+        self.artists = {}
+        self.songs = {}
+        self.albums = {}
+        self.artist_albums = {}
+        self.album_tracks = {}
+        self.artist_songs = {}
+        self.pages = {}
+        self.matcher = TitleMatcher()
+        self._titles = {}
+        self._padding = self._chrome(page_size * 1024)
+        for name, artist in (ARTISTS if artists is None else artists).items():
+            self._load(directory, name, artist, songs)
+
+    def _load(self, directory, name, artist, limit):
+        files = artist["files"]
+        artist_info = {"id": artist["id"], "name": name, "api_path": f"/artists/{artist['id']}",
+                       "url": f"https://genius.com/artists/{slug(name)}", "image_url": None}
+        self.artists[artist["id"]] = artist_info
+
+        with open(csv_file(directory, files + "_lyrics.csv"), encoding="utf-8") as data:
+            lyrics = {}
+            for line in csv.DictReader(data):
+                versions = ast.literal_eval(line["lyrics"])
+                lyrics[line[""]] = sorted(versions)[0] if versions else ""
+        with open(csv_file(directory, "songs_not_by_" + files + ".csv"), encoding="utf-8") as data:
+            writers = {}
+            for line in csv.DictReader(data):
+                # ['album', {'writer', ...}] or ['N/A', 'N/A', ['N/A']] for no writers at all
+                found = ast.literal_eval(line["0"])[-1]
+                writers[line[""]] = sorted(found) if isinstance(found, set) else []
+        with open(csv_file(directory, files + "_albums.csv"), encoding="utf-8") as data:
+            albums = list(csv.DictReader(data))
+        with open(csv_file(directory, files + "_tracks.csv"), encoding="utf-8") as data:
+            tracks = list(csv.DictReader(data))
+
+        titles = {}
+        for track in tracks:
+            titles.setdefault(int(track["song id"]), track["song title"])
+        kept = sorted(titles, key=lambda song_id: (titles[song_id], song_id))[:limit]
+        self.artist_songs[artist["id"]] = kept
+        for song_id in kept:
+            title = titles[song_id]
+            if title in lyrics:
+                text, credits = lyrics[title], artist["writers"]
+            elif title in writers:
+                # lyrics of songs not by the artist aren't in 'Sample Corpus', any will do
+                text, credits = "Oh la la la, la la la  Oh la la la", writers[title]
+            else:
+                text, credits = None, []
+            self._add_song(song_id, title, artist_info, text, credits)
+
+        by_title = {}
+        for album in albums:
+            album_id = int(album["album id"])
+            by_title[album["album title"]] = album_id
+            year = None if album["year"] == "N/A" else {"year": int(album["year"]), "month": None, "day": None}
+            self.albums[album_id] = {"id": album_id, "name": album["album title"], "release_date_components": year,
+                                     "api_path": f"/albums/{album_id}", "artist": artist_info,
+                                     "url": f"https://genius.com/albums/{slug(name)}/{slug(album['album title'])}"}
+            self.album_tracks[album_id] = []
+        self.artist_albums[artist["id"]] = list(by_title.values())
+        for track in tracks:
+            song_id = int(track["song id"])
+            if track["album title"] in by_title and song_id in self.songs:
+                album_id = by_title[track["album title"]]
+                self.album_tracks[album_id].append(song_id)
+                self.songs[song_id].setdefault("album", self.albums[album_id])
+
+    def _add_song(self, song_id, title, artist_info, text, writers):
+        path = f"/{slug(artist_info['name'] + ' ' + title)}-lyrics"
+        if path in self.pages:
+            path = f"/{slug(artist_info['name'] + ' ' + title)}-{song_id}-lyrics"
+        # a made up, steady, date of the last edit, see corpusgenius.song_version
+        updated_at = 1500000000 + zlib.crc32(f"{song_id}".encode("utf-8")) % 100000000
+        self.songs[song_id] = {
+            "id": song_id, "title": title, "full_title": f"{title} by {artist_info['name']}",
+            "api_path": f"/songs/{song_id}", "path": path, "url": "https://genius.com" + path,
+            "lyrics_state": "complete" if text is not None else "unreleased",
+            "lyrics_updated_at": updated_at, "updated_by_human_at": updated_at,
+            "primary_artist": artist_info,
+            "writer_artists": [{"id": zlib.crc32(writer.encode("utf-8")), "name": writer} for writer in writers],
+            "lyrics": text}
+        self.pages[path] = song_id
+        self._titles.setdefault(title.lower(), []).append(song_id)
+        self.matcher.add([title])
+
+    @staticmethod
+    def _chrome(size):
+        # markup and scripts of a page, around the lyrics : about size bytes of it, half before and half after
+        link = ('<li class="PageHeaderMenu__Item"><a href="https://genius.com/tags/rock/all" '
+                'class="PageHeaderMenu__Link-sc-ek4uuu-0 bNKDsJ">Rock</a></li>\n')
+        state = ('<script type="text/javascript">window.__PRELOADED_STATE__ = JSON.parse(\'{\\"songPage\\":'
+                 '{\\"pinnedQuestions\\":[],\\"trackingData\\":[{\\"key\\":\\"Tag\\",\\"value\\":\\"rock\\"}]}}\')'
+                 ';</script>\n')
+        half = max(size // 2, 0)
+        return link * (half // len(link)), state * (half // len(state))
+
+    def page(self, path):
+        """
+:return: html of the lyrics page at path, the way genius.com has it (section headers & all), None if there's no
+such page (or no lyrics on it)
+:rtype: str or None
+"""
+        song_id = self.pages.get(path)
+        if song_id is None or self.songs[song_id]["lyrics"] is None:
+            return None
+        song = self.songs[song_id]
+        verses = []
+        for number, verse in enumerate(song["lyrics"].split("  "), start=1):
+            lines = [escape(line) for line in LINE_BREAKS.split(verse) if line]
+            verses.append(f"[Verse {number}]<br/>" + "<br/>".join(lines))
+        before, after = self._padding
+        return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"/><title>{escape(song["full_title"])} | '
+                f'Genius Lyrics</title></head>\n<body><ul class="PageHeaderMenu">\n{before}</ul>\n'
+                f'<main><h1 class="SongHeader__Title">{escape(song["title"])}</h1>\n'
+                f'<div id="lyrics-root" class="Lyrics__Root-sc-1ynbvzw-1 kkHBOZ">'
+                f'<div data-lyrics-container="true" class="Lyrics__Container-sc-1ynbvzw-6 YYrds">'
+                f'{"<br/><br/>".join(verses)}</div></div></main>\n{after}</body></html>\n')
+
+    def song(self, song_id):
+        """
+:return: the song, as songs/{id} has it
+:rtype: dict or None
+"""
+        song = self.songs.get(song_id)
+        if song is None:
+            return None
+        song = {key: value for key, value in song.items() if key != "lyrics"}
+        song.setdefault("album", None)
+        song["release_date_components"] = song["album"]["release_date_components"] if song["album"] else None
+        return song
+
+    def listed(self, song_id):
+        # a song the way lists and search results have it, i.e without writers & album
+        return {key: value for key, value in self.songs[song_id].items()
+                if key not in ("lyrics", "writer_artists", "album")}
+
+    def search(self, query):
+        """
+:return: search/multi's sections for query, i.e "[title] [artist]" or "[artist]". Songs titled just so come
+first, then songs with a similar title (see title_matcher), the way genius.com comes up with the next best thing.
+:rtype: list of dict
+"""
+        query = query.strip()
+        artist_hits = [{"type": "artist", "index": "artist", "result": artist}
+                       for artist in self.artists.values() if artist["name"].lower() == query.lower()]
+        title, artist_id = query, None
+        for artist in self.artists.values():
+            if query.lower().endswith(" " + artist["name"].lower()):
+                title, artist_id = query[:-len(artist["name"]) - 1], artist["id"]
+        found = list(self._titles.get(title.lower(), []))
+        for similar, _ in self.matcher.resolve(title):
+            found.extend(song_id for song_id in self._titles[similar.lower()] if song_id not in found)
+        song_hits = [{"type": "song", "index": "song", "result": self.listed(song_id)} for song_id in found
+                     if artist_id is None or self.songs[song_id]["primary_artist"]["id"] == artist_id][:5]
+        top_hit = (artist_hits or song_hits)[:1]
+        return [{"type": "top_hit", "hits": top_hit}, {"type": "song", "hits": song_hits},
+                {"type": "lyric", "hits": []}, {"type": "artist", "hits": artist_hits},
+                {"type": "album", "hits": []}]
+
+
+def paginated(entries, params, key):
+    # a page of entries, the way every list of the API is split in pages
+    per_page = min(int(params.get("per_page") or 20), 50)
+    page = int(params.get("page") or 1)
+    start = (page - 1) * per_page
+    return {key: entries[start:start + per_page], "next_page": page + 1 if start + per_page < len(entries) else None}
+
+
+class MockGenius(ThreadingHTTPServer):
+    """
+:param address: (host, port) to listen on, port 0 for any free one
+:type address: tuple
+:param catalog: what to serve
+:type catalog: Catalog
+:param latency: seconds every answer takes, at least
+:type latency: float
+:param jitter: up to that many seconds more, at random
+:type jitter: float
+:param errors: share of requests answered with a server error (500, 502 or 503)
+:type errors: float
+:param throttle: share of requests answered 429 (Too Many Requests)
+:type throttle: float
+:param rate_limit: requests per second taken at most, everything beyond is answered 429 (default: no limit)
+:type rate_limit: float or None
+:param retry_after: Retry-After (seconds) of 429 & 503 answers
+:type retry_after: int
+:param seed: seed of the random draws (jitter, errors, throttling)
+:type seed: int
+
+Every request is counted, by endpoint and by status, see stats (or GET /_mock/stats).
+"""
+
+    daemon_threads = True
+
+    def __init__(self, address, catalog, latency=0.0, jitter=0.0, errors=0.0, throttle=0.0, rate_limit=None,
+                 retry_after=1, seed=1, verbose=False):
+        super().__init__(address, MockGeniusHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = errors
+        self.throttle = throttle
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._endpoints = Counter()
+        self._statuses = Counter()
+        self._bytes = 0
+
+    def draw(self):
+        """
+:return: what to do with the next request : (seconds it takes, status to fail it with or None)
+:rtype: tuple
+"""
+        with self._lock:
+            now = time.monotonic()
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            chance = self._random.random()
+            if self.rate_limit:
+                while self._recent and now - self._recent[0] >= 1:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    return delay, 429
+                self._recent.append(now)
+            if chance < self.throttle:
+                return delay, 429
+            if chance < self.throttle + self.errors:
+                return delay, self._random.choice((500, 502, 503))
+            return delay, None
+
+    def count(self, endpoint, status, size):
+        with self._lock:
+            self._endpoints[endpoint] += 1
+            self._statuses[status] += 1
+            self._bytes += size
+
+    def stats(self):
+        """
+:return: requests so far, as {"requests": ..., "bytes": ..., "endpoints": {...}, "statuses": {...}}
+:rtype: dict
+"""
+        with self._lock:
+            return {"requests": sum(self._endpoints.values()), "bytes": self._bytes,
+                    "endpoints": dict(self._endpoints), "statuses": {str(status): number for status, number
+                                                                     in self._statuses.items()}}
+
+
+class MockGeniusHandler(BaseHTTPRequestHandler):
+    # keep-alive connections, just like genius.com
+    protocol_version = "HTTP/1.1"
+    server_version = "nginx"
+    sys_version = ""
+
+    ROUTES = (
+        (re.compile(r"/search/multi"), "search"),
+        (re.compile(r"/songs/(\d+)"), "song"),
+        (re.compile(r"/artists/(\d+)"), "artist"),
+        (re.compile(r"/artists/(\d+)/songs"), "artist_songs"),
+        (re.compile(r"/artists/(\d+)/albums"), "artist_albums"),
+        (re.compile(r"/albums/(\d+)"), "album"),
+        (re.compile(r"/albums/(\d+)/tracks"), "album_tracks"),
+    )
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/_mock/stats":
+            return self._send(200, "application/json", json.dumps(self.server.stats()))
+        host = self.headers.get("Host", "").split(":")[0]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if host == API_HOST:
+            api, path = True, url.path
+        elif url.path.startswith("/api/"):
+            api, path = True, url.path[len("/api"):]
+        else:
+            api, path = False, url.path
+        endpoint, match = "page", None
+        if api:
+            endpoint = "unknown"
+            for pattern, name in self.ROUTES:
+                match = pattern.fullmatch(path)
+                if match:
+                    endpoint = name
+                    break
+
+        delay, failure = self.server.draw()
+        if delay:
+            time.sleep(delay)
+        if failure is not None:
+            headers = {"Retry-After": str(self.server.retry_after)} if failure in (429, 503) else {}
+            return self._answer(endpoint, failure, None, headers)
+        if host == API_HOST and "authorization" not in self.headers:
+            return self._answer(endpoint, 401, None)
+        if not api:
+            page = self.server.catalog.page(path)
+            return self._send(404 if page is None else 200, "text/html; charset=utf-8",
+                              page or "<html><body>Oops! Page not found</body></html>", endpoint=endpoint)
+        found = getattr(self, "_" + endpoint, lambda *args: None)(params, *(match.groups() if match else ()))
+        return self._answer(endpoint, 404 if found is None else 200, found)
+
+    def _search(self, params):
+        return {"sections": self.server.catalog.search(params.get("q", ""))}
+
+    def _song(self, params, song_id):
+        song = self.server.catalog.song(int(song_id))
+        return {"song": song} if song is not None else None
+
+    def _artist(self, params, artist_id):
+        artist = self.server.catalog.artists.get(int(artist_id))
+        return {"artist": artist} if artist is not None else None
+
+    def _artist_songs(self, params, artist_id):
+        catalog = self.server.catalog
+        if int(artist_id) not in catalog.artists:
+            return None
+        songs = [catalog.listed(song_id) for song_id in catalog.artist_songs[int(artist_id)]]
+        if params.get("sort") != "title":
+            # popularity, well, something steady other than the title
+            songs.sort(key=lambda song: song["lyrics_updated_at"])
+        return paginated(songs, params, "songs")
+
+    def _artist_albums(self, params, artist_id):
+        catalog = self.server.catalog
+        if int(artist_id) not in catalog.artists:
+            return None
+        return paginated([catalog.albums[album_id] for album_id in catalog.artist_albums[int(artist_id)]], params,
+                         "albums")
+
+    def _album(self, params, album_id):
+        album = self.server.catalog.albums.get(int(album_id))
+        return {"album": album} if album is not None else None
+
+    def _album_tracks(self, params, album_id):
+        catalog = self.server.catalog
+        if int(album_id) not in catalog.albums:
+            return None
+        tracks = [{"number": number, "song": catalog.listed(song_id)}
+                  for number, song_id in enumerate(catalog.album_tracks[int(album_id)], start=1)]
+        return paginated(tracks, params, "tracks")
+
+    def _answer(self, endpoint, status, response, headers=None):
+        # the API's envelope, i.e {"meta": {"status": 200}, "response": {...}}
+        body = {"meta": {"status": status}}
+        if response is not None:
+            body["response"] = response
+        else:
+            body["meta"]["message"] = self.responses.get(status, ("Error",))[0]
+        content_type = "application/json; charset=utf-8"
+        if endpoint == "page" and status != 200:
+            content_type, body = "text/html; charset=utf-8", f"<html><body>{status}</body></html>"
+        else:
+            body = json.dumps(body)
+        self._send(status, content_type, body, headers, endpoint)
+
+    def _send(self, status, content_type, body, headers=None, endpoint=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if endpoint is not None:
+            self.server.count(endpoint, status, len(data))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class LocalAdapter(HTTPAdapter):
+    """
+sends requests meant for genius.com to address (e.g "http://127.0.0.1:8000") instead, Host header and all, see
+route.
+"""
+
+    def __init__(self, address, **kwargs):
+        self.address = address.rstrip("/")
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.headers["Host"] = url.netloc
+        request.url = self.address + url.path + (f"?{url.query}" if url.query else "")
+        return super().send(request, **kwargs)
+
+
+def route(session, address, connections=10):
+    """
+sends everything session has for genius.com (API, public API and lyrics pages) to the stand-in at address.
+:param session: e.g genius._session, for a genius_client.GeniusClient
+:type session: requests.Session
+:param address: of the stand-in, as start has it
+:type address: str
+:param connections: keep-alive connections to keep open (see GeniusClient.pool_size)
+:type connections: int
+"""
+    adapter = LocalAdapter(address, pool_connections=1, pool_maxsize=connections)
+    # more specific than "https://", hence taken over GeniusClient.pool_size's adapter
+    session.mount(f"https://{API_HOST}/", adapter)
+    session.mount(f"https://{PUBLIC_HOST}/", adapter)
+
+
+def serve(host="127.0.0.1", port=0, ready=None, songs=None, page_size=100, **options):
+    """
+runs the stand-in until killed. Keyword arguments are MockGenius', see its doc.
+:param ready: where to put the address the stand-in listens on, once it does
+:type ready: multiprocessing.Queue or None
+"""
+    server = MockGenius((host, port), Catalog(songs=songs, page_size=page_size), **options)
+    address = "http://%s:%d" % server.server_address[:2]
+    if ready is not None:
+        ready.put(address)
+    else:
+        print(f"Serving genius.com ({len(server.catalog.songs)} songs) at {address}, GET /_mock/stats for stats")
+    server.serve_forever()
+
+
+def start(**options):
+    """
+starts the stand-in in a process of its own, so that it doesn't compete for the GIL with whatever it is
+benchmarked against. Keyword arguments are serve's.
+:return: the process and the address the stand-in listens on (e.g "http://127.0.0.1:41235")
+:rtype: multiprocessing.Process, str
+"""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, kwargs=dict(options, ready=ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=120)
+
+
+def add_options(parser):
+    """
+adds the options of the stand-in (--latency, --errors ...) to parser, for benchmark to share.
+:type parser: argparse.ArgumentParser
+"""
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds every answer takes, at least (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="up to that many seconds more, at random (default: 0)")
+    parser.add_argument("--errors", type=float, default=0.0,
+                        help="share of requests answered with a server error, e.g 0.01 (default: 0)")
+    parser.add_argument("--throttle", type=float, default=0.0,
+                        help="share of requests answered 429, e.g 0.02 (default: 0)")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="requests per second taken at most, the rest is answered 429 (default: no limit)")
+    parser.add_argument("--retry-after", type=int, default=1,
+                        help="Retry-After of 429/503 answers, in seconds (default: 1)")
+    parser.add_argument("--songs", type=int, default=None,
+                        help="number of songs served per artist, the first ones by title (default: all)")
+    parser.add_argument("--page-size", type=int, default=100,
+                        help="about how big a lyrics page is, in KB (default: 100)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed of the random draws (default: 1)")
+
+
+def server_options(options):
+    """
+:param options: parsed options (see add_options)
+:type options: argparse.Namespace
+:return: options as keyword arguments of serve / start
+:rtype: dict
+"""
+    return {"latency": options.latency, "jitter": options.jitter, "errors": options.errors,
+            "throttle": options.throttle, "rate_limit": options.rate_limit, "retry_after": options.retry_after,
+            "songs": options.songs, "page_size": options.page_size, "seed": options.seed}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the artists of 'Sample Corpus' the way genius.com would")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    add_options(parser)
+    args = parser.parse_args()
+    serve(args.host, args.port, verbose=args.verbose, **server_options(args))
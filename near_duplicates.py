@@ -0,0 +1,170 @@
+"""
+File : near_duplicates.py
+
+Near-duplicate lyrics, i.e the live / demo / bootleg / remastered versions of a song that genius.com has a page of
+their own for. They differ by a word here and there ("Live at Newport" banter, a repeated chorus, a typo) so the
+content hash of project_store tells them apart, and they all end up in the corpus.
+
+Every lyrics is boiled down to a MinHash signature (of its word shingles) and the signatures are split in bands
+(LSH): lyrics only get compared when at least one of their bands is the very same, thus the number of comparisons
+grows with the number of songs rather than with its square. Lyrics at least about as similar as the threshold
+(Jaccard similarity of their shingles) end up in the same cluster.
+"""
+
+import re
+import zlib
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# universal hashing of the shingle hashes, the way datasketch does it
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+WORDS = re.compile(r"[^\W_]+")
+# words along with the spaces after them, "".join()ing them back gives the very same text
+TOKENS = re.compile(r"^\s+|\S+\s*")
+
+
+def shingles(text, size=3):
+    """
+:param text: lyrics
+:type text: str
+:param size: number of words per shingle
+:type size: int
+:return: hashes of every run of size words of text, case and punctuation left aside
+:rtype: set of int
+"""
+    words = WORDS.findall(text.lower())
+    if 0 < len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[n:n + size]).encode("utf-8")) for n in range(len(words) - size + 1)}
+
+
+def lsh_params(threshold, num_perm, recall=0.95):
+    """
+:return: (bands, rows) to split signatures of num_perm hashes in : as many rows per band as possible (the fewer
+candidates to check the better) while lyrics as similar as threshold still share a band at least recall of the time
+:rtype: tuple of int
+"""
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class VariantIndex:
+    """
+:param threshold: how similar (Jaccard similarity of their shingles, 0 to 1) two lyrics have to be to be variants
+:type threshold: float
+:param num_perm: number of hashes per MinHash signature, more is more accurate but slower
+:type num_perm: int
+:param shingle_size: see doc. for shingles
+:type shingle_size: int
+
+Example : index = VariantIndex(threshold=0.8)
+          index.add("Like a Rolling Stone", "Once upon a time you dressed so fine ...")
+          index.add("Like a Rolling Stone (Live)", "Once upon a time you dressed so fine, threw the bums ...")
+          for cluster in index.clusters():
+              ... # [(key, similarity to the canonical version), ...], canonical version first
+
+Candidates out of the LSH buckets are checked against their signatures before being put together, a song is only
+compared with one song of every cluster it shares a bucket with.
+"""
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=3, seed=1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.keys = []
+        self._signatures = []
+        self._parents = []
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def signature(self, text):
+        """
+:return: MinHash signature of text, None if there's not a single word in it
+:rtype: numpy.ndarray or None
+"""
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return None
+        hashes = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        with np.errstate(over="ignore"):
+            return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH).min(axis=0)
+
+    def add(self, key, text):
+        """
+indexes text under key (e.g the song title), and puts it in the cluster of any variant added so far.
+"""
+        number = len(self.keys)
+        signature = self.signature(text)
+        self.keys.append(key)
+        self._signatures.append(signature)
+        self._parents.append(number)
+        if signature is None:
+            return
+        for band, bucket in enumerate(self._buckets):
+            members = bucket.setdefault(signature[band * self.rows:(band + 1) * self.rows].tobytes(), [])
+            for other in members:
+                if self._root(other) != self._root(number) and self.similarity(number, other) >= self.threshold:
+                    self._parents[self._root(other)] = self._root(number)
+            members.append(number)
+
+    def similarity(self, first, second):
+        """
+:return: estimated Jaccard similarity of the songs added first and second
+:rtype: float
+"""
+        return float(np.mean(self._signatures[first] == self._signatures[second]))
+
+    def _root(self, number):
+        while self._parents[number] != number:
+            self._parents[number] = self._parents[self._parents[number]]
+            number = self._parents[number]
+        return number
+
+    def clusters(self):
+        """
+:return: every cluster, in the order their first song was added, as a list of (key, similarity to the canonical
+version) with the canonical version first. The canonical version is the one most similar to all the others
+(the first one added on a tie).
+:rtype: list of list of tuple
+"""
+        members = {}
+        for number in range(len(self.keys)):
+            members.setdefault(self._root(number), []).append(number)
+        clusters = []
+        for numbers in members.values():
+            canonical = max(numbers, key=lambda number: sum(
+                self.similarity(number, other) for other in numbers if other != number))
+            clusters.append([(self.keys[canonical], 1.0)] + [
+                (self.keys[number], self.similarity(canonical, number)) for number in numbers if number != canonical])
+        return clusters
+
+
+def word_diff(canonical, variant):
+    """
+:return: what to change in canonical to get variant, as [start, end, replacement] (start, end: positions among
+the words of canonical)
+:rtype: list of list
+"""
+    old, new = TOKENS.findall(canonical), TOKENS.findall(variant)
+    operations = SequenceMatcher(None, old, new).get_opcodes()
+    return [[start, end, "".join(new[new_start:new_end])]
+            for operation, start, end, new_start, new_end in operations if operation != "equal"]
+
+
+def apply_diff(canonical, diff):
+    """
+:return: the variant word_diff(canonical, variant) was made from, as is
+:rtype: str
+"""
+    tokens = TOKENS.findall(canonical)
+    for start, end, replacement in reversed(diff):
+        tokens[start:end] = [replacement]
+    return "".join(tokens)
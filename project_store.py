@@ -0,0 +1,423 @@
+"""
+File : project_store.py
+
+Everything CorpusGenius finds out about an artist, kept in a single SQLite file ([artist's_last_name]_project.sqlite)
+rather than scattered over loose CSV files :
+
+    artists     the artist (and band members) the project is for
+    albums      albums by the artist                              (by album id, indexed by year)
+    tracks      every track of every album, and what became of it (indexed by song id, album id, year, title),
+                along with the version of the song listed on genius.com and the one its lyrics were fetched at
+    songs       raw metadata of the songs found on genius.com     (by song id)
+    writers     song-writers of those songs                       (indexed by name)
+    lyrics      lyrics of the songs written by the artist         (by content hash, see below)
+
+artist_albums, album_tracks and lyrics_by_song write into it as they go. The CSV files are exported from it (see
+ProjectStore.views), and questions such as "lyrics for 1966" or "all songs on album 26024" are a lookup away
+(year_lyrics, album_songs) instead of re-parsing str(set(...)) cells out of the CSV files.
+
+Lyrics are content-addressed : each distinct text is stored once, under its sha1, and tracks only refer to that hash.
+A song on 7 albums, or a live version word for word the same as the studio one, takes the room of a single lyrics,
+and telling whether two songs have the same lyrics is a matter of comparing hashes (see shared_lyrics).
+
+Since the raw metadata of every song is kept, 'python corpusgenius.py reclassify' sorts the very same songs out again
+for another list of band members without a single request to genius.com. And since every track knows the version of
+the song it was fetched at, 'python corpusgenius.py update' fetches only what is new or changed since (see stale).
+"""
+
+import hashlib
+import json
+import sqlite3
+
+from lyrics_journal import RETRY, LyricsJournal
+
+
+def lyrics_digest(text):
+    """
+:return: the content hash lyrics are stored under
+:rtype: str
+"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ProjectStore:
+    """
+:param path: file the project is stored in, kept from one run to the next
+:type path: str
+
+Example : project = ProjectStore("Dylan_project.sqlite")
+          project.set_artist(181, "Bob Dylan")
+          project.add_albums([{"year": "1966", "album title": "Blonde on Blonde", "album id": 26024}])
+          project.year_lyrics("1966")  # --> ["Well, your railroad gate, you know I just cant jump it ...", ...]
+          project.close()
+"""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS artists (
+                id INTEGER PRIMARY KEY, name TEXT, band_members TEXT);
+            CREATE TABLE IF NOT EXISTS albums (
+                id INTEGER PRIMARY KEY, title TEXT, year TEXT);
+            CREATE INDEX IF NOT EXISTS albums_year ON albums (year);
+            CREATE TABLE IF NOT EXISTS tracks (
+                key TEXT PRIMARY KEY, song_id TEXT, album_id INTEGER, album_title TEXT, song_title TEXT, year TEXT,
+                found TEXT, match_title INTEGER, status TEXT, seq INTEGER, lyrics TEXT);
+            CREATE INDEX IF NOT EXISTS tracks_song ON tracks (song_id);
+            CREATE INDEX IF NOT EXISTS tracks_album ON tracks (album_id);
+            CREATE INDEX IF NOT EXISTS tracks_year ON tracks (year, status);
+            CREATE INDEX IF NOT EXISTS tracks_title ON tracks (song_title, status);
+            CREATE INDEX IF NOT EXISTS tracks_seq ON tracks (seq);
+            CREATE INDEX IF NOT EXISTS tracks_lyrics ON tracks (lyrics);
+            CREATE TABLE IF NOT EXISTS songs (
+                id TEXT PRIMARY KEY, title TEXT, artist TEXT, lyrics TEXT);
+            CREATE TABLE IF NOT EXISTS writers (
+                song_id TEXT, name TEXT, PRIMARY KEY (song_id, name));
+            CREATE INDEX IF NOT EXISTS writers_name ON writers (name);
+            CREATE TABLE IF NOT EXISTS lyrics (
+                digest TEXT PRIMARY KEY, text TEXT);
+        """)
+        # projects from before song versions were kept
+        columns = {column for _, column, *_ in self._db.execute("PRAGMA table_info(tracks)")}
+        for column in ("listed", "version"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE tracks ADD COLUMN {column} TEXT")
+        self._db.commit()
+        self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM tracks").fetchone()[0]
+
+    # tracks are identified just like in the journal
+    key = staticmethod(LyricsJournal.key)
+
+    def set_artist(self, artist_id, name, band_members=None):
+        """
+records who the project is for. A project for someone else is started over.
+"""
+        members = json.dumps(sorted(band_members)) if band_members is not None else None
+        row = self._db.execute("SELECT id, name FROM artists").fetchone()
+        if row is not None and tuple(row) != (artist_id, name):
+            for table in ("artists", "albums", "tracks", "songs", "writers", "lyrics"):
+                self._db.execute(f"DELETE FROM {table}")
+        self._db.execute("DELETE FROM artists")
+        self._db.execute("INSERT INTO artists VALUES (?, ?, ?)", (artist_id, name, members))
+        self._db.commit()
+
+    def add_albums(self, albums):
+        """
+:param albums: albums as artist_albums lists them, i.e {"year": ..., "album title": ..., "album id": ...}
+:type albums: iterable of dict
+"""
+        self._db.executemany(
+            "INSERT OR REPLACE INTO albums VALUES (?, ?, ?)",
+            ((album["album id"], str(album["album title"]).strip(), str(album["year"]).strip()) for album in albums))
+        self._db.commit()
+
+    def add_tracks(self, tracks, versions=None):
+        """
+:param tracks: tracks as album_tracks lists them, i.e {"album title": ..., "song title": ..., "song id": ...,
+"year": ...}. Tracks already there keep what became of them.
+:type tracks: iterable of dict
+:param versions: version of every song as listed on genius.com, by song id (see corpusgenius.song_version)
+:type versions: dict or None
+"""
+        versions = versions or {}
+        for track in tracks:
+            line = {column: str(value) for column, value in track.items()}
+            self._db.execute(
+                "INSERT INTO tracks (key, song_id, album_id, album_title, song_title, year, listed) "
+                "VALUES (?, ?, (SELECT id FROM albums WHERE title = ? AND year = ?), ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET album_id = excluded.album_id, listed = excluded.listed",
+                (self.key(line), line["song id"].strip(), line["album title"].strip(), line["year"].strip(),
+                 line["album title"].strip(), line["song title"].strip(), line["year"].strip(),
+                 versions.get(line["song id"].strip())))
+        self._db.commit()
+
+    def prune(self, tracks):
+        """
+forgets the tracks no longer listed, i.e every track but tracks.
+:type tracks: iterable of dict
+:return: number of tracks forgotten
+:rtype: int
+"""
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS listed (key TEXT PRIMARY KEY)")
+        self._db.execute("DELETE FROM listed")
+        self._db.executemany(
+            "INSERT OR IGNORE INTO listed VALUES (?)",
+            ((self.key({column: str(value) for column, value in track.items()}),) for track in tracks))
+        pruned = self._db.execute("DELETE FROM tracks WHERE key NOT IN (SELECT key FROM listed)").rowcount
+        self._db.commit()
+        return pruned
+
+    def stale(self):
+        """
+:return: tracks to fetch (again) to be up to date with genius.com, i.e those never fetched, left to retry, or whose
+song's listed version isn't the one it was fetched at. As rows of the tracks csv, in song title order.
+:rtype: list of dict
+
+Tracks fetched before versions were kept are taken to be up to date, as of their version listed now.
+"""
+        self._db.execute(
+            "UPDATE tracks SET version = listed WHERE version IS NULL AND status IS NOT NULL "
+            f"AND status NOT IN ({', '.join('?' * len(RETRY))})", tuple(RETRY))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT song_id, album_title, song_title, year FROM tracks "
+            f"WHERE status IS NULL OR status IN ({', '.join('?' * len(RETRY))}) OR version IS NOT listed "
+            "ORDER BY song_title", tuple(RETRY))
+        return [{"song id": song_id, "album title": album_title, "song title": song_title, "year": year}
+                for song_id, album_title, song_title, year in rows]
+
+    def resequence(self, tracks):
+        """
+numbers the tracks (see tracks) in the order of tracks, as if they had been processed in that order.
+:type tracks: iterable of dict
+"""
+        self._seq = 0
+        for track in tracks:
+            line = {column: str(value) for column, value in track.items()}
+            self._seq += 1
+            self._db.execute(
+                "UPDATE tracks SET seq = ? WHERE key = ? AND status IS NOT NULL", (self._seq, self.key(line)))
+        self._db.commit()
+
+    def reset(self):
+        """
+forgets what became of the tracks on earlier runs (songs stay, they're looked up by id), for a run starting over.
+"""
+        self._db.execute(
+            "UPDATE tracks SET found = NULL, match_title = NULL, status = NULL, seq = NULL, lyrics = NULL")
+        self._db.commit()
+
+    def add_song(self, line, song, match_title=True):
+        """
+stores what genius.com came up with for a track.
+:param line: row of the tracks csv
+:type line: dict
+:param song: raw metadata of the song found for it (see corpusgenius.song_metadata), None if there's no lyrics
+:type song: dict or None
+:param match_title: whether the title found has to be double checked against the track's (see
+corpusgenius.song_outcome)
+:type match_title: bool
+"""
+        found = None
+        if song is not None:
+            found = str(song["id"])
+            self._db.execute(
+                "INSERT OR REPLACE INTO songs VALUES (?, ?, ?, ?)",
+                (found, song["title"], song["artist"], song["lyrics"]))
+            self._db.execute("DELETE FROM writers WHERE song_id = ?", (found,))
+            self._db.executemany(
+                "INSERT INTO writers VALUES (?, ?)", ((found, name) for name in song["writers"]))
+        self._track(line)
+        self._db.execute(
+            "UPDATE tracks SET found = ?, match_title = ? WHERE key = ?", (found, int(match_title), self.key(line)))
+
+    def add_outcome(self, line, outcome):
+        """
+records what became of a track (see corpusgenius.song_outcome), after add_song.
+"""
+        self._track(line)
+        self._seq += 1
+        digest = None
+        if outcome["status"] == "original":
+            digest = lyrics_digest(outcome["lyrics"])
+            self._db.execute("INSERT OR IGNORE INTO lyrics VALUES (?, ?)", (digest, outcome["lyrics"]))
+        self._db.execute(
+            "UPDATE tracks SET status = ?, seq = ?, lyrics = ?, version = listed WHERE key = ?",
+            (outcome["status"], self._seq, digest, self.key(line)))
+        self._db.commit()
+
+    def _track(self, line):
+        # tracks lyrics_by_song gets from a tracks csv of its own (not listed by album_tracks)
+        self._db.execute(
+            "INSERT OR IGNORE INTO tracks (key, song_id, album_title, song_title, year) VALUES (?, ?, ?, ?, ?)",
+            (self.key(line), line["song id"].strip(), line["album title"].strip(), line["song title"].strip(),
+             line["year"].strip()))
+
+    def tracks(self):
+        """
+:return: every track done with (i.e not left to retry), in the order it was processed, along with its song and
+whether the title has to be double checked
+:rtype: list of (dict, dict or None, bool)
+"""
+        rows = self._db.execute(
+            "SELECT song_id, album_title, song_title, year, found, match_title FROM tracks "
+            f"WHERE status IS NOT NULL AND status NOT IN ({', '.join('?' * len(RETRY))}) ORDER BY seq",
+            tuple(RETRY)).fetchall()
+        return [({"song id": song_id, "album title": album_title, "song title": song_title, "year": year},
+                 self.song(found) if found is not None else None, bool(match_title))
+                for song_id, album_title, song_title, year, found, match_title in rows]
+
+    def done(self):
+        """
+:return: keys (see LyricsJournal.key) of the tracks done with, i.e not left to retry, journaled or not
+:rtype: set of str
+"""
+        return {key for key, in self._db.execute(
+            f"SELECT key FROM tracks WHERE status IS NOT NULL AND status NOT IN ({', '.join('?' * len(RETRY))})",
+            tuple(RETRY))}
+
+    def song(self, song_id):
+        """
+:return: raw metadata of a song (see corpusgenius.song_metadata), None if it isn't stored
+:rtype: dict or None
+"""
+        row = self._db.execute("SELECT title, artist, lyrics FROM songs WHERE id = ?", (str(song_id),)).fetchone()
+        if row is None:
+            return None
+        writers = [name for name, in self._db.execute(
+            "SELECT name FROM writers WHERE song_id = ? ORDER BY name", (str(song_id),))]
+        return {"id": str(song_id), "title": row[0], "artist": row[1], "writers": writers, "lyrics": row[2]}
+
+    def year_lyrics(self, year):
+        """
+:return: lyrics of the songs by the artist released in year
+:rtype: list of str
+"""
+        return [text for text, in self._db.execute(
+            "SELECT lyrics.text FROM lyrics WHERE digest IN "
+            "(SELECT tracks.lyrics FROM tracks WHERE tracks.year = ? AND tracks.status = 'original')", (str(year),))]
+
+    def original_tracks(self):
+        """
+:return: tracks of the songs by the artist, in the order they were processed in, i.e (song id, song title, album
+title, year, hash of their lyrics)
+:rtype: list of tuple
+"""
+        return self._db.execute(
+            "SELECT song_id, song_title, album_title, year, lyrics FROM tracks "
+            "WHERE status = 'original' AND lyrics IS NOT NULL ORDER BY seq").fetchall()
+
+    def lyrics(self, digests=None):
+        """
+:param digests: hashes of the lyrics wanted (default: every lyrics stored)
+:type digests: collection of str or None
+:return: lyrics along with their hash, one at a time
+:rtype: iterator of (str, str)
+"""
+        for digest, text in self._db.execute("SELECT digest, text FROM lyrics ORDER BY digest"):
+            if digests is None or digest in digests:
+                yield digest, text
+
+    def shared_lyrics(self):
+        """
+:return: lyrics found under more than one song title (live versions, alternate takes ... renamed), i.e their hash
+along with the song titles sharing it
+:rtype: list of (str, list of str)
+"""
+        rows = self._db.execute(
+            "SELECT lyrics, song_title FROM tracks WHERE lyrics IN "
+            "(SELECT lyrics FROM tracks WHERE lyrics IS NOT NULL GROUP BY lyrics HAVING COUNT(DISTINCT song_title) > 1) "
+            "GROUP BY lyrics, song_title ORDER BY lyrics, MIN(seq)").fetchall()
+        shared = {}
+        for digest, song_title in rows:
+            shared.setdefault(digest, []).append(song_title)
+        return list(shared.items())
+
+    def album_songs(self, album_id):
+        """
+:return: songs on an album, i.e (song id, song title, what became of it)
+:rtype: list of tuple
+"""
+        return self._db.execute(
+            "SELECT song_id, song_title, status FROM tracks WHERE album_id = ? ORDER BY song_title",
+            (album_id,)).fetchall()
+
+    def views(self):
+        """
+:return: lyrics by song title, lyrics by year, and songs not written by the artist, as lyrics_by_song exports them
+(see its doc.), read back from the store one song title / year at a time.
+:rtype: LyricsView, LyricsView, NotByArtistView
+"""
+        return LyricsView(self, "song_title"), LyricsView(self, "year"), NotByArtistView(self)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM tracks WHERE status IS NOT NULL").fetchone()[0]
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+
+class _View:
+    # common to the views --> keys are read back in the order tracks were processed
+    # in (like lyrics_by_song's dicts would have them), unless reorder()ed.
+
+    _statuses = ()
+
+    def __init__(self, store, column):
+        self._store = store
+        self._column = column
+        self._order = None
+
+    def keys(self):
+        if self._order is not None:
+            return list(self._order)
+        return [key for key, in self._store._db.execute(
+            f"SELECT {self._column} FROM tracks WHERE status IN ({', '.join('?' * len(self._statuses))}) "
+            f"GROUP BY {self._column} ORDER BY MIN(seq)", self._statuses)]
+
+    def __len__(self):
+        return len(self.keys())
+
+    def reorder(self, keys):
+        """
+items() are read back in the order of keys from now on. Keys without any song are left out.
+"""
+        present = set(self.keys())
+        self._order = [key for key in keys if key in present]
+
+    def items(self):
+        for key in self.keys():
+            yield key, self._values(key)
+
+
+class LyricsView(_View):
+    """
+lyrics of the songs written by the artist, by song title or by year
+"""
+
+    _statuses = ("original",)
+
+    def _values(self, key):
+        # each distinct text is read just once, however many tracks refer to it
+        return {text for text, in self._store._db.execute(
+            f"SELECT lyrics.text FROM lyrics WHERE digest IN "
+            f"(SELECT tracks.lyrics FROM tracks WHERE tracks.{self._column} = ? AND tracks.status = 'original')",
+            (key,))}
+
+
+class NotByArtistView(_View):
+    """
+album and original writers (if available) of songs not written by the artist, by song title
+"""
+
+    _statuses = ("not_by_artist", "no_writer")
+
+    def __init__(self, store):
+        super().__init__(store, "song_title")
+
+    def _values(self, key):
+        values = []
+        rows = self._store._db.execute(
+            "SELECT status, album_title, year, found FROM tracks "
+            "WHERE song_title = ? AND status IN ('not_by_artist', 'no_writer') ORDER BY seq", (key,)).fetchall()
+        for status, album_title, year, found in rows:
+            if status == "not_by_artist":
+                values.append([album_title, {name for name, in self._store._db.execute(
+                    "SELECT name FROM writers WHERE song_id = ?", (found,))}])
+            else:
+                # songs without writer info. are listed twice, see corpusgenius.apply_outcome
+                values.extend([[year, album_title, ["N/A"]], [year, album_title, ["N/A"]]])
+        return values
+
+    def longest(self):
+        """
+:return: number of values of the longest list
+:rtype: int
+"""
+        return self._store._db.execute(
+            "SELECT COALESCE(MAX(n), 0) FROM (SELECT SUM(CASE status WHEN 'no_writer' THEN 2 ELSE 1 END) AS n "
+            "FROM tracks WHERE status IN ('not_by_artist', 'no_writer') GROUP BY song_title)").fetchone()[0]
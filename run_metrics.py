@@ -0,0 +1,365 @@
+"""
+File : run_metrics.py
+
+What a run spent its time on, for when it's slow and the question is whether genius.com, the title matching or the
+pandas export is to blame. Collected along the way by every stage of corpusgenius (and the client it goes through) :
+
+1) Wall time of every stage (artist_albums, album_tracks, lyrics_by_song, corpus_generator ...) and of a few
+sections within them (title matching, lyrics normalization, page parsing, CSV export), along with peak RSS.
+2) Requests to genius.com by endpoint and status, with a histogram of their latency, retries and timeouts.
+3) Songs by what became of them (original, not by the artist, no writer, mismatch i.e misattributed, missing ...).
+
+and handed over as a JSON report or a Prometheus textfile (for node_exporter's textfile collector). Given a
+profile_dir, every stage is also run under cProfile, one [stage].pstats (and a [stage].txt of the top functions) each.
+"""
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import partial
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# upper bounds (seconds) of the buckets of the request latency histogram, the way Prometheus has them
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# number of stages open at the moment, whatever the thread or the run (see RunMetrics.stage). Peak RSS is the whole
+# process', hence reset only when no stage is open, lest a stage wipe out the peak of another running alongside it
+open_stages = 0
+_open_lock = threading.Lock()
+
+
+def reset_peak_rss():
+    # peak RSS from now on rather than since the process started (Linux only, see peak_rss)
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def stage_opened():
+    # peak RSS from now on, unless a stage is open already (see open_stages)
+    global open_stages
+    with _open_lock:
+        if open_stages == 0:
+            reset_peak_rss()
+        open_stages += 1
+
+
+def stage_closed():
+    global open_stages
+    with _open_lock:
+        open_stages -= 1
+
+
+def peak_rss():
+    """
+:return: peak resident set size of the process in MB, since reset_peak_rss (or since the process started, anywhere
+but Linux). None if there's no telling.
+:rtype: float or None
+"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / 1024 ** 2 if platform.system() == "Darwin" else peak / 1024
+
+
+class RunMetrics:
+    """
+:param profile_dir: where to write the cProfile output of every stage (default: no profiling)
+:type profile_dir: str or None
+:param labels: what the run is about, e.g {"artist": "Bob Dylan"}, along with every metric
+:type labels: dict or None
+
+Example : metrics = RunMetrics()
+          with metrics.stage("lyrics_by_song"):
+              ...
+              with metrics.timed("title_matching"):
+                  ...
+          metrics.request("songs", 0.21, 200)
+          metrics.song("original")
+          write_json("Dylan_metrics.json", metrics.report(cache))
+
+Safe to share between threads. Stages inside a stage (of the same thread) are timed but not profiled on their own.
+cProfile profiles the thread running the stage only, i.e stages running side by side in threads of their own (see
+corpusgenius.run_pipeline) are profiled each in its thread, as long as the Python version allows more than one
+profiler at a time (3.12 on doesn't, the first one is). Requests of worker threads show up in the request latencies
+instead. Peak RSS is the process', i.e that of a stage running alongside others (a pipeline's, the artists of a batch
+...) is the peak of all of them since the first one still open started.
+"""
+
+    def __init__(self, profile_dir=None, labels=None):
+        self.profile_dir = profile_dir
+        self.labels = dict(labels or {})
+        self.started = time.time()
+        self.stages = []
+        self._lock = threading.Lock()
+        # how deep in stages every thread is
+        self._local = threading.local()
+        self._sections = defaultdict(lambda: [0.0, 0])
+        self._requests = defaultdict(Counter)
+        self._latency = defaultdict(
+            lambda: {"seconds": 0.0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)})
+        self._retries = Counter()
+        self._timeouts = Counter()
+        self._songs = Counter()
+        self.counters = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        """
+times (and profiles, given a profile_dir) whatever runs within, as stage name.
+"""
+        profiler = None
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            # peak RSS of a stage within a stage is the outer one's as well
+            stage_opened()
+            if self.profile_dir is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler = cProfile.Profile()
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # another stage (of another thread) is being profiled already
+                    profiler = None
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self._local.depth = depth
+            if depth == 0:
+                stage_closed()
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.stages.append({"stage": name, "seconds": seconds, "peak_rss_mb": peak_rss()})
+            if profiler is not None:
+                self._write_profile(name, profiler)
+
+    def _write_profile(self, name, profiler):
+        path = os.path.join(self.profile_dir, name)
+        profiler.dump_stats(path + ".pstats")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        with open(path + ".txt", "w", encoding="utf-8") as summary:
+            summary.write(text.getvalue())
+
+    @contextmanager
+    def timed(self, section):
+        """
+adds the time spent within to section (e.g "title_matching"), a section being timed any number of times.
+"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                total = self._sections[section]
+                total[0] += seconds
+                total[1] += 1
+
+    def request(self, endpoint, seconds, status):
+        """
+:param endpoint: see genius_cache.ResponseCache.endpoint, i.e 'songs', 'search', 'pages' ...
+:type endpoint: str
+:param seconds: how long genius.com took to answer
+:type seconds: float
+:param status: HTTP status of the answer
+:type status: int
+"""
+        bucket = next((n for n, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            self._requests[endpoint][str(status)] += 1
+            latency = self._latency[endpoint]
+            latency["seconds"] += seconds
+            latency["max"] = max(latency["max"], seconds)
+            latency["buckets"][bucket] += 1
+
+    def retried(self, endpoint):
+        with self._lock:
+            self._retries[endpoint] += 1
+
+    def timed_out(self, endpoint):
+        with self._lock:
+            self._timeouts[endpoint] += 1
+
+    def song(self, status):
+        """
+counts a song done with, by what became of it (see corpusgenius.song_outcome)
+"""
+        with self._lock:
+            self._songs[status] += 1
+
+    def count(self, name, number=1):
+        with self._lock:
+            self.counters[name] += number
+
+    def report(self, cache=None, controller=None):
+        """
+:param cache: cache of the run, for its hit ratio
+:type cache: genius_cache.ResponseCache or None
+:param controller: controller of the run, for its stats
+:type controller: genius_client.AdaptiveController or None
+:return: everything so far, as plain data (see write_json & write_prometheus)
+:rtype: dict
+"""
+        with self._lock:
+            requests = {}
+            for endpoint, statuses in sorted(self._requests.items()):
+                latency = self._latency[endpoint]
+                count = sum(statuses.values())
+                cumulative, buckets = 0, {}
+                for bound, number in zip(LATENCY_BUCKETS + ("+Inf",), latency["buckets"]):
+                    cumulative += number
+                    buckets[str(bound)] = cumulative
+                requests[endpoint] = {"count": count, "statuses": dict(statuses), "seconds": latency["seconds"],
+                                      "mean_seconds": latency["seconds"] / count if count else 0.0,
+                                      "max_seconds": latency["max"], "buckets": buckets}
+            songs = dict(self._songs)
+            return {
+                "labels": dict(self.labels),
+                "started_at": self.started,
+                "seconds": time.time() - self.started,
+                "stages": [dict(stage) for stage in self.stages],
+                "sections": {section: {"seconds": seconds, "calls": calls}
+                             for section, (seconds, calls) in sorted(self._sections.items())},
+                "requests": {"total": sum(endpoint["count"] for endpoint in requests.values()),
+                             "by_endpoint": requests},
+                "retries": dict(self._retries),
+                "timeouts": dict(self._timeouts),
+                "songs": {"processed": sum(songs.values()), "by_outcome": songs},
+                "counters": dict(self.counters),
+                "cache": cache.stats() if cache is not None else None,
+                "controller": controller.stats() if controller is not None else None,
+                # the peak since the last stage started, or that of any stage before if higher
+                "peak_rss_mb": max((peak for peak in [peak_rss()] + [stage["peak_rss_mb"] for stage in self.stages]
+                                    if peak is not None), default=None),
+                "python": platform.python_version(),
+            }
+
+
+def write_json(path, report):
+    """
+writes a report (see RunMetrics.report), or anything made of them, to path as JSON.
+"""
+    with open(path, "w", encoding="utf-8") as data:
+        json.dump(report, data, indent=2)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def prometheus_text(reports):
+    """
+:param reports: reports (see RunMetrics.report) to put together, e.g one per artist, told apart by their labels
+:type reports: list of dict
+:return: the reports in Prometheus' text exposition format
+:rtype: str
+"""
+    families = {}
+
+    def sample(family, kind, doc, value, labels, suffix=""):
+        # samples of a family (a histogram's _bucket, _sum & _count alike) go together, whatever report they're of
+        if value is None:
+            return
+        samples = families.setdefault(family, (kind, doc, []))[2]
+        samples.append(f"{family}{suffix}{_labels(labels)} {value if isinstance(value, int) else float(value)!r}")
+
+    for report in reports:
+        labels = report["labels"]
+        sample("corpusgenius_run_start_time_seconds", "gauge", "When the run started (unix time).",
+               report["started_at"], labels)
+        sample("corpusgenius_run_duration_seconds", "gauge", "How long the run has taken so far.",
+               report["seconds"], labels)
+        sample("corpusgenius_peak_rss_megabytes", "gauge", "Peak resident set size of the process.",
+               report["peak_rss_mb"], labels)
+        stages = defaultdict(float)
+        for stage in report["stages"]:
+            stages[stage["stage"]] += stage["seconds"]
+        for stage, seconds in stages.items():
+            sample("corpusgenius_stage_duration_seconds", "gauge", "Wall time of every stage.", seconds,
+                   dict(labels, stage=stage))
+        for section, total in report["sections"].items():
+            sample("corpusgenius_section_seconds_total", "counter", "Time spent in a section, over all stages.",
+                   total["seconds"], dict(labels, section=section))
+            sample("corpusgenius_section_calls_total", "counter", "Number of times a section was timed.",
+                   total["calls"], dict(labels, section=section))
+        for endpoint, requests in report["requests"]["by_endpoint"].items():
+            for status, number in requests["statuses"].items():
+                sample("corpusgenius_requests_total", "counter", "Requests to genius.com, by endpoint and status.",
+                       number, dict(labels, endpoint=endpoint, status=status))
+            latency = partial(sample, "corpusgenius_request_duration_seconds", "histogram",
+                              "Latency of requests to genius.com, by endpoint.")
+            for bound, number in requests["buckets"].items():
+                latency(number, dict(labels, endpoint=endpoint, le=bound), suffix="_bucket")
+            latency(requests["seconds"], dict(labels, endpoint=endpoint), suffix="_sum")
+            latency(requests["count"], dict(labels, endpoint=endpoint), suffix="_count")
+        for endpoint, number in report["retries"].items():
+            sample("corpusgenius_retries_total", "counter", "Requests sent again after a 429/5xx.", number,
+                   dict(labels, endpoint=endpoint))
+        for endpoint, number in report["timeouts"].items():
+            sample("corpusgenius_timeouts_total", "counter", "Requests that timed out.", number,
+                   dict(labels, endpoint=endpoint))
+        for outcome, number in report["songs"]["by_outcome"].items():
+            sample("corpusgenius_songs_total", "counter", "Songs done with, by what became of them.", number,
+                   dict(labels, outcome=outcome))
+        for name, number in report["counters"].items():
+            sample(f"corpusgenius_{name}_total", "counter", f"{name.replace('_', ' ').capitalize()}.", number,
+                   labels)
+        if report["cache"] is not None:
+            for endpoint, cached in report["cache"]["by_endpoint"].items():
+                sample("corpusgenius_cache_hits_total", "counter", "Responses found in the cache.", cached["hits"],
+                       dict(labels, endpoint=endpoint))
+                sample("corpusgenius_cache_misses_total", "counter", "Responses not found in the cache.",
+                       cached["misses"], dict(labels, endpoint=endpoint))
+            sample("corpusgenius_cache_hit_ratio", "gauge", "Share of responses found in the cache.",
+                   report["cache"]["hit_ratio"], labels)
+        if report["controller"] is not None:
+            sample("corpusgenius_concurrency_limit", "gauge", "Requests in flight the controller ended with.",
+                   report["controller"]["limit"], labels)
+
+    lines = []
+    for family, (kind, doc, samples) in families.items():
+        lines.append(f"# HELP {family} {doc}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, reports):
+    """
+writes reports (see prometheus_text) to path, all at once (node_exporter never gets to read half a file).
+"""
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as data:
+        data.write(prometheus_text(reports))
+    os.replace(temporary, path)
@@ -0,0 +1,183 @@
+"""
+File : spill_store.py
+
+On-disk stand-ins for the defaultdict(set) / defaultdict(list) that lyrics_by_song aggregates songs in, for catalogs
+too big to keep in memory (--low-memory). Think Asha Bhosle and her 11,000+ songs on a worker dyno.
+
+Everything is spilled to a throwaway SQLite file as it comes. Each lyrics is stored just once however many song
+titles / years it belongs to, and read back one key (song title, year) at a time when the CSV files are written, so
+memory holds the largest single row rather than the whole catalog.
+"""
+
+import ast
+import hashlib
+import os
+import sqlite3
+import tempfile
+
+# writes are committed every so many songs, keeping the rollback journal small
+COMMIT_EVERY = 500
+
+
+class SpillStore:
+    """
+:param path: file to spill to, a temporary file if None. Removed by close().
+:type path: str or None
+
+Example : spill = SpillStore()
+          lyrics_set = spill.sets("lyrics")
+          lyrics_set["Mr. Tambourine Man"].add("Hey! Mr. Tambourine Man, play a song for me ...")
+          for title, lyrics in lyrics_set.items():
+              ... # title, set of lyrics
+          spill.close()
+"""
+
+    def __init__(self, path=None):
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix="corpusgenius_", suffix=".sqlite")
+            os.close(handle)
+        self.path = path
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # a small page cache, that's the whole point
+        self._db.execute("PRAGMA cache_size=-2048")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS texts (digest TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS members (seq INTEGER PRIMARY KEY, name TEXT, key TEXT, digest TEXT, "
+            "UNIQUE (name, key, digest))")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items (seq INTEGER PRIMARY KEY, name TEXT, key TEXT, value TEXT)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS items_key ON items (name, key)")
+
+    def sets(self, name):
+        """
+:return: an on-disk defaultdict(set) of str, stored under name
+:rtype: SpilledSets
+"""
+        return SpilledSets(self, name)
+
+    def lists(self, name):
+        """
+:return: an on-disk defaultdict(list) of plain data (anything repr / ast.literal_eval round trips), stored under name
+:rtype: SpilledLists
+"""
+        return SpilledLists(self, name)
+
+    def text(self, digest):
+        """
+:param digest: sha1 of a str added to sets of the store (see project_store.lyrics_digest)
+:return: the str, None if there's no such str
+:rtype: str or None
+"""
+        row = self._read("SELECT value FROM texts WHERE digest = ?", (digest,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _write(self, query, values):
+        self._db.execute(query, values)
+        self._writes += 1
+        if self._writes % COMMIT_EVERY == 0:
+            self._db.commit()
+
+    def _read(self, query, values):
+        self._db.commit()
+        return self._db.execute(query, values)
+
+    def close(self):
+        self._db.close()
+        os.remove(self.path)
+
+
+class _Spilled:
+    # common to SpilledSets and SpilledLists --> keys are read back in the order
+    # they first showed up in (like a dict would), unless reorder()ed.
+
+    _table = None
+
+    def __init__(self, store, name):
+        self._store = store
+        self.name = name
+        self._order = None
+
+    def __getitem__(self, key):
+        return _Handle(self, key)
+
+    def keys(self):
+        if self._order is not None:
+            return list(self._order)
+        return [key for key, in self._store._read(
+            f"SELECT key FROM {self._table} WHERE name = ? GROUP BY key ORDER BY MIN(seq)", (self.name,))]
+
+    def __len__(self):
+        return len(self.keys())
+
+    def reorder(self, keys):
+        """
+items() are read back in the order of keys from now on. Keys that were never added to are left out.
+"""
+        present = set(self.keys())
+        self._order = [key for key in keys if key in present]
+
+    def items(self):
+        for key in self.keys():
+            yield key, self._values(key)
+
+
+class _Handle:
+    # what spilled[key] returns, i.e spilled[key].add(...) / spilled[key].append(...)
+
+    def __init__(self, spilled, key):
+        self._spilled = spilled
+        self._key = key
+
+    def add(self, value):
+        self._spilled._add(self._key, value)
+
+    def append(self, value):
+        self._spilled._add(self._key, value)
+
+
+class SpilledSets(_Spilled):
+    """
+on-disk defaultdict(set), see SpillStore.sets
+"""
+
+    _table = "members"
+
+    def _add(self, key, value):
+        digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+        self._store._write("INSERT OR IGNORE INTO texts VALUES (?, ?)", (digest, value))
+        self._store._write(
+            "INSERT OR IGNORE INTO members (name, key, digest) VALUES (?, ?, ?)", (self.name, key, digest))
+
+    def _values(self, key):
+        return {value for value, in self._store._read(
+            "SELECT texts.value FROM members JOIN texts ON members.digest = texts.digest "
+            "WHERE members.name = ? AND members.key = ? ORDER BY members.seq", (self.name, key))}
+
+
+class SpilledLists(_Spilled):
+    """
+on-disk defaultdict(list), see SpillStore.lists
+"""
+
+    _table = "items"
+
+    def _add(self, key, value):
+        self._store._write(
+            "INSERT INTO items (name, key, value) VALUES (?, ?, ?)", (self.name, key, repr(value)))
+
+    def _values(self, key):
+        return [ast.literal_eval(value) for value, in self._store._read(
+            "SELECT value FROM items WHERE name = ? AND key = ? ORDER BY seq", (self.name, key))]
+
+    def longest(self):
+        """
+:return: number of values of the longest list
+:rtype: int
+"""
+        return self._store._read(
+            "SELECT COALESCE(MAX(n), 0) FROM (SELECT COUNT(*) AS n FROM items WHERE name = ? GROUP BY key)",
+            (self.name,)).fetchone()[0]
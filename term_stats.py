@@ -0,0 +1,354 @@
+"""
+File : term_stats.py
+
+Word statistics of the lyrics of an artist, by song, by album and by year : word (and n-gram) frequencies, TF-IDF,
+the words distinctive of a year or an album, how the vocabulary grew year after year ...
+
+[artist's_last_name]_lyrics_by_years.csv has the lyrics of every year, but as a single cell of text, i.e counting words
+by year means splitting all of it into words again and going through them one at a time in Python. TermStats counts
+the words (the very same words as lyrics_index, and n-grams of them) of every lyrics of the project store once, into a
+sparse document-term matrix (scipy.sparse, a row per lyrics, a column per term) -->
+
+    counts      lyrics x terms          number of times every term shows up in every lyrics
+
+and what a song title, an album or a year is made of is a sparse 0/1 matrix of its own (groups x lyrics, built out of
+the tracks of the store), so that the terms of every year are a single matrix product rather than a loop :
+
+    incidence @ counts  -->  years x terms
+
+Every lyrics counts once per song / album / year, however many tracks it's on (the way the CSV files have them).
+
+Lyrics are stored under their hash (see project_store), so the matrix is kept from one run to the next in
+[artist's_last_name]_stats.npz and update() only counts the words of lyrics it doesn't have yet, e.g the few songs
+'python corpusgenius.py update' just fetched. Lyrics no longer on any track are dropped.
+
+Example : stats = TermStats("Dylan_stats.npz", ngrams=2)
+          stats.update(ProjectStore("Dylan_project.sqlite"))
+          stats.save()
+          stats.frequencies(by="year", top=5)["1966"]   # --> [("the", 612), ("you", 580), ...]
+          stats.distinctive(by="album", n=2)             # --> the bigrams standing out on every album (TF-IDF)
+          stats.growth()                                 # --> words, distinct words and new words of every year
+          stats.trend(["rain", "hard rain"])             # --> {"rain": {"1962": 3, "1963": 21, ...}, ...}
+
+          python term_stats.py Dylan_stats.npz distinctive --by year --top 10
+"""
+
+import argparse
+import json
+import os
+from array import array
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from lyrics_index import words
+
+# what groups are made of, i.e column of the tracks (see ProjectStore.original_tracks)
+BY = {"song": 1, "album": 2, "year": 3}
+
+
+def grams(tokens, ngrams=1):
+    """
+:return: the words of tokens, then every sequence of 2 of them, of 3 ... up to ngrams (words separated by a space)
+:rtype: iterator of str
+"""
+    for size in range(1, ngrams + 1):
+        yield from (" ".join(gram) for gram in zip(*(tokens[at:] for at in range(size))))
+
+
+class TermStats:
+    """
+:param path: file the statistics are kept in from one run to the next, loaded if it's there (default: none, nothing
+kept)
+:type path: str or None
+:param ngrams: terms are words and sequences of up to ngrams words. Statistics kept for other ngrams (or for another
+artist) are started over.
+:type ngrams: int
+:param artist: artist of the lyrics (default: the one the statistics were kept for, if any)
+:type artist: str or None
+
+Example : see module doc.
+"""
+
+    def __init__(self, path=None, ngrams=1, artist=None):
+        self.path = path
+        self.ngrams = ngrams
+        self.artist = artist
+        self.vocabulary = []                            # terms, by column
+        self.terms = {}                                 # column of every term
+        self.sizes = array("b")                         # number of words of every term, by column
+        self.digests = {}                               # row of every lyrics, by hash
+        self.tracks = []                                # (song id, song title, album title, year, hash)
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.int32)
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header["ngrams"] != self.ngrams or self.artist not in (None, header["artist"]):
+                return
+            self.artist = header["artist"]
+            self.tracks = [tuple(track) for track in header["tracks"]]
+            self.vocabulary = data["vocabulary"].tolist()
+            self.digests = {digest: row for row, digest in enumerate(data["digests"].tolist())}
+            self.counts = sparse.csr_matrix((data["data"], data["indices"], data["indptr"]),
+                                            shape=tuple(data["shape"]))
+        self.terms = {term: column for column, term in enumerate(self.vocabulary)}
+        self.sizes = array("b", (term.count(" ") + 1 for term in self.vocabulary))
+
+    def __len__(self):
+        return len(self.digests)
+
+    def add(self, lyrics):
+        """
+counts the terms of lyrics it doesn't have yet.
+:param lyrics: lyrics along with their hash
+:type lyrics: iterable of (str, str)
+:return: number of lyrics added
+:rtype: int
+"""
+        data, indices, indptr = array("i"), array("i"), array("q", [0])
+        for digest, text in lyrics:
+            if digest in self.digests:
+                continue
+            for term, count in Counter(grams(words(text), self.ngrams)).items():
+                column = self.terms.get(term)
+                if column is None:
+                    column = self.terms[term] = len(self.vocabulary)
+                    self.vocabulary.append(term)
+                    self.sizes.append(term.count(" ") + 1)
+                indices.append(column)
+                data.append(count)
+            indptr.append(len(indices))
+            self.digests[digest] = len(self.digests)
+        added = len(indptr) - 1
+        if added:
+            # the rows so far get the columns of the new terms (i.e none of them), the new rows go under them
+            before = sparse.csr_matrix((self.counts.data, self.counts.indices, self.counts.indptr),
+                                       shape=(self.counts.shape[0], len(self.vocabulary)))
+            rows = sparse.csr_matrix((np.frombuffer(data, dtype=np.int32), np.frombuffer(indices, dtype=np.int32),
+                                      np.frombuffer(indptr, dtype=np.int64)), shape=(added, len(self.vocabulary)))
+            self.counts = sparse.vstack([before, rows], format="csr", dtype=np.int32)
+            self.counts.sort_indices()
+        return added
+
+    def update(self, store):
+        """
+brings the statistics up to date with a project store : its tracks, and the terms of the lyrics not counted yet.
+:param store: project store of the artist
+:type store: project_store.ProjectStore
+:return: number of lyrics added
+:rtype: int
+"""
+        self.tracks = [tuple(track) for track in store.original_tracks()]
+        used = {track[4] for track in self.tracks}
+        if any(digest not in used for digest in self.digests):
+            kept = [digest for digest in self.digests if digest in used]
+            self.counts = self.counts[[self.digests[digest] for digest in kept]]
+            self.digests = {digest: row for row, digest in enumerate(kept)}
+        return self.add(store.lyrics({digest for digest in used if digest not in self.digests}))
+
+    def save(self, path=None):
+        """
+:param path: file to save the statistics to (default: the one they were loaded from)
+:type path: str or None
+"""
+        path = path or self.path
+        header = {"artist": self.artist, "ngrams": self.ngrams, "tracks": self.tracks}
+        with open(path + ".tmp", "wb") as data:
+            np.savez_compressed(data, header=np.array(json.dumps(header)),
+                                vocabulary=np.array(self.vocabulary, dtype=str),
+                                digests=np.array(list(self.digests), dtype=str), data=self.counts.data,
+                                indices=self.counts.indices, indptr=self.counts.indptr,
+                                shape=np.array(self.counts.shape))
+        os.replace(path + ".tmp", path)
+
+    def groups(self, by="year"):
+        """
+:param by: "song" (by song title), "album" (by album title) or "year"
+:type by: str
+:return: song titles / albums / years (sorted), and which lyrics each of them is made of (groups x lyrics, 0 or 1)
+:rtype: list of str, scipy.sparse.csr_matrix
+"""
+        if by not in BY:
+            raise ValueError(f"Statistics are by {', '.join(BY)}, not by {by}")
+        pairs = {(track[BY[by]], self.digests[track[4]]) for track in self.tracks if track[4] in self.digests}
+        keys = sorted({key for key, _ in pairs})
+        at = {key: number for number, key in enumerate(keys)}
+        rows = np.array([at[key] for key, _ in pairs], dtype=np.int64)
+        columns = np.array([row for _, row in pairs], dtype=np.int64)
+        return keys, sparse.csr_matrix((np.ones(len(pairs), dtype=np.int32), (rows, columns)),
+                                       shape=(len(keys), len(self.digests)))
+
+    def table(self, by="year", n=1):
+        """
+:param by: see doc. for groups
+:param n: terms of n words only (default: words, None for every term)
+:type n: int or None
+:return: song titles / albums / years, terms, and the number of times every term shows up in every one of them
+(groups x terms)
+:rtype: list of str, numpy.ndarray of str, scipy.sparse.csr_matrix
+"""
+        keys, incidence = self.groups(by)
+        terms = np.array(self.vocabulary, dtype=object)
+        if n is None:
+            return keys, terms, (incidence @ self.counts).tocsr()
+        columns = np.flatnonzero(np.frombuffer(self.sizes, dtype=np.int8) == n)
+        return keys, terms[columns], (incidence @ self.counts[:, columns]).tocsr()
+
+    def frequencies(self, by="year", n=1, top=20, relative=False):
+        """
+:param by: see doc. for groups
+:param n: see doc. for table
+:param top: number of terms for each song title / album / year (None for all of them)
+:type top: int or None
+:param relative: frequencies rather than counts, i.e counts over the number of terms (of n words) of the group
+:type relative: bool
+:return: most frequent terms of every song title / album / year, along with their count (or frequency)
+:rtype: dict of list of (str, int or float)
+"""
+        keys, terms, matrix = self.table(by, n)
+        if relative:
+            totals = np.asarray(matrix.sum(axis=1)).ravel()
+            matrix = (sparse.diags(1 / np.maximum(totals, 1)) @ matrix).tocsr()
+        return dict(zip(keys, ranked(matrix, terms, top)))
+
+    def tfidf(self, by="year", n=1, sublinear=False):
+        """
+TF-IDF of every term, song titles / albums / years being the documents : count of the term in the group (or 1 + its
+log if sublinear) times 1 + log((1 + number of groups) / (1 + number of groups using the term)), rows scaled to a
+(euclidean) norm of 1, i.e the way sklearn's TfidfTransformer has it.
+:param by: see doc. for groups
+:param n: see doc. for table
+:param sublinear: see above
+:type sublinear: bool
+:return: song titles / albums / years, terms, and TF-IDF (groups x terms)
+:rtype: list of str, numpy.ndarray of str, scipy.sparse.csr_matrix
+"""
+        keys, terms, matrix = self.table(by, n)
+        matrix = matrix.astype(np.float64)
+        if sublinear:
+            matrix.data = 1 + np.log(matrix.data)
+        used = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        matrix = matrix @ sparse.diags(1 + np.log((1 + len(keys)) / (1 + used)))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        return keys, terms, (sparse.diags(1 / np.where(norms, norms, 1)) @ matrix).tocsr()
+
+    def distinctive(self, by="year", n=1, top=10):
+        """
+:param by: see doc. for groups
+:param n: see doc. for table
+:param top: number of terms for each song title / album / year
+:type top: int
+:return: terms standing out the most in every song title / album / year (highest sublinear TF-IDF, see tfidf), along
+with their TF-IDF
+:rtype: dict of list of (str, float)
+"""
+        keys, terms, matrix = self.tfidf(by, n, sublinear=True)
+        return dict(zip(keys, ranked(matrix, terms, top)))
+
+    def growth(self, n=1):
+        """
+:param n: see doc. for table
+:return: for every year (years left aside), the number of words (or terms of n words), of distinct ones, of ones
+never used in the years before, and the size of the vocabulary so far
+:rtype: list of dict
+"""
+        keys, _, matrix = self.table("year", n)
+        years = [number for number, year in enumerate(keys) if year.isdigit()]
+        matrix = matrix[years].tocsc()
+        matrix.sort_indices()
+        # first year of every term, i.e the first row of its column
+        first = matrix.indices[matrix.indptr[:-1][np.diff(matrix.indptr) > 0]]
+        new = np.bincount(first, minlength=len(years))
+        totals = np.asarray(matrix.sum(axis=1)).ravel()
+        distinct = np.bincount(matrix.indices, minlength=len(years))
+        return [{"year": keys[number], "words": int(total), "distinct": int(count), "new": int(added),
+                 "vocabulary": int(size)}
+                for number, total, count, added, size in zip(years, totals, distinct, new, np.cumsum(new))]
+
+    def trend(self, terms, by="year"):
+        """
+:param terms: words or n-grams (of up to ngrams words, written any way, e.g "Hard Rain")
+:type terms: list of str
+:param by: see doc. for groups
+:return: count of every term in every song title / album / year
+:rtype: dict of dict of int
+"""
+        columns = []
+        for term in terms:
+            tokens = words(term)
+            if not 0 < len(tokens) <= self.ngrams:
+                raise ValueError(f'"{term}" isn\'t a term, terms are 1 to {self.ngrams} words')
+            columns.append(self.terms.get(" ".join(tokens)))
+        keys, incidence = self.groups(by)
+        found = [column for column in columns if column is not None]
+        matrix = (incidence @ self.counts[:, found]).toarray() if found else np.zeros((len(keys), 0), dtype=np.int32)
+        counts = {}
+        for term, column in zip(terms, columns):
+            values = matrix[:, found.index(column)] if column is not None else np.zeros(len(keys), dtype=np.int32)
+            counts[term] = dict(zip(keys, values.tolist()))
+        return counts
+
+
+def ranked(matrix, terms, top=None):
+    """
+:return: for every row of matrix, its (top) terms along with their value, highest first (ties in vocabulary order)
+:rtype: list of list of (str, int or float)
+"""
+    rows = []
+    for number in range(matrix.shape[0]):
+        start, end = matrix.indptr[number], matrix.indptr[number + 1]
+        values, columns = matrix.data[start:end], matrix.indices[start:end]
+        order = np.lexsort((columns, -values))[:top]
+        rows.append(list(zip(terms[columns[order]].tolist(), values[order].tolist())))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Word statistics of the lyrics of an artist, by song, album or year")
+    parser.add_argument("stats", help="[artist's_last_name]_stats.npz (see corpusgenius --stats)")
+    parser.add_argument("command", choices=("frequencies", "distinctive", "growth", "trend"),
+                        help="frequencies: most frequent terms, distinctive: terms standing out (TF-IDF), growth: "
+                             "vocabulary year after year, trend: count of --term by song, album or year")
+    parser.add_argument("--by", choices=sorted(BY), default="year", help="(default: year)")
+    parser.add_argument("--n", type=int, default=1, help="terms of N words (default: 1, i.e words)")
+    parser.add_argument("--top", type=int, default=10, help="number of terms listed (default: 10)")
+    parser.add_argument("--term", action="append", default=[], help="term to count, for trend (can be repeated)")
+    parser.add_argument("--json", action="store_true", help="everything, as json")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.stats):
+        parser.error(f"No such file : {args.stats}")
+    with np.load(args.stats, allow_pickle=False) as saved:
+        stats = TermStats(args.stats, ngrams=json.loads(str(saved["header"]))["ngrams"])
+    try:
+        if args.command == "frequencies":
+            found = stats.frequencies(by=args.by, n=args.n, top=args.top)
+        elif args.command == "distinctive":
+            found = stats.distinctive(by=args.by, n=args.n, top=args.top)
+        elif args.command == "growth":
+            found = stats.growth(n=args.n)
+        else:
+            found = stats.trend(args.term or parser.error("trend needs a --term"), by=args.by)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.json:
+        print(json.dumps(found, indent=2))
+        raise SystemExit
+
+    print(f"\n{stats.artist or args.stats} : {len(stats)} lyrics, {len(stats.vocabulary)} terms (up to {stats.ngrams} "
+          f"words)\n")
+    if args.command == "growth":
+        print(f"{'year':<8}{'words':>9}{'distinct':>10}{'new':>8}{'vocabulary':>12}")
+        for year in found:
+            print(f"{year['year']:<8}{year['words']:>9}{year['distinct']:>10}{year['new']:>8}{year['vocabulary']:>12}")
+    elif args.command == "trend":
+        for term, counts in found.items():
+            print(f"{term} : " + ", ".join(f"{key} ({count})" for key, count in counts.items() if count))
+    else:
+        for key, terms in found.items():
+            print(f"{key} : " + ", ".join(f"{term} ({value:.3g})" if isinstance(value, float) else f"{term} ({value})"
+                                         for term, value in terms))
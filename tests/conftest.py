@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+# the modules of CorpusGenius live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpusgenius  # noqa: E402
+from run_metrics import RunMetrics  # noqa: E402
+from title_matcher import TitleMatcher  # noqa: E402
+
+
+class FakeSong:
+    # a lyricsgenius.song.Song, as far as corpusgenius.song_metadata goes
+
+    def __init__(self, song_id, title, artist, lyrics, writers):
+        self._id, self.title, self.artist, self.lyrics = int(song_id), title, artist, lyrics
+        self.writer_artists = [{"name": name} for name in writers]
+
+
+class FakeGenius:
+    """
+genius.com as far as fetch_lyrics goes : songs by id, i.e {"105774": ("4th Time Around", lyrics, writers)}, and the
+songs (ids or titles) asked for, in order.
+"""
+
+    def __init__(self, songs=None, artist="Bob Dylan"):
+        self.songs = dict(songs or {})
+        self.artist = artist
+        self.requests = []
+
+    def _song(self, song_id):
+        title, lyrics, writers = self.songs[song_id]
+        return FakeSong(song_id, title, self.artist, lyrics, writers)
+
+    def song_with_lyrics(self, song_id):
+        self.requests.append(str(song_id))
+        return self._song(str(song_id)) if str(song_id) in self.songs else None
+
+    def search_song(self, title, artist):
+        self.requests.append(title)
+        for song_id, (found, *_) in self.songs.items():
+            if found == title:
+                return self._song(song_id)
+        return None
+
+
+@pytest.fixture
+def dylan(tmp_path, monkeypatch):
+    """
+corpusgenius set up for a run for Bob Dylan against a FakeGenius (corpusgenius.genius), writing to tmp_path, without
+a project store.
+"""
+    for name, value in {"genius": FakeGenius(), "artist_name": "Bob Dylan", "first_last": ["Bob", "Dylan"],
+                        "band_members": None, "output_dir": str(tmp_path), "project": None, "spill": None,
+                        "engine": None, "listed_versions": {}, "title_matcher": TitleMatcher(),
+                        "metrics": RunMetrics(), "print": lambda *args, **kwargs: None}.items():
+        monkeypatch.setattr(corpusgenius, name, value, raising=False)
+    return corpusgenius
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+import genius_client
+from genius_client import AdaptiveController
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # time.monotonic() as genius_client sees it, moved forward by hand
+    now = [1000.0]
+    monkeypatch.setattr(genius_client.time, "monotonic", lambda: now[0])
+    return now
+
+
+def healthy(controller, responses, latency=0.2):
+    for _ in range(responses):
+        controller.acquire()
+        controller.release(latency=latency, status=200)
+
+
+def test_healthy_responses_add_about_one_request_per_round_trip(clock):
+    controller = AdaptiveController(max_concurrency=4)
+    assert controller.limit == 1
+    healthy(controller, 1)
+    assert controller.limit == 2
+    healthy(controller, 2)
+    assert controller.limit == pytest.approx(2.9, abs=0.01)
+    healthy(controller, 100)
+    assert controller.limit == 4
+    assert controller.stats()["latency"] == 0.2
+
+
+def test_congestion_halves_the_limit_once_per_round_trip(clock):
+    controller = AdaptiveController(max_concurrency=8, min_concurrency=2)
+    healthy(controller, 100)
+    assert controller.limit == 8
+    for status in (429, 503, None):
+        controller.acquire()
+        controller.release(latency=0.2 if status else None, status=status)
+    # the 503 and the timeout ran into the same congestion as the 429
+    assert controller.limit == 4
+    clock[0] += 0.2
+    controller.acquire()
+    controller.release(status=429, latency=0.2)
+    assert controller.limit == 2
+    clock[0] += 0.2
+    controller.acquire()
+    controller.release(status=429, latency=0.2)
+    # never below min_concurrency
+    assert controller.limit == 2
+    assert {name: count for name, count in controller.stats().items()
+            if name in ("throttled", "server_errors", "timeouts", "decreases")} == {
+        "throttled": 3, "server_errors": 1, "timeouts": 1, "decreases": 3}
+
+
+def test_latency_spikes_count_as_congestion_once_latency_is_known(clock):
+    controller = AdaptiveController(max_concurrency=8)
+    controller.acquire()
+    # too few healthy responses to tell what's usual yet
+    controller.release(latency=5.0, status=200)
+    assert controller.stats()["slow"] == 0
+    healthy(controller, 20, latency=0.1)
+    limit = controller.limit
+    clock[0] += 1
+    controller.acquire()
+    controller.release(latency=5.0, status=200)
+    assert controller.stats()["slow"] == 1
+    assert controller.limit == limit / 2
+
+
+def test_requests_beyond_the_limit_wait_for_a_slot():
+    controller = AdaptiveController(max_concurrency=1)
+    controller.acquire()
+    let_in = threading.Event()
+
+    def request():
+        controller.acquire()
+        let_in.set()
+        controller.release(latency=0.1, status=200)
+
+    waiting = threading.Thread(target=request)
+    waiting.start()
+    assert not let_in.wait(0.1)
+    controller.release(latency=0.1, status=200)
+    assert let_in.wait(5)
+    waiting.join()
+
+
+def test_retry_after_holds_every_request_back():
+    controller = AdaptiveController(max_concurrency=4)
+    controller.acquire()
+    controller.release(status=429, latency=0.1, wait=0.3)
+    started = time.monotonic()
+    controller.acquire()
+    assert time.monotonic() - started >= 0.25
+    controller.release(latency=0.1, status=200)
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import threading
+
+import pytest
+
+import corpusgenius
+import mock_genius
+from corpus_batch import artist_directory, build_batch, load_manifest
+from genius_client import AsyncGenius
+
+
+@pytest.fixture(scope="module")
+def address():
+    # the stand-in for genius.com, a few songs per artist
+    server = mock_genius.MockGenius(("127.0.0.1", 0), mock_genius.Catalog(songs=4, page_size=1))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://%s:%d" % server.server_address[:2]
+    server.shutdown()
+    server.server_close()
+
+
+def test_load_manifest(tmp_path):
+    manifest = tmp_path / "artists.json"
+    manifest.write_text(json.dumps(["Bob Dylan",
+                                    {"artist": " The Beatles ", "band_members": "John Lennon, Paul McCartney"},
+                                    {"artist": "Paul Simon", "band_members": ["Paul Simon"]}]))
+    assert load_manifest(str(manifest)) == [
+        {"artist": "Bob Dylan", "band_members": None},
+        {"artist": "The Beatles", "band_members": {"John Lennon", "Paul McCartney"}},
+        {"artist": "Paul Simon", "band_members": {"Paul Simon"}}]
+    manifest.write_text(json.dumps([{"band_members": ["Art Garfunkel"]}]))
+    with pytest.raises(ValueError):
+        load_manifest(str(manifest))
+
+
+def test_an_artist_failing_does_not_stop_the_others(address, tmp_path):
+    parser = argparse.ArgumentParser()
+    corpusgenius.add_options(parser)
+    options = parser.parse_args(["--by-id", "--concurrency", "4", "--max-rate", "1000", "--no-cache"])
+    options.artists, options.output_dir, options.update = 2, str(tmp_path), False
+    genius, controller = corpusgenius.connect("mock-token", options)
+    genius.verbose = False
+    engine = AsyncGenius(genius, concurrency=options.concurrency)
+    mock_genius.route(genius._session, address)
+    artists = [{"artist": "Bob Dylan", "band_members": None},
+               {"artist": "Nobody Atall", "band_members": None},
+               {"artist": "The Beatles", "band_members": {"John Lennon", "Paul McCartney", "Lennon-McCartney"}}]
+    reports = []
+    try:
+        failed = build_batch(artists, genius, engine, options, reports=reports)
+    finally:
+        engine.close()
+    assert list(failed) == ["Nobody Atall"]
+    assert isinstance(failed["Nobody Atall"], LookupError)
+    for artist, last_name in (("Bob Dylan", "Dylan"), ("The Beatles", "Beatles")):
+        directory = artist_directory(str(tmp_path), artist)
+        assert os.path.exists(os.path.join(directory, last_name + "_corpus.csv"))
+    with open(os.path.join(artist_directory(str(tmp_path), "Nobody Atall"), "corpusgenius.log"),
+              encoding="utf-8") as log:
+        assert "LookupError: Nobody Atall not found on genius.com" in log.read()
+    # failed or not, every artist has its metrics
+    assert sorted(report["labels"]["artist"] for report in reports) == ["Bob Dylan", "Nobody Atall", "The Beatles"]
@@ -0,0 +1,127 @@
+import gc
+import weakref
+
+import pytest
+
+from lyrics_journal import LyricsJournal
+from project_store import ProjectStore
+from spill_store import SpillStore
+
+HARD_RAIN = "Oh, where have you been, my blue-eyed son?"
+SONGS = {"105186": ("A Hard Rain's A-Gonna Fall", HARD_RAIN, ["Bob Dylan"]),
+         "199634": ("A Fool Such as I", "Pardon me if Im sentimental", ["Bill Trader"]),
+         "105774": ("4th Time Around", "When she said dont waste your words", ["Bob Dylan"])}
+# a song once for every album it's on
+TRACKS = [{"song id": song_id, "album title": album, "year": year, "song title": SONGS[song_id][0]}
+          for song_id, album, year in [("105186", "The Freewheelin' Bob Dylan", "1963"),
+                                       ("199634", "Dylan (1973)", "1973"),
+                                       ("105186", "Bob Dylan's Greatest Hits Vol. II", "1971"),
+                                       ("105774", "Blonde on Blonde", "1966"),
+                                       ("105186", "The Bootleg Series Vol. 7", "2005"),
+                                       ("199634", "N/A", "N/A")]]
+
+
+@pytest.mark.parametrize("keep", ["memory", "spill", "store"])
+def test_songs_by_id_are_fetched_once_and_let_go_of(dylan, tmp_path, monkeypatch, keep):
+    dylan.genius.songs.update(SONGS)
+    if keep == "spill":
+        monkeypatch.setattr(dylan, "spill", SpillStore())
+    store = ProjectStore(str(tmp_path / "Dylan_project.sqlite")) if keep == "store" else None
+    journal = LyricsJournal(str(tmp_path / "Dylan_lyrics.journal"), "Bob Dylan")
+    fetched = {}
+    song_with_lyrics = dylan.genius.song_with_lyrics
+
+    def tracked(song_id):
+        song = song_with_lyrics(song_id)
+        fetched[str(song_id)] = weakref.ref(song)
+        return song
+
+    monkeypatch.setattr(dylan.genius, "song_with_lyrics", tracked)
+    record = journal.record
+    outcomes = []
+
+    def checked(line, outcome):
+        # once a song is done with, it isn't kept around for the albums listing it after
+        gc.collect()
+        assert [song_id for song_id, song in fetched.items() if song() is not None] in ([], [line["song id"]])
+        outcomes.append((line["album title"], outcome))
+        return record(line, outcome)
+
+    monkeypatch.setattr(journal, "record", checked)
+    lyrics_set, lyrics_by_years, not_by_artist = dylan.fetch_lyrics(TRACKS, journal, by_id=True, store=store)
+    assert dylan.genius.requests == ["105186", "199634", "105774"]
+    hard_rain = {"status": "original", "lyrics": dylan.clean_lyrics(HARD_RAIN)}
+    cover = {"status": "not_by_artist", "writers": ["Bill Trader"]}
+    fourth_time = {"status": "original", "lyrics": dylan.clean_lyrics(SONGS["105774"][1])}
+    assert [outcome for _, outcome in outcomes] == [hard_rain, cover, hard_rain, fourth_time, hard_rain, cover]
+    assert {title: values for title, values in lyrics_set.items()}["A Hard Rain's A-Gonna Fall"] == {
+        dylan.clean_lyrics(HARD_RAIN)}
+    assert sorted(year for year, _ in lyrics_by_years.items()) == ["1963", "1966", "1971", "2005"]
+    assert len(dict(not_by_artist.items())["A Fool Such as I"]) == 2
+    if store is not None:
+        # every track knows the song it got
+        assert [song["id"] for _, song, _ in store.tracks()] == [line["song id"] for line in TRACKS]
+        store.close()
+    if dylan.spill is not None:
+        dylan.spill.close()
+    journal.close()
+
+
+class Interrupted(Exception):
+    pass
+
+
+def lyrics_files(dylan, directory, monkeypatch, interrupt=None):
+    # fetch_lyrics then export_lyrics on TRACKS in directory, run again if interrupted (raised while fetching song id
+    # interrupt) : the CSV files written and the songs asked genius.com for, run by run
+    monkeypatch.setattr(dylan, "output_dir", str(directory))
+    requests = []
+    song_with_lyrics = dylan.genius.song_with_lyrics
+
+    def interrupted(song_id):
+        if str(song_id) == interrupt and not requests:
+            raise Interrupted
+        return song_with_lyrics(song_id)
+
+    monkeypatch.setattr(dylan.genius, "song_with_lyrics", interrupted)
+    while True:
+        dylan.genius.requests.clear()
+        journal = LyricsJournal(str(directory / "Dylan_lyrics.journal"), "Bob Dylan")
+        try:
+            dylan.export_lyrics(*dylan.fetch_lyrics(TRACKS, journal, by_id=True, retries=0), journal)
+        except Interrupted:
+            requests.append(list(dylan.genius.requests))
+            journal._file.close()
+            # the next run is a process of its own
+            if dylan.spill is not None:
+                dylan.spill.close()
+                monkeypatch.setattr(dylan, "spill", SpillStore())
+            continue
+        requests.append(list(dylan.genius.requests))
+        break
+    files = {}
+    for file_name in ("Dylan_lyrics.csv", "Dylan_lyrics_by_years.csv", "songs_not_by_Dylan.csv"):
+        with open(directory / file_name, encoding="utf-8") as data:
+            files[file_name] = data.read()
+    return files, requests
+
+
+@pytest.mark.parametrize("keep", ["memory", "spill"])
+def test_interrupted_run_is_resumed_from_the_journal(dylan, tmp_path, monkeypatch, keep):
+    dylan.genius.songs.update(SONGS)
+    if keep == "spill":
+        monkeypatch.setattr(dylan, "spill", SpillStore())
+    (tmp_path / "once").mkdir()
+    (tmp_path / "resumed").mkdir()
+    files, requests = lyrics_files(dylan, tmp_path / "once", monkeypatch)
+    assert requests == [["105186", "199634", "105774"]]
+    if keep == "spill":
+        dylan.spill.close()
+        monkeypatch.setattr(dylan, "spill", SpillStore())
+    resumed, requests = lyrics_files(dylan, tmp_path / "resumed", monkeypatch, interrupt="105774")
+    # the first 3 tracks are journaled : only the songs of the 3 tracks left are fetched on the next run
+    assert requests == [["105186", "199634"], ["105774", "105186", "199634"]]
+    assert resumed == files
+    assert not (tmp_path / "resumed" / "Dylan_lyrics.journal").exists()
+    if dylan.spill is not None:
+        dylan.spill.close()
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+import genius_cache
+from genius_cache import DAY, MISS, ResponseCache
+
+ALBUM_TRACKS = "https://genius.com/api/albums/13573/tracks"
+SONG_PAGE = "https://genius.com/Bob-dylan-like-a-rolling-stone-lyrics"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # time.time() as genius_cache sees it, moved forward by hand
+    now = [1_000_000.0]
+    monkeypatch.setattr(genius_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_endpoint_and_key():
+    assert ResponseCache.endpoint("https://api.genius.com/artists/181/songs") == "artists"
+    assert ResponseCache.endpoint(ALBUM_TRACKS) == "albums"
+    assert ResponseCache.endpoint(SONG_PAGE) == "pages"
+    # unset parameters are left out, the order they're given in doesn't matter
+    assert (ResponseCache.key(ALBUM_TRACKS, {"page": 1, "per_page": 50, "text_format": None})
+            == ResponseCache.key(ALBUM_TRACKS, {"per_page": 50, "page": 1}))
+    assert ResponseCache.key(ALBUM_TRACKS, {"page": 1}) != ResponseCache.key(ALBUM_TRACKS, {"page": 2})
+
+
+def test_responses_expire_by_endpoint(cache, clock):
+    tracks, page = ResponseCache.key(ALBUM_TRACKS, {"page": 1}), ResponseCache.key(SONG_PAGE)
+    cache.put(tracks, "albums", {"tracks": [{"number": 1}]})
+    # 404 pages are cached too
+    cache.put(page, "pages", None)
+    assert cache.get(tracks, "albums") == {"tracks": [{"number": 1}]}
+    assert cache.get(page, "pages") is None
+    clock[0] += 8 * DAY
+    assert cache.get(tracks, "albums") is MISS
+    assert cache.get(page, "pages") is None
+    clock[0] += 30 * DAY
+    assert cache.get(page, "pages") is MISS
+    assert cache.stats() == {"hits": 3, "misses": 2, "hit_ratio": 0.6,
+                             "by_endpoint": {"albums": {"hits": 1, "misses": 1}, "pages": {"hits": 2, "misses": 1}}}
+
+
+def test_refresh_misses_everything(tmp_path):
+    key = ResponseCache.key(SONG_PAGE)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put(key, "pages", "<html>")
+    cache.close()
+    refreshed = ResponseCache(str(tmp_path / "cache.sqlite"), refresh=True)
+    assert refreshed.get(key, "pages") is MISS
+    refreshed.close()
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get(key, "pages") == "<html>"
+    cache.close()
+
+
+def test_least_recently_used_are_evicted_first(tmp_path, clock):
+    # 4 responses of 12 bytes fit, a 5th one makes room by evicting down to 90% of the limit
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=48)
+    keys = [ResponseCache.key(SONG_PAGE, {"n": n}) for n in range(5)]
+    for key in keys[:4]:
+        clock[0] += 1
+        cache.put(key, "pages", "0123456789")
+    clock[0] += 1
+    # the oldest one put, but the most recently used
+    cache.get(keys[0], "pages")
+    clock[0] += 1
+    cache.put(keys[4], "pages", "0123456789")
+    assert [cache.get(key, "pages") is not MISS for key in keys] == [True, False, False, True, True]
+    assert cache._size == 36
+    cache.close()
+    # the size stored is worked out again from the file
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=48)
+    assert cache._size == 36
+    cache.close()
+
+
+def test_hits_and_misses_are_counted_across_threads(cache):
+    key = ResponseCache.key(SONG_PAGE)
+    cache.put(key, "pages", "<html>")
+
+    def lookups():
+        for _ in range(200):
+            cache.get(key, "pages")
+            cache.get(ResponseCache.key(ALBUM_TRACKS), "albums")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["by_endpoint"] == {"albums": {"hits": 0, "misses": 1600},
+                                            "pages": {"hits": 1600, "misses": 0}}
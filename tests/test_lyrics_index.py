@@ -0,0 +1,100 @@
+import csv
+
+import pytest
+
+from lyrics_index import LyricsIndex, build_index, corpus_songs, words
+
+SONGS = [
+    {"title": "Blowin in the Wind", "song_id": "1", "years": ["1963"],
+     "lyrics": "How many roads must a man walk down. The answer my friend is blowin' in the wind, "
+               "the answer is blowin in the wind"},
+    {"title": "A Hard Rains A-Gonna Fall", "song_id": "2", "years": ["1963"],
+     "lyrics": "Oh where have you been my blue-eyed son. And its a hard rain's a-gonna fall"},
+    {"title": "Idiot Wind", "song_id": "3", "years": ["1975"],
+     "lyrics": "Idiot wind blowing every time you move your mouth, blowing down the back roads heading south"},
+    {"title": "Love Minus Zero", "song_id": "4", "years": ["1965"],
+     "lyrics": "My love she speaks like silence. My love she laughs like the flowers"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "Dylan_lyrics.index")
+    assert build_index(SONGS, path, artist="Bob Dylan") == (4, len({word for song in SONGS
+                                                                    for word in words(song["lyrics"])}))
+    index = LyricsIndex(path)
+    yield index
+    index.close()
+
+
+def titles(hits):
+    return [hit["title"] for hit in hits]
+
+
+def test_words_are_normalized():
+    assert words("Blowin' in the Wind, Señor") == ["blowin", "in", "the", "wind", "senor"]
+
+
+def test_word(index):
+    hits = index.search("wind")
+    assert titles(hits) == ["Blowin in the Wind", "Idiot Wind"]
+    assert hits[0] == {"artist": "Bob Dylan", "title": "Blowin in the Wind", "song_id": "1", "years": ["1963"],
+                       "offsets": [16, 23]}
+
+
+def test_phrase(index):
+    assert titles(index.search('"Blowin\' in the Wind"')) == ["Blowin in the Wind"]
+    assert index.search('"blowin in the wind"')[0]["offsets"] == [13, 20]
+    assert index.search('"the wind blowin"') == []
+    assert titles(index.search('"hard rain\'s a-gonna fall"')) == ["A Hard Rains A-Gonna Fall"]
+    assert index.search('"hard rains agonna fall"') == []
+
+
+def test_boolean(index):
+    assert titles(index.search("wind roads")) == ["Blowin in the Wind", "Idiot Wind"]
+    assert titles(index.search("wind AND roads")) == titles(index.search("wind roads"))
+    assert titles(index.search("love OR rains")) == ["Love Minus Zero", "A Hard Rains A-Gonna Fall"]
+    assert titles(index.search("love OR rain")) == ["Love Minus Zero"]
+    assert titles(index.search('wind NOT "blowin in the wind"')) == ["Idiot Wind"]
+    assert titles(index.search("(love OR rains) AND (silence OR son)")) == [
+        "Love Minus Zero", "A Hard Rains A-Gonna Fall"]
+    assert titles(index.search("wind and roads")) == []
+
+
+def test_not(index):
+    # nowhere in a song is where it doesn't have a word, i.e no offsets, title order
+    hits = index.search("NOT wind")
+    assert titles(hits) == ["A Hard Rains A-Gonna Fall", "Love Minus Zero"]
+    assert all(hit["offsets"] == [] for hit in hits)
+    assert index.search("NOT NOT wind") == index.search("wind")
+    assert index.search("NOT NOT NOT wind") == hits
+
+
+def test_years(index):
+    assert titles(index.search("wind", years=["1975"])) == ["Idiot Wind"]
+    assert titles(index.search("wind OR love", years=["1963", "1965"])) == ["Blowin in the Wind", "Love Minus Zero"]
+
+
+@pytest.mark.parametrize("query", ["(wind", "wind )", "wind OR", "AND"])
+def test_bad_query(index, query):
+    with pytest.raises(ValueError):
+        index.search(query)
+
+
+def test_corpus_songs(tmp_path):
+    lyrics = {"Idiot Wind": {"Idiot wind"}, "Mr. Tambourine Man": {"Hey Mr. Tambourine Man"}}
+
+    def write(file_name, header, rows):
+        with open(tmp_path / file_name, "w", encoding="utf-8", newline="") as data:
+            writer = csv.writer(data)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    write("Dylan_lyrics.csv", ["", "lyrics"], [(title, str(texts)) for title, texts in lyrics.items()])
+    write("Dylan_tracks.csv", ["album title", "song title", "song id", "year"],
+          [("Blood on the Tracks", "Idiot Wind", "3", "1975"), ("Bootlegs", "Mr. Tambourine Man", "5", "N/A")])
+    write("Dylan_lyrics_by_years.csv", ["", "lyrics"],
+          [("1975", str({"Idiot wind"})), ("1976", str({"Idiot wind"})), ("N/A", str({"Hey Mr. Tambourine Man"}))])
+    assert list(corpus_songs(str(tmp_path / "Dylan_lyrics.csv"))) == [
+        {"title": "Idiot Wind", "song_id": "3", "years": ["1975", "1976"], "lyrics": "Idiot wind"},
+        {"title": "Mr. Tambourine Man", "song_id": "5", "years": [], "lyrics": "Hey Mr. Tambourine Man"}]
@@ -0,0 +1,107 @@
+from lyrics_journal import LyricsJournal
+from project_store import ProjectStore
+
+
+def track(song_id, title, album="Highway 61 Revisited", year="1965"):
+    return {"song id": song_id, "album title": album, "year": year, "song title": title}
+
+
+def test_resume_skips_done_songs_and_retries_failed_ones(tmp_path):
+    path = str(tmp_path / "Dylan_lyrics.journal")
+    journal = LyricsJournal(path, "Bob Dylan")
+    journal.record(track("1", "Like a Rolling Stone"), {"status": "original", "lyrics": "Once upon a time"})
+    journal.record(track("2", "Tombstone Blues"), {"status": "timeout"})
+    journal.record(track("3", "Desolation Row"), {"status": "failed"})
+    journal.record(track("3", "Desolation Row"), {"status": "missing"})
+    journal._file.close()
+
+    resumed = LyricsJournal(path, "Bob Dylan")
+    assert resumed.resumed
+    assert resumed.done == {LyricsJournal.key(track("1", "Like a Rolling Stone")),
+                            LyricsJournal.key(track("3", "Desolation Row"))}
+    assert resumed.outstanding == {LyricsJournal.key(track("2", "Tombstone Blues"))}
+    assert [record["title"] for record in resumed.replay()] == ["Like a Rolling Stone", "Desolation Row"]
+    assert resumed.close() == 1
+
+
+def test_line_cut_short_by_a_crash_is_ignored(tmp_path):
+    path = str(tmp_path / "Dylan_lyrics.journal")
+    journal = LyricsJournal(path, "Bob Dylan")
+    journal.record(track("1", "Like a Rolling Stone"), {"status": "missing"})
+    journal._file.write('{"status": "original", "key": "2\\tHighw')
+    journal._file.close()
+
+    resumed = LyricsJournal(path, "Bob Dylan")
+    assert resumed.done == {LyricsJournal.key(track("1", "Like a Rolling Stone"))}
+    assert len(list(resumed.replay())) == 1
+
+
+def test_journal_for_someone_else_starts_over(tmp_path):
+    path = str(tmp_path / "Beatles_lyrics.journal")
+    journal = LyricsJournal(path, "The Beatles", {"John Lennon", "Paul McCartney"})
+    journal.record(track("1", "Help!", "Help!"), {"status": "missing"})
+    journal._file.close()
+
+    other = LyricsJournal(path, "The Beatles", {"John Lennon", "Paul McCartney", "Lennon-McCartney"})
+    assert not other.resumed
+    assert other.done == set()
+
+
+def test_store_has_the_song_before_the_journal_does(tmp_path, monkeypatch, dylan):
+    # a crash right after the journal has a song must not leave the store without it, or resuming skips it for good
+    store = ProjectStore(str(tmp_path / "Dylan_project.sqlite"))
+    journal = LyricsJournal(str(tmp_path / "Dylan_lyrics.journal"), "Bob Dylan")
+    journaled = []
+    record = journal.record
+
+    def checked(line, outcome):
+        stored = {LyricsJournal.key(song) for song, _, _ in store.tracks()}
+        assert LyricsJournal.key(line) in stored
+        journaled.append(line["song title"])
+        return record(line, outcome)
+
+    monkeypatch.setattr(journal, "record", checked)
+    tracks = [track("1", "Like a Rolling Stone"), track("2", "Tombstone Blues")]
+    dylan.fetch_lyrics(tracks, journal, retries=0, store=store)
+    assert journaled == ["Like a Rolling Stone", "Tombstone Blues"]
+    journal.close()
+    store.close()
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_song_stored_but_not_journaled_is_neither_fetched_again_nor_lost(tmp_path, monkeypatch, dylan):
+    dylan.genius.songs.update({"1": ("Like a Rolling Stone", "Once upon a time you dressed so fine", ["Bob Dylan"]),
+                               "2": ("Tombstone Blues", "The sweet pretty things are in bed now", ["Bob Dylan"])})
+    tracks = [track("1", "Like a Rolling Stone"), track("2", "Tombstone Blues")]
+    store = ProjectStore(str(tmp_path / "Dylan_project.sqlite"))
+    journal = LyricsJournal(str(tmp_path / "Dylan_lyrics.journal"), "Bob Dylan")
+    record = journal.record
+
+    def interrupted(line, outcome):
+        # killed once Tombstone Blues is in the store, before the journal has it
+        if line["song title"] == "Tombstone Blues":
+            raise Interrupted
+        return record(line, outcome)
+
+    monkeypatch.setattr(journal, "record", interrupted)
+    try:
+        dylan.fetch_lyrics(tracks, journal, by_id=True, retries=0, store=store)
+    except Interrupted:
+        pass
+    journal._file.close()
+    store.close()
+    assert dylan.genius.requests == ["1", "2"]
+
+    dylan.genius.requests.clear()
+    store = ProjectStore(str(tmp_path / "Dylan_project.sqlite"))
+    journal = LyricsJournal(str(tmp_path / "Dylan_lyrics.journal"), "Bob Dylan")
+    assert journal.resumed
+    lyrics_set, _, _ = dylan.fetch_lyrics(tracks, journal, by_id=True, retries=0, store=store)
+    assert dylan.genius.requests == []
+    assert dict(lyrics_set.items()) == {"Like a Rolling Stone": {"Once upon a time you dressed so fine"},
+                                        "Tombstone Blues": {"The sweet pretty things are in bed now"}}
+    journal.close()
+    store.close()
@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from unidecode import unidecode
+
+from lyrics_journal import LyricsJournal
+from lyrics_normalizer import LyricsNormalizer, NormalizationStage
+
+RAW = ["I’ve stepped in the middle\nof seven sad forests\n", "Hey! Mr. Tambourine Man, play a song for me", None,
+       "  Mama, take this badge off of me\nI can't use it anymore  ",
+       "Señor, señor, do you know where we're headin'?"]
+
+
+def legacy(raw_lyrics):
+    # what CorpusGenius always did to lyrics
+    return unidecode(raw_lyrics.replace("\n", " ")).strip().replace("'", "")
+
+
+def test_normalizer_does_what_corpusgenius_always_did():
+    normalize = LyricsNormalizer()
+    assert [normalize(raw) for raw in RAW if raw is not None] == [legacy(raw) for raw in RAW if raw is not None]
+    assert LyricsNormalizer(line_breaks=True)(RAW[0]) == "Ive stepped in the middle\nof seven sad forests"
+
+
+def test_one_process_normalizes_right_away():
+    stage = NormalizationStage(LyricsNormalizer())
+    assert stage.put("Desolation Row", RAW[0]) == [("Desolation Row", legacy(RAW[0]))]
+    assert stage.put("Blue Moon", None) == [("Blue Moon", None)]
+    assert stage.drain() == []
+    stage.close()
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 64])
+def test_items_come_out_in_the_order_they_went_in(batch_size):
+    stage = NormalizationStage(LyricsNormalizer(), processes=2, batch_size=batch_size)
+    items = [(n, raw) for n in range(20) for raw in RAW]
+    done = []
+    for item, raw in items:
+        done.extend(stage.put(item, raw))
+    if batch_size == 64:
+        # nothing submitted yet, a batch isn't full
+        assert done == []
+    done.extend(stage.drain())
+    stage.close()
+    assert done == [(item, legacy(raw) if raw is not None else None) for item, raw in items]
+
+
+def test_shared_pool_outlives_the_stage():
+    with ProcessPoolExecutor(2) as pool:
+        for artist in ("Bob Dylan", "The Beatles"):
+            stage = NormalizationStage(LyricsNormalizer(), processes=2, batch_size=2, pool=pool)
+            done = [done for raw in RAW for done in stage.put(artist, raw)] + stage.drain()
+            stage.close()
+            assert [lyrics for _, lyrics in done] == [legacy(raw) if raw is not None else None for raw in RAW]
+
+
+def test_fetch_lyrics_in_batches_is_the_same_as_one_by_one(dylan, tmp_path, monkeypatch):
+    dylan.genius.songs.update({str(n): (f"Song {n}", raw, ["Bob Dylan"] if n % 3 else ["Gordon Lightfoot"])
+                               for n, raw in enumerate(RAW) if raw is not None})
+    tracks = [{"song id": str(n), "album title": "Self Portrait", "year": "1970", "song title": f"Song {n}"}
+              for n in range(len(RAW))]
+    results = []
+    for processes in (1, 2):
+        stage = NormalizationStage(LyricsNormalizer(), processes=processes, batch_size=2)
+        monkeypatch.setattr(dylan, "normalization", stage)
+        journal = LyricsJournal(str(tmp_path / f"{processes}.journal"), "Bob Dylan")
+        lyrics_set, lyrics_by_years, not_by_artist = dylan.fetch_lyrics(tracks, journal, by_id=True, retries=0)
+        stage.close()
+        journal.close()
+        results.append((dict(lyrics_set), dict(lyrics_by_years), dict(not_by_artist)))
+    assert results[0] == results[1]
+    assert results[0][0]["Song 1"] == {legacy(RAW[1])}
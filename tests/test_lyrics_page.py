@@ -0,0 +1,53 @@
+import pytest
+
+import mock_genius
+from lyrics_page import UNHANDLED, check, extract_lyrics, odd_pages, page_lyrics, soup_lyrics
+
+CURRENT = ('<html><body><div class="Lyrics__Root-sc-1 x"><div class="Lyrics__Container-sc-2">[Verse 1]<br/>'
+           'How many roads must a man walk down<br/>Before you call him a man?<br/><br/>[Chorus]<br/>'
+           'The answer, my friend, is <i>blowin&#x27;</i> in the wind</div></div><div class="footer">x</div>'
+           '</body></html>')
+
+
+@pytest.fixture(scope="module")
+def pages():
+    catalog = mock_genius.Catalog(songs=25, page_size=4)
+    return [page for page in map(catalog.page, catalog.pages) if page is not None]
+
+
+def test_same_lyrics_as_beautifulsoup(pages):
+    assert pages
+    different, unhandled = check(pages)
+    assert different == []
+    # pages as genius.com has them are never left to BeautifulSoup
+    assert unhandled == 0
+
+
+def test_odd_pages_are_the_same_or_left_to_beautifulsoup():
+    different, unhandled = check(odd_pages(number=300, seed=7))
+    assert different == []
+    assert unhandled > 0
+
+
+def test_section_headers():
+    lyrics = extract_lyrics(CURRENT)
+    assert lyrics == soup_lyrics(CURRENT)
+    assert lyrics.startswith("How many roads must a man walk down\n") and "[" not in lyrics
+    assert extract_lyrics(CURRENT, remove_section_headers=False) == soup_lyrics(CURRENT, remove_section_headers=False)
+    assert extract_lyrics(CURRENT, remove_section_headers=False).startswith("[Verse 1]\nHow many roads")
+
+
+@pytest.mark.parametrize("page", [
+    '<div class="Lyrics__Root">A<script>x</script>B</div>',
+    '<div class="Lyrics__Root">unclosed',
+    '<!-- <div class="lyrics">commented</div> --><div class="Lyrics__Root">yes</div>',
+])
+def test_beautifulsoup_takes_over_what_extract_lyrics_isnt_sure_of(page):
+    assert extract_lyrics(page) is UNHANDLED
+    assert page_lyrics(page) == (soup_lyrics(page), True)
+
+
+def test_no_lyrics_div():
+    page = '<div class="lyricsplus">no</div><p>no lyrics here</p>'
+    assert extract_lyrics(page) is None
+    assert page_lyrics(page) == (None, False)
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from near_duplicates import VariantIndex, apply_diff, lsh_params, shingles, word_diff
+
+STUDIO = ("Once upon a time you dressed so fine threw the bums a dime in your prime didnt you People call say "
+          "beware doll youre bound to fall you thought they were all kidding you You used to laugh about everybody "
+          "that was hanging out Now you dont talk so loud now you dont seem so proud about having to be scrounging "
+          "your next meal How does it feel how does it feel to be without a home like a complete unknown like a "
+          "rolling stone")
+LIVE = STUDIO.replace("People call say", "People call say hey").replace("rolling stone", "rolling stone yeah")
+DESOLATION = ("They are selling postcards of the hanging they are painting the passports brown the beauty parlor "
+              "is filled with sailors the circus is in town here comes the blind commissioner they have got him "
+              "in a trance one hand is tied to the tight rope walker the other is in his pants")
+
+
+@pytest.mark.parametrize("canonical, variant", [
+    (STUDIO, LIVE),
+    (LIVE, STUDIO),
+    ("  Hey Mr. Tambourine Man\n play a song for me\n", "Hey! Mr. Tambourine Man,\n\n play a song for me  "),
+    (STUDIO, DESOLATION),
+    ("", "Blowin in the wind"),
+    ("Blowin in the wind", ""),
+    (STUDIO, STUDIO),
+])
+def test_word_diff_round_trip(canonical, variant):
+    diff = word_diff(canonical, variant)
+    assert apply_diff(canonical, diff) == variant
+    if canonical == variant:
+        assert diff == []
+
+
+def test_diff_of_a_variant_is_small():
+    # positions among the words (along with the spaces after them) of the canonical version
+    last = len(STUDIO.split()) - 1
+    assert word_diff(STUDIO, LIVE) == [[21, 21, "hey "], [last, last + 1, "stone yeah"]]
+
+
+def test_lsh_params_meet_the_recall():
+    for threshold in (0.5, 0.8, 0.9):
+        bands, rows = lsh_params(threshold, 128)
+        assert bands * rows <= 128
+        assert 1 - (1 - threshold ** rows) ** bands >= 0.95
+
+
+def test_shingles():
+    assert shingles("Like a Rolling Stone!") == shingles("like a, rolling stone")
+    assert len(shingles("Like a Rolling Stone")) == 2
+    assert len(shingles("Hurricane")) == 1
+    assert shingles("...") == set()
+
+
+def test_variants_are_clustered_with_the_canonical_version_first():
+    index = VariantIndex(threshold=0.7)
+    index.add("Like a Rolling Stone (Live 1966)", LIVE)
+    index.add("Desolation Row", DESOLATION)
+    index.add("Like a Rolling Stone", STUDIO)
+    index.add("Like a Rolling Stone (Take 4)", STUDIO.replace("prime", "prime baby"))
+    index.add("Instrumental", "")
+    clusters = index.clusters()
+    assert [[key for key, _ in cluster] for cluster in clusters] == [
+        ["Like a Rolling Stone", "Like a Rolling Stone (Live 1966)", "Like a Rolling Stone (Take 4)"],
+        ["Desolation Row"], ["Instrumental"]]
+    assert all(0.7 <= similarity < 1 for _, similarity in clusters[0][1:])
+
+
+def test_unrelated_lyrics_are_not_all_compared():
+    rand = random.Random(1)
+    words = STUDIO.split() + DESOLATION.split()
+    index = VariantIndex(threshold=0.8)
+    compared = []
+    similarity = index.similarity
+
+    def counted(first, second):
+        compared.append((first, second))
+        return similarity(first, second)
+
+    index.similarity = counted
+    songs = 300
+    for number in range(songs):
+        index.add(number, " ".join(rand.choice(words) for _ in range(80)))
+    assert len(index.clusters()) == songs
+    assert len(compared) < songs * (songs - 1) / 2 / 20
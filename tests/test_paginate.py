@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from genius_client import AsyncGenius, follow_pages, page_entries, paginate
+
+ALBUMS = [{"id": album_id, "name": f"album {album_id}"} for album_id in range(1, 121)]
+
+
+class Listing:
+    # genius.artist_albums as far as pagination goes, pages asked for (in order) and by which thread
+
+    def __init__(self, entries, per_page=50):
+        self.entries, self.per_page = entries, per_page
+        self.asked = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, artist_id, page=1, per_page=None):
+        with self._lock:
+            self.asked.append(page)
+            self.threads.add(threading.current_thread().name)
+        start = (page - 1) * self.per_page
+        return {"albums": self.entries[start:start + self.per_page],
+                "next_page": page + 1 if start + self.per_page < len(self.entries) else None}
+
+    def pool_size(self, connections):
+        # AsyncGenius sizes the connection pool of its client
+        pass
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_every_page_is_fetched_once_in_order(prefetch):
+    listing = Listing(ALBUMS)
+    assert list(paginate(listing, prefetch=prefetch, artist_id=181)) == ALBUMS
+    assert listing.asked == [1, 2, 3]
+    assert (threading.current_thread().name in listing.threads) is not prefetch
+
+
+def test_single_and_empty_listings():
+    assert list(paginate(Listing(ALBUMS[:3]), artist_id=181)) == ALBUMS[:3]
+    empty = Listing([])
+    assert list(paginate(empty, prefetch=True, artist_id=181)) == []
+    assert empty.asked == [1]
+
+
+def test_next_page_goes_out_while_the_current_one_is_dealt_with():
+    listing = Listing(ALBUMS)
+    pages = follow_pages(listing, prefetch=True, artist_id=181)
+    assert next(pages)["albums"] == ALBUMS[:50]
+    # page 2 is on its way, page 3 isn't asked for before page 2 says it's there
+    for _ in range(100):
+        if listing.asked == [1, 2]:
+            break
+        time.sleep(0.01)
+    assert listing.asked == [1, 2]
+    assert [entry["id"] for entry in page_entries(pages)] == list(range(51, 121))
+    assert listing.asked == [1, 2, 3]
+
+
+def test_engine_pages():
+    listing = Listing(ALBUMS, per_page=20)
+    engine = AsyncGenius(listing, concurrency=2)
+    try:
+        assert list(page_entries(engine.pages(listing, artist_id=181, per_page=20))) == ALBUMS
+    finally:
+        engine.close()
+    assert listing.asked == [1, 2, 3, 4, 5, 6]
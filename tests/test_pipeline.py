@@ -0,0 +1,38 @@
+ALBUMS = [{"year": "1965", "album title": "Highway 61 Revisited", "album id": 13573},
+          {"year": "1966", "album title": "Blonde on Blonde", "album id": 12290}]
+SONGS = {"1": ("Like a Rolling Stone", "Once upon a time you dressed so fine", ["Bob Dylan"]),
+         "2": ("Desolation Row", "They're selling postcards of the hanging", ["Bob Dylan"]),
+         "3": ("Visions of Johanna", "Aint it just like the night", ["Bob Dylan"]),
+         "4": ("4th Time Around", "When she said dont waste your words", ["Bob Dylan"])}
+LISTING = {"Highway 61 Revisited": ["1", "2"], "Blonde on Blonde": ["3", "4"]}
+
+
+def test_titles_are_added_to_the_title_matcher_before_they_are_looked_up(dylan, monkeypatch):
+    dylan.genius.songs.update(SONGS)
+    events = []
+
+    def track_records(albums, workers=1):
+        for album in albums:
+            for song_id in LISTING[album["album title"]]:
+                yield {"album title": album["album title"], "song title": SONGS[song_id][0],
+                       "song id": int(song_id), "year": album["year"]}
+
+    monkeypatch.setattr(dylan, "album_records", lambda genius_artist_id: iter(ALBUMS))
+    monkeypatch.setattr(dylan, "track_records", track_records)
+    add, search_song = dylan.title_matcher.add, dylan.genius.search_song
+
+    def added(titles):
+        titles = list(titles)
+        events.extend(("add", title) for title in titles)
+        add(titles)
+
+    def searched(title, artist):
+        events.append(("search", title))
+        return search_song(title, artist)
+
+    monkeypatch.setattr(dylan.title_matcher, "add", added)
+    monkeypatch.setattr(dylan.genius, "search_song", searched)
+    dylan.run_pipeline(181)
+    for title, _, _ in SONGS.values():
+        assert events.index(("add", title)) < events.index(("search", title))
+    assert [match for match, _ in dylan.title_matcher.resolve("Visions of Johanna (Live)")] == ["Visions of Johanna"]
@@ -0,0 +1,64 @@
+import json
+import threading
+
+import run_metrics
+from run_metrics import RunMetrics
+
+
+def test_peak_rss_is_reset_only_when_no_stage_is_open(monkeypatch):
+    resets = []
+    monkeypatch.setattr(run_metrics, "reset_peak_rss", lambda: resets.append(threading.current_thread().name))
+    pipeline, other_artist = RunMetrics(), RunMetrics()
+    opened, done = threading.Event(), threading.Event()
+
+    def album_tracks():
+        with pipeline.stage("album_tracks"):
+            opened.set()
+            done.wait(5)
+
+    background = threading.Thread(target=album_tracks, name="background")
+    background.start()
+    opened.wait(5)
+    # stages starting while another one (of another thread or of another run) is open leave the peak alone
+    with pipeline.stage("lyrics_by_song"):
+        with pipeline.stage("journal"):
+            pass
+        with other_artist.stage("artist_albums"):
+            pass
+    done.set()
+    background.join()
+    assert resets == ["background"]
+    assert run_metrics.open_stages == 0
+    with pipeline.stage("corpus_generator"):
+        pass
+    assert resets == ["background", threading.current_thread().name]
+    assert [stage["stage"] for stage in pipeline.stages] == ["journal", "lyrics_by_song", "album_tracks",
+                                                            "corpus_generator"]
+    assert [stage["stage"] for stage in other_artist.stages] == ["artist_albums"]
+
+
+def test_stage_failing_is_timed_and_closed():
+    metrics = RunMetrics()
+    try:
+        with metrics.stage("lyrics_by_song"):
+            raise KeyError("song title")
+    except KeyError:
+        pass
+    assert run_metrics.open_stages == 0
+    assert [stage["stage"] for stage in metrics.stages] == ["lyrics_by_song"]
+
+
+def test_report(tmp_path):
+    metrics = RunMetrics(labels={"artist": "Bob Dylan"})
+    with metrics.stage("lyrics_by_song"):
+        with metrics.timed("title_matching"):
+            pass
+        metrics.request("songs", 0.2, 200)
+        metrics.request("songs", 3.0, 429)
+        metrics.song("original")
+        metrics.song("mismatch")
+    report = metrics.report()
+    assert report["requests"]["total"] == 2
+    assert report["songs"] == {"processed": 2, "by_outcome": {"mismatch": 1, "original": 1}}
+    assert report["sections"]["title_matching"]["calls"] == 1
+    assert json.loads(json.dumps(report)) == report
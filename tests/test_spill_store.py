@@ -0,0 +1,99 @@
+import os
+from collections import defaultdict
+
+import pytest
+
+from lyrics_journal import LyricsJournal
+from project_store import ProjectStore
+from spill_store import SpillStore
+
+SHARED = "Hey! Mr. Tambourine Man, play a song for me"
+TRACKS = [
+    {"song id": "1", "album title": "Bringing It All Back Home", "year": "1965", "song title": "Mr. Tambourine Man"},
+    {"song id": "1", "album title": "Greatest Hits", "year": "1967", "song title": "Mr. Tambourine Man"},
+    {"song id": "2", "album title": "Bringing It All Back Home", "year": "1965", "song title": "Maggies Farm"},
+    {"song id": "3", "album title": "Self Portrait", "year": "1970", "song title": "Early Mornin Rain"},
+    {"song id": "4", "album title": "Self Portrait", "year": "1970", "song title": "Blue Moon"},
+]
+SONGS = {"1": ("Mr. Tambourine Man", SHARED, ["Bob Dylan"]),
+         "2": ("Maggies Farm", "I aint gonna work on Maggies farm no more", ["Bob Dylan"]),
+         "3": ("Early Mornin Rain", "In the early mornin rain", ["Gordon Lightfoot"]),
+         "4": ("Blue Moon", "Blue moon, you saw me standing alone", [])}
+
+
+@pytest.fixture
+def spill():
+    spill = SpillStore()
+    yield spill
+    if os.path.exists(spill.path):
+        spill.close()
+
+
+def test_sets_are_defaultdicts_of_sets(spill):
+    lyrics_set, expected = spill.sets("lyrics"), defaultdict(set)
+    for title, lyrics in [("Mr. Tambourine Man", SHARED), ("Maggies Farm", "I aint gonna work"),
+                          ("Mr. Tambourine Man", SHARED), ("Mr. Tambourine Man", "Take me on a trip"),
+                          ("Mr. Tambourine Man (Live)", SHARED)]:
+        lyrics_set[title].add(lyrics)
+        expected[title].add(lyrics)
+    assert list(lyrics_set.items()) == list(expected.items())
+    assert len(lyrics_set) == 3
+    # stored once, whatever the number of titles it's under
+    assert spill._read("SELECT COUNT(*) FROM texts", ()).fetchone()[0] == 3
+    # sets of another name are kept apart
+    assert spill.sets("lyrics_by_years").keys() == []
+
+    lyrics_set.reorder(["Maggies Farm", "Visions of Johanna", "Mr. Tambourine Man"])
+    assert [title for title, _ in lyrics_set.items()] == ["Maggies Farm", "Mr. Tambourine Man"]
+
+
+def test_lists_round_trip_plain_data(spill):
+    not_by_artist = spill.lists("not_by_artist")
+    not_by_artist["Early Mornin Rain"].append(["Self Portrait", {"Gordon Lightfoot"}])
+    not_by_artist["Blue Moon"].append(["1970", "Self Portrait", ["N/A"]])
+    not_by_artist["Blue Moon"].append(["1970", "Self Portrait", ["N/A"]])
+    assert dict(not_by_artist.items()) == {"Early Mornin Rain": [["Self Portrait", {"Gordon Lightfoot"}]],
+                                           "Blue Moon": [["1970", "Self Portrait", ["N/A"]]] * 2}
+    assert not_by_artist.longest() == 2
+    assert spill.lists("other").longest() == 0
+
+
+def test_close_removes_the_file(spill):
+    spill.sets("lyrics")["Maggies Farm"].add("I aint gonna work")
+    spill.close()
+    assert not os.path.exists(spill.path)
+
+
+def run(dylan, directory, monkeypatch, low_memory=False, store=False):
+    # lyrics_by_song on TRACKS, as a run would have them with(out) --low-memory and a project store
+    os.makedirs(directory)
+    monkeypatch.setattr(dylan, "output_dir", str(directory))
+    monkeypatch.setattr(dylan, "low_memory", low_memory)
+    monkeypatch.setattr(dylan, "spill", SpillStore() if low_memory and not store else None)
+    monkeypatch.setattr(dylan, "project", ProjectStore(str(directory / "Dylan_project.sqlite")) if store else None)
+    dylan.genius.songs.update(SONGS)
+    if dylan.project is not None:
+        dylan.project.set_artist(181, "Bob Dylan")
+        # as track_records has them
+        dylan.listed_versions.update((track["song id"], "v1") for track in TRACKS)
+    dylan.export_tracks(TRACKS)
+    journal = LyricsJournal(str(directory / "Dylan_lyrics.journal"), "Bob Dylan")
+    dylan.export_lyrics(*dylan.fetch_lyrics(TRACKS, journal, by_id=True, store=dylan.project), journal)
+    if dylan.spill is not None:
+        dylan.spill.close()
+    if dylan.project is not None:
+        dylan.project.close()
+    files = {}
+    for file_name in ("Dylan_tracks.csv", "Dylan_lyrics.csv", "Dylan_lyrics_by_years.csv", "songs_not_by_Dylan.csv"):
+        with open(directory / file_name, encoding="utf-8") as data:
+            files[file_name] = data.read()
+    return files
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_low_memory_writes_the_same_files(dylan, tmp_path, monkeypatch, store):
+    files = run(dylan, tmp_path / "in_memory", monkeypatch)
+    assert "Hey! Mr. Tambourine Man" in files["Dylan_lyrics.csv"]
+    assert run(dylan, tmp_path / "low_memory", monkeypatch, low_memory=True, store=store) == files
+    # song versions are let go of once the project store has them
+    assert dylan.listed_versions == {}
@@ -0,0 +1,97 @@
+import pytest
+
+from project_store import ProjectStore
+from term_stats import TermStats, grams
+
+# album, year, song id, song title, lyrics
+TRACKS = [
+    ("The Freewheelin' Bob Dylan", "1963", "1", "Blowin in the Wind", "the answer is blowin in the wind"),
+    ("The Freewheelin' Bob Dylan", "1963", "2", "A Hard Rains A-Gonna Fall", "a hard rain, a hard rain"),
+    ("Highway 61 Revisited", "1965", "3", "Desolation Row", "the circus is in town"),
+]
+LATER = [
+    ("Blood on the Tracks", "1975", "4", "Idiot Wind", "idiot wind blowin like a circle round my skull"),
+    # the same lyrics, on another album : counted once (by year, it's on both)
+    ("The Bootleg Series", "1991", "4", "Idiot Wind", "idiot wind blowin like a circle round my skull"),
+]
+ALBUMS = sorted({album for album, *_ in TRACKS + LATER})
+
+
+def store_tracks(store, tracks):
+    store.add_albums({"year": year, "album title": album, "album id": ALBUMS.index(album)} for album, year, *_ in tracks)
+    lines = [{"album title": album, "song title": title, "song id": song_id, "year": year}
+             for album, year, song_id, title, _ in tracks]
+    store.add_tracks(lines)
+    for line, (*_, title, lyrics) in zip(lines, tracks):
+        store.add_song(line, {"id": line["song id"], "title": title, "artist": "Bob Dylan", "writers": ["Bob Dylan"],
+                              "lyrics": lyrics})
+        store.add_outcome(line, {"status": "original", "lyrics": lyrics})
+    return lines
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProjectStore(str(tmp_path / "Dylan_project.sqlite"))
+    store.set_artist(181, "Bob Dylan")
+    yield store
+    store.close()
+
+
+def full(store):
+    stats = TermStats(ngrams=2)
+    stats.update(store)
+    return stats
+
+
+def summary(stats):
+    # ties come in vocabulary order, i.e the order terms were first counted in, which isn't the same from one build to
+    # the next
+    return {by: {key: dict(terms) for key, terms in stats.frequencies(by=by, n=None, top=None).items()}
+            for by in ("song", "album", "year")}, stats.growth()
+
+
+def test_grams():
+    assert list(grams(["a", "hard", "rain"], ngrams=2)) == ["a", "hard", "rain", "a hard", "hard rain"]
+
+
+def test_update_round_trip(store, tmp_path):
+    path = str(tmp_path / "Dylan_stats.npz")
+    stats = TermStats(path, ngrams=2, artist="Bob Dylan")
+    lines = store_tracks(store, TRACKS)
+    assert stats.update(store) == 3
+    assert stats.frequencies(by="year", top=2) == {"1963": [("a", 2), ("hard", 2)], "1965": [("the", 1), ("circus", 1)]}
+    assert stats.trend(["Hard Rain", "wind"]) == {"Hard Rain": {"1963": 2, "1965": 0}, "wind": {"1963": 1, "1965": 0}}
+    stats.save()
+
+    # kept from one run to the next : only the lyrics fetched since are counted
+    stats = TermStats(path, ngrams=2)
+    assert (stats.artist, len(stats)) == ("Bob Dylan", 3)
+    lines += store_tracks(store, LATER)
+    assert stats.update(store) == 1
+    assert stats.update(store) == 0
+    assert len(stats) == 4
+    assert summary(stats) == summary(full(store))
+    assert stats.growth() == [
+        {"year": "1963", "words": 13, "distinct": 9, "new": 9, "vocabulary": 9},
+        {"year": "1965", "words": 5, "distinct": 5, "new": 2, "vocabulary": 11},
+        {"year": "1975", "words": 9, "distinct": 9, "new": 6, "vocabulary": 17},
+        {"year": "1991", "words": 9, "distinct": 9, "new": 0, "vocabulary": 17}]
+
+    # lyrics no longer on any track are dropped
+    store.prune([line for line in lines if line["song id"] != "2"])
+    assert stats.update(store) == 0
+    assert len(stats) == 3
+    assert stats.trend(["hard rain"]) == {"hard rain": {"1963": 0, "1965": 0, "1975": 0, "1991": 0}}
+    assert summary(stats) == summary(full(store))
+
+
+def test_other_ngrams_start_over(store, tmp_path):
+    path = str(tmp_path / "Dylan_stats.npz")
+    store_tracks(store, TRACKS)
+    stats = TermStats(path, ngrams=2)
+    stats.update(store)
+    stats.save()
+    assert len(TermStats(path, ngrams=1)) == 0
+    assert len(TermStats(path, ngrams=2, artist="The Beatles")) == 0
+    with pytest.raises(ValueError):
+        stats.frequencies(by="decade")
@@ -0,0 +1,100 @@
+import csv
+import os
+from difflib import SequenceMatcher
+
+import pytest
+
+from title_matcher import TitleMatcher, normalize_title, similarity
+
+SAMPLE_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Sample Corpus")
+
+
+@pytest.mark.parametrize("found_title, song_title, same", [
+    ("A Hard Rain's A-Gonna Fall [Gaslight 1962]", "A Hard Rains A-Gonna Fall", True),
+    ("It's Alright, Ma (I'm Only Bleeding) [Live]", "Its Alright Ma", True),
+    ("Like A Rolling Stone - Live", "Like a Rolling Stone", True),
+    ("I Should've Known Better (Instrumental)", "I Should Have Known Better", True),
+    ("Livin' the Blues", "Living the Blues", True),
+    ("Revolution", "Revolution 9", False),
+    ("Revolution 1 (2018 Mix)", "Revolution 9 (2018 Mix)", False),
+    ("One Too Many Mornings", "Too Many Mornings", False),
+    ("Time Passes Slowly #1", "Time Passes Slowly #2", False),
+    ("Desolation Row", "Ballad of a Thin Man", False),
+])
+def test_matches(found_title, song_title, same):
+    matcher = TitleMatcher([song_title, "Visions of Johanna"])
+    assert matcher.matches(found_title, song_title) is same
+    # the same decision for a song that isn't one of the tracks, compared with it rather than resolved
+    assert TitleMatcher().matches(found_title, song_title) is same
+
+
+def test_resolve_goes_through_the_tracks():
+    matcher = TitleMatcher(["Like a Rolling Stone", "Like a Rolling Stone (Live 1966)", "Desolation Row"])
+    assert matcher.resolve("Like A Rolling Stone - Live") == [
+        ("Like a Rolling Stone", 1.0), ("Like a Rolling Stone (Live 1966)", 1.0)]
+    assert matcher.resolve("Positively 4th Street") == []
+    resolved = matcher.resolve_all(["Desolation Row [Take 2]", "Desolation Row [Take 2]", "Desolation Row"])
+    assert resolved == {"Desolation Row [Take 2]": [("Desolation Row", 1.0)], "Desolation Row": [("Desolation Row", 1.0)]}
+
+
+def test_tracks_added_later_are_resolved_against():
+    matcher = TitleMatcher(["Desolation Row"])
+    assert not matcher.matches("Visions of Johanna", "Desolation Row")
+    assert matcher.resolve("Visions of Johanna") == []
+    matcher.add(["Visions of Johanna"])
+    assert matcher.resolve("Visions of Johanna") == [("Visions of Johanna", 1.0)]
+
+
+def test_tracks_added_album_by_album_resolve_as_if_added_at_once():
+    titles = sample_titles("Dylan")
+    albums = [titles[at::7] for at in range(7)]
+    matcher = TitleMatcher()
+    for album in albums:
+        # search results come up (and are resolved) while the albums after aren't added yet
+        matcher.add(album)
+        matcher.resolve_all(album[::3] + [title + " (Live)" for title in album[1::5]])
+    everything = TitleMatcher(titles)
+    found = titles + [title + " (Live)" for title in titles]
+    # the same matches, in an order of their own for matches just as similar
+    assert ({title: sorted(matches) for title, matches in matcher.resolve_all(found).items()}
+            == {title: sorted(matches) for title, matches in everything.resolve_all(found).items()})
+
+
+def sample_titles(artist):
+    with open(os.path.join(SAMPLE_CORPUS, f"{artist}_tracks.csv"), encoding="utf-8") as data:
+        return sorted({line["song title"].strip() for line in csv.DictReader(data)}, key=len)
+
+
+def same_before(first, second):
+    # the way titles used to be matched
+    matcher = SequenceMatcher(None, first, second)
+    return matcher.quick_ratio() >= 0.925 and round(matcher.ratio(), 2) >= 0.93
+
+
+def close_pairs(titles):
+    # every pair of titles (sorted by length) the SequenceMatcher ratio of 0.93 could hold for, given their lengths
+    for at, first in enumerate(titles):
+        for second in titles[at + 1:]:
+            if 2 * len(first) / (len(first) + len(second)) < 0.925:
+                break
+            yield first, second
+
+
+@pytest.mark.parametrize("artist", ["Dylan", "Beatles"])
+def test_same_decisions_as_sequence_matcher(artist):
+    # titles used to be the same song's for a SequenceMatcher ratio of 0.93 : they still are (their keys are compared
+    # rather than the titles, i.e brackets, version tags & punctuation aside) unless they have other numbers in them,
+    # and no title is taken for another it wasn't taken for before
+    titles = sample_titles(artist)
+    matcher = TitleMatcher(titles)
+    for first, second in close_pairs(titles):
+        if same_before(first, second) and similarity(first, second):
+            assert matcher.matches(first, second), (first, second)
+    keys = sorted({normalize_title(title) for title in titles}, key=len)
+    accepted = {(normalize_title(title), normalize_title(other)) for title in titles
+                for other, _ in matcher.resolve(title)}
+    expected = {(key, key) for key in keys}
+    for first, second in close_pairs(keys):
+        if same_before(first, second) and similarity(first, second):
+            expected |= {(first, second), (second, first)}
+    assert accepted == expected
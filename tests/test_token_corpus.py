@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from lyrics_index import words
+from token_corpus import Corpora, TokenCorpus, build_tokens
+
+SONGS = [
+    {"title": "Blowin in the Wind", "song_id": "1", "years": ["1963"],
+     "lyrics": "How many roads must a man walk down? The answer, my friend, is blowin' in the wind"},
+    {"title": "Idiot Wind", "song_id": "3", "years": ["1975", "1991"],
+     "lyrics": "Idiot wind, blowing every time you move your mouth"},
+    {"title": "Love Minus Zero", "song_id": "4", "years": ["1965"], "lyrics": "My love she speaks like silence"},
+]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    directory = str(tmp_path / "Dylan_tokens")
+    assert build_tokens(SONGS, directory, artist="Bob Dylan") == (
+        3, sum(len(words(song["lyrics"])) for song in SONGS),
+        len({word for song in SONGS for word in words(song["lyrics"])}))
+    return directory
+
+
+def test_round_trip(directory):
+    corpus = TokenCorpus(directory)
+    assert (corpus.artist, corpus.years, len(corpus)) == ("Bob Dylan", ["1963", "1965", "1975", "1991"], 3)
+    # twice over, the way gensim goes through a corpus
+    assert list(corpus) == list(corpus) == [words(song["lyrics"]) for song in SONGS]
+    # most frequent words first, the first seen first
+    assert corpus.vocabulary[:4] == ["the", "my", "wind", "how"]
+    assert corpus.tokens.dtype == np.uint16
+
+
+def test_years(directory):
+    corpus = TokenCorpus(directory)
+    assert corpus.year_songs("1991").tolist() == [1]
+    assert corpus.year_songs("1966").tolist() == []
+    assert list(TokenCorpus(directory, years=["1991", "1975", "1965"])) == [words(SONGS[1]["lyrics"]),
+                                                                            words(SONGS[2]["lyrics"])]
+    assert len(TokenCorpus(directory, years=[])) == 0
+
+
+def test_bow(directory):
+    corpus = TokenCorpus(directory, years=["1965"])
+    bow = list(corpus.bow())
+    assert len(bow) == len(corpus.bow()) == 1
+    assert sorted(corpus.id2word[word] for word, _ in bow[0]) == sorted(words(SONGS[2]["lyrics"]))
+    assert all(count == 1 for _, count in bow[0])
+
+
+def test_corpora(directory, tmp_path):
+    other = str(tmp_path / "Beatles_tokens")
+    build_tokens([{"title": "Yesterday", "song_id": "9", "years": ["1965"], "lyrics": "Yesterday, all my troubles"}],
+                 other, artist="The Beatles")
+    corpora = Corpora([directory, other], years=["1965"])
+    assert len(corpora) == 2
+    assert list(corpora) == [words(SONGS[2]["lyrics"]), ["yesterday", "all", "my", "troubles"]]
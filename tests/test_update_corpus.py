@@ -0,0 +1,82 @@
+import csv
+
+import pytest
+
+from lyrics_journal import LyricsJournal
+from project_store import ProjectStore
+
+ALBUM = {"year": "1965", "album title": "Highway 61 Revisited", "album id": 13573}
+SONGS = {"1": ("Like a Rolling Stone", "Once upon a time you dressed so fine", ["Bob Dylan"]),
+         "2": ("Tombstone Blues", "The sweet pretty things are in bed now of course", ["Bob Dylan"]),
+         "3": ("Cant Help Falling in Love", "Wise men say", ["George David Weiss"])}
+
+
+@pytest.fixture
+def update(dylan, tmp_path, monkeypatch):
+    """
+update_corpus, for the albums and tracks of a listing, i.e {song id: version} (genius.com the way album_records and
+track_records list it), against dylan's genius.
+"""
+    listing = {"1": "v1", "2": "v1", "3": "v1"}
+    dylan.genius.songs.update(SONGS)
+    monkeypatch.setattr(dylan, "project", ProjectStore(str(tmp_path / "Dylan_project.sqlite")))
+    dylan.project.set_artist(181, "Bob Dylan")
+
+    def track_records(albums, workers=1):
+        for song_id, version in sorted(listing.items()):
+            dylan.listed_versions[song_id] = version
+            yield {"album title": ALBUM["album title"], "song title": dylan.genius.songs[song_id][0],
+                   "song id": int(song_id), "year": ALBUM["year"]}
+
+    monkeypatch.setattr(dylan, "album_records", lambda genius_artist_id: iter([ALBUM]))
+    monkeypatch.setattr(dylan, "track_records", track_records)
+
+    def run():
+        dylan.genius.requests.clear()
+        dylan.update_corpus(181, by_id=True)
+        return dylan.genius.requests
+
+    run.listing = listing
+    yield run
+    dylan.project.close()
+
+
+def lyrics(tmp_path):
+    with open(tmp_path / "Dylan_lyrics.csv", encoding="utf-8") as data:
+        return {line[""]: line["lyrics"] for line in csv.DictReader(data)}
+
+
+def test_only_new_or_changed_songs_are_fetched(update, dylan, tmp_path):
+    assert sorted(update()) == ["1", "2", "3"]
+    assert update() == []
+    assert sorted(lyrics(tmp_path)) == ["Like a Rolling Stone", "Tombstone Blues"]
+    with open(tmp_path / "songs_not_by_Dylan.csv", encoding="utf-8") as data:
+        assert [line[""] for line in csv.DictReader(data)] == ["Cant Help Falling in Love"]
+
+    dylan.genius.songs["2"] = ("Tombstone Blues", "Mommas in the factory, she aint got no shoes", ["Bob Dylan"])
+    update.listing["2"] = "v2"
+    update.listing["4"] = "v1"
+    dylan.genius.songs["4"] = ("Desolation Row", "They're selling postcards of the hanging", ["Bob Dylan"])
+    del update.listing["1"]
+    # in song title order
+    assert update() == ["4", "2"]
+    assert lyrics(tmp_path) == {"Desolation Row": str({"Theyre selling postcards of the hanging"}),
+                                "Tombstone Blues": str({"Mommas in the factory, she aint got no shoes"})}
+
+
+def test_journal_left_behind_by_a_full_run_doesnt_hide_changed_songs(update, dylan, tmp_path):
+    # an interrupted full run journaled the song as done, before genius.com had it changed
+    update()
+    journal = LyricsJournal(str(tmp_path / "Dylan_lyrics.journal"), "Bob Dylan")
+    line = {"song id": "2", "album title": ALBUM["album title"], "year": ALBUM["year"],
+            "song title": "Tombstone Blues"}
+    journal.record(line, {"status": "original", "lyrics": SONGS["2"][1]})
+    journal.record(dict(line, **{"song id": "3", "song title": SONGS["3"][0]}), {"status": "timeout"})
+    journal._file.close()
+
+    dylan.genius.songs["2"] = ("Tombstone Blues", "Mommas in the factory", ["Bob Dylan"])
+    update.listing["2"] = "v2"
+    assert update() == ["2"]
+    assert lyrics(tmp_path)["Tombstone Blues"] == str({"Mommas in the factory"})
+    assert not (tmp_path / "Dylan_lyrics.journal").exists()
+    assert dylan.project.stale() == []
@@ -0,0 +1,197 @@
+"""
+File : title_matcher.py
+
+Telling whether the song genius.com came up with is the song that was searched for, by title.
+
+Titles are boiled down to a key first : transliterated to ascii, lower case, without whatever is in brackets
+("[Gaslight 1962]", "(Live at Newport)", "(Take 2)"), version tags ("- Live", "- 2004 Remaster", "- Demo") and
+punctuation, so that "It's Alright, Ma (I'm Only Bleeding) [Live]" and "Its Alright Ma" are the very same song.
+An index of the character trigrams of the keys finds the few tracks a title is close to among thousands without
+comparing it with each (a matter of a few set operations), and only those are compared with it the way titles always
+were, by their SequenceMatcher ratio (0.93 at least), keys rather than titles though. Keys with other numbers in them
+are never the same song ("Revolution 1" isn't "Revolution 9", nor "Time Passes Slowly #1" "Time Passes Slowly #2").
+Every distinct search result is resolved once, however many times it comes up, and stays resolved as tracks are
+added (e.g album after album, in pipeline mode).
+"""
+
+import re
+import threading
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from unidecode import unidecode
+
+# how similar (see similarity) two keys have to be for the titles to be the same song's
+THRESHOLD = 0.93
+# trigrams in common (Dice coefficient) a track needs with a title to be compared with it at all. Keys that are 0.93
+# similar have way more than that.
+CANDIDATES = 0.6
+
+BRACKETS = re.compile(r"[(\[{][^)\]}]*[)\]}]?")
+VERSION_TAGS = re.compile(
+    r"\s+[-/]\s+[^-/]*\b(live|demo|version|remaster|remastered|remix|mix|edit|take|mono|stereo|acoustic|bootleg|"
+    r"outtake|rehearsal|single|instrumental)\b.*$")
+PUNCTUATION = re.compile(r"[^\w\s]|_")
+SPACES = re.compile(r"\s+")
+NUMBERS = re.compile(r"\d+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_title(title):
+    """
+:param title: song title, as listed in the tracks csv or as found on genius.com
+:type title: str
+:return: the key title is matched by, see the doc. above
+:rtype: str
+"""
+    title = unidecode(title).lower().replace("&", " and ")
+    key = VERSION_TAGS.sub("", BRACKETS.sub(" ", title))
+    key = SPACES.sub(" ", PUNCTUATION.sub("", key)).strip()
+    if not key:
+        # nothing but brackets, e.g "(Untitled)", the title is all there is to go by
+        key = SPACES.sub(" ", PUNCTUATION.sub("", title)).strip()
+    return key
+
+
+@lru_cache(maxsize=65536)
+def trigrams(key):
+    """
+:return: character trigrams of key (padded, so that short keys have some too)
+:rtype: frozenset of str
+"""
+    padded = f"  {key} "
+    return frozenset(padded[n:n + 3] for n in range(len(padded) - 2))
+
+
+def similarity(first, second):
+    """
+:return: how similar titles first and second are, from 0 to 1 : the SequenceMatcher ratio of their keys (rounded to 2
+decimals), 1 for the same key, 0 for keys with other numbers in them
+:rtype: float
+"""
+    return key_similarity(normalize_title(first), normalize_title(second))
+
+
+def key_similarity(first, second):
+    """
+similarity of the keys of 2 titles (see normalize_title).
+:rtype: float
+"""
+    if first == second:
+        return 1.0
+    if NUMBERS.findall(first) != NUMBERS.findall(second):
+        return 0.0
+    # noinspection PyArgumentEqualDefault
+    return round(SequenceMatcher(None, first, second).ratio(), 2)
+
+
+class TitleMatcher:
+    """
+:param titles: track titles to match against, e.g every song title of the tracks csv
+:type titles: iterable of str
+:param threshold: see THRESHOLD
+:type threshold: float
+
+Example : matcher = TitleMatcher(["Like a Rolling Stone", "Desolation Row", "Ballad of a Thin Man"])
+          matcher.matches("Like A Rolling Stone (Live at Newport 1965)", "Like a Rolling Stone")    # True
+          matcher.resolve("Like A Rolling Stone - Live")     # [("Like a Rolling Stone", 1.0)]
+
+Keys and trigrams of every track are worked out once, as tracks are added, rather than for every search result, and
+every distinct search result is resolved against the tracks (through the index) once : matches() is a lookup in what
+it resolved to. Tracks added later are matched against the search results resolved so far (through an index of their
+trigrams) rather than having them all resolved again. Safe to share between threads.
+"""
+
+    def __init__(self, titles=(), threshold=THRESHOLD):
+        self.threshold = threshold
+        self._titles = {}
+        self._index = {}
+        self._resolved = {}
+        # trigrams of the keys of the search results resolved so far, see add
+        self._queries = {}
+        self._lock = threading.Lock()
+        self.add(titles)
+
+    def add(self, titles):
+        """
+adds titles to the ones search results are resolved against.
+:type titles: iterable of str
+"""
+        with self._lock:
+            for title in titles:
+                key = normalize_title(title)
+                if key not in self._titles:
+                    self._titles[key] = []
+                    for trigram in trigrams(key):
+                        self._index.setdefault(trigram, set()).add(key)
+                    # search results resolved so far may resolve to the new track as well
+                    for query, score in self._close(key, self._queries).items():
+                        self._resolved[query][key] = score
+                if title not in self._titles[key]:
+                    self._titles[key].append(title)
+
+    def matches(self, found_title, song_title):
+        """
+:param found_title: title of the search result on genius.com
+:type found_title: str
+:param song_title: title of the song searched for
+:type song_title: str
+:return: whether found_title is song_title, give or take brackets, version tags, punctuation & a typo. Looked up in
+what found_title resolves to if song_title is one of the tracks (see add), compared with it otherwise.
+:rtype: bool
+"""
+        key = normalize_title(song_title)
+        if key in self._titles:
+            return key in self._keys(normalize_title(found_title))
+        return similarity(found_title, song_title) >= self.threshold
+
+    def _keys(self, key):
+        # keys of the tracks a key resolves to, along with their similarity
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+        with self._lock:
+            resolved = self._resolved.get(key)
+            if resolved is None:
+                resolved = self._resolved[key] = self._close(key, self._index)
+                for trigram in trigrams(key):
+                    self._queries.setdefault(trigram, set()).add(key)
+        return resolved
+
+    def _close(self, key, index):
+        # keys of index similar enough to key, along with their similarity. The index of trigrams tells which keys
+        # are worth comparing with it at all.
+        grams = trigrams(key)
+        shared = {}
+        for trigram in grams:
+            for candidate in index.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        close = {}
+        for candidate, count in shared.items():
+            if 2 * count / (len(grams) + len(trigrams(candidate))) >= CANDIDATES:
+                score = key_similarity(key, candidate)
+                if score >= self.threshold:
+                    close[candidate] = score
+        return close
+
+    def resolve(self, found_title):
+        """
+:param found_title: title of a search result on genius.com
+:type found_title: str
+:return: every track title found_title matches, most similar first, as (title, similarity). Only tracks with at least
+enough trigrams in common (see CANDIDATES) are compared.
+:rtype: list of tuple
+"""
+        resolved = self._keys(normalize_title(found_title))
+        with self._lock:
+            matches = [(title, score) for candidate, score in resolved.items() for title in self._titles[candidate]]
+        return sorted(matches, key=lambda match: -match[1])
+
+    def resolve_all(self, found_titles):
+        """
+resolve() for a batch of search results at once, each distinct title resolved once (and kept for matches()).
+:type found_titles: iterable of str
+:return: matches by title
+:rtype: dict
+"""
+        return {title: self.resolve(title) for title in dict.fromkeys(found_titles)}
@@ -0,0 +1,204 @@
+"""
+File : token_corpus.py
+
+The corpus once tokenized, for models to train on straight away.
+
+[artist's_last_name]_corpus.csv is a single cell of text : every model (Word2Vec, LDA ...) has to load all of it and
+split it into words again, every time, for every artist. build_tokens tokenizes the lyrics once (the very same words
+as lyrics_index) into a directory, [artist's_last_name]_tokens/ -->
+
+    vocabulary.txt      a word per line, the line number being its id (most frequent words first)
+    tokens.npy          the id of every word of every lyrics, one lyrics after the other (uint16, or uint32 for
+                        vocabularies of more than 65536 words)
+    song_offsets.npy    where the words of every lyrics start in tokens.npy (and where the last one ends)
+    year_songs.npy      the lyrics of every year, one year after the other (their numbers, as in song_offsets.npy)
+    year_offsets.npy    where the lyrics of every year start in year_songs.npy (and where the last one ends)
+    songs.json          artist, years, and title / song id / years of every lyrics
+
+TokenCorpus memory maps the arrays (numpy.load(mmap_mode="r")), i.e opening it reads nothing but the vocabulary and
+songs.json, and words are read off the disk as they're iterated over : a few MB of resident memory whatever the size
+of the corpus. Iterating over it yields the words of every lyrics, as a list of str, again and again, which is what
+gensim expects of a corpus -->
+
+    corpus = TokenCorpus("Dylan_tokens")
+    model = gensim.models.Word2Vec(corpus, size=100, min_count=5)             # or vector_size=100, gensim 4
+    lda = gensim.models.LdaModel(corpus.bow(), id2word=corpus.id2word, num_topics=20)
+
+Corpora(["Dylan_tokens", "Beatles_tokens", ...]) does the same for the corpora of several artists at once.
+"""
+
+import array
+import json
+import os
+import shutil
+from collections import defaultdict
+
+import numpy as np
+
+from lyrics_index import words
+
+
+def build_tokens(songs, directory, artist=None):
+    """
+:param songs: lyrics to tokenize, as lyrics_index.corpus_songs has them
+:type songs: iterable of dict
+:param directory: where the tokenized corpus goes (see module doc.), replaced as a whole once written
+:type directory: str
+:param artist: artist of the songs
+:type artist: str or None
+:return: number of lyrics, of words and of distinct words
+:rtype: tuple of int
+"""
+    ids = {}
+    tokens = array.array("I")
+    song_offsets = array.array("q", [0])
+    documents = []
+    by_year = defaultdict(list)
+    for number, song in enumerate(songs):
+        tokens.extend(ids.setdefault(word, len(ids)) for word in words(song["lyrics"]))
+        song_offsets.append(len(tokens))
+        documents.append([song["title"], song["song_id"], song["years"]])
+        for year in song["years"]:
+            by_year[year].append(number)
+
+    # ids by frequency, most frequent first
+    tokens = np.frombuffer(tokens, dtype=np.uint32) if len(tokens) else np.zeros(0, dtype=np.uint32)
+    counts = np.bincount(tokens, minlength=len(ids))
+    order = np.argsort(-counts, kind="stable")
+    renumber = np.empty(len(ids), dtype=np.uint32)
+    renumber[order] = np.arange(len(ids), dtype=np.uint32)
+    vocabulary = list(ids)
+    vocabulary = [vocabulary[word] for word in order]
+    years = sorted(by_year)
+
+    scratch = directory.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    with open(os.path.join(scratch, "vocabulary.txt"), "w", encoding="utf-8") as data:
+        data.writelines(word + "\n" for word in vocabulary)
+    np.save(os.path.join(scratch, "tokens.npy"),
+            renumber[tokens].astype(np.uint16 if len(ids) <= 1 << 16 else np.uint32))
+    np.save(os.path.join(scratch, "song_offsets.npy"), np.frombuffer(song_offsets, dtype=np.int64))
+    np.save(os.path.join(scratch, "year_songs.npy"),
+            np.array([number for year in years for number in by_year[year]], dtype=np.int32))
+    np.save(os.path.join(scratch, "year_offsets.npy"),
+            np.cumsum([0] + [len(by_year[year]) for year in years], dtype=np.int64))
+    with open(os.path.join(scratch, "songs.json"), "w", encoding="utf-8") as data:
+        json.dump({"artist": artist, "years": years, "songs": documents}, data)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(scratch, directory)
+    return len(documents), len(tokens), len(vocabulary)
+
+
+class TokenCorpus:
+    """
+:param directory: a tokenized corpus (see build_tokens)
+:type directory: str
+:param years: only the lyrics of these years (default: all of them)
+:type years: collection of str or None
+
+Example : corpus = TokenCorpus("Dylan_tokens")
+          for song_words in corpus:
+              ...  # ["how", "many", "roads", "must", "a", "man", "walk", "down", ...]
+          corpus.ids(3)              # --> the ids of the words of the 4th lyrics (memory mapped numpy array)
+          corpus.year_songs("1966")  # --> the numbers of the lyrics of 1966
+"""
+
+    def __init__(self, directory, years=None):
+        self.directory = directory
+        with open(os.path.join(directory, "vocabulary.txt"), encoding="utf-8") as data:
+            self.vocabulary = data.read().split("\n")[:-1]
+        with open(os.path.join(directory, "songs.json"), encoding="utf-8") as data:
+            header = json.load(data)
+        self.artist = header["artist"]
+        self.years = header["years"]
+        self.songs = header["songs"]
+        self.tokens = np.load(os.path.join(directory, "tokens.npy"), mmap_mode="r")
+        self.song_offsets = np.load(os.path.join(directory, "song_offsets.npy"), mmap_mode="r")
+        self._year_songs = np.load(os.path.join(directory, "year_songs.npy"), mmap_mode="r")
+        self.year_offsets = np.load(os.path.join(directory, "year_offsets.npy"), mmap_mode="r")
+        self._selected = None
+        if years is not None:
+            self._selected = np.unique(np.concatenate(
+                [self.year_songs(year) for year in years] or [np.zeros(0, dtype=np.int32)]))
+
+    @property
+    def id2word(self):
+        # ids to words, the way gensim takes them
+        return dict(enumerate(self.vocabulary))
+
+    def __len__(self):
+        return len(self.songs) if self._selected is None else len(self._selected)
+
+    def numbers(self):
+        """
+:return: the numbers of the lyrics iterated over, in order
+:rtype: range or numpy.ndarray
+"""
+        return range(len(self.songs)) if self._selected is None else self._selected
+
+    def ids(self, number):
+        """
+:return: the ids of the words of a lyrics (see vocabulary), straight off the disk
+:rtype: numpy.ndarray
+"""
+        return self.tokens[self.song_offsets[number]:self.song_offsets[number + 1]]
+
+    def year_songs(self, year):
+        """
+:return: the numbers of the lyrics of a year (none for a year it doesn't have)
+:rtype: numpy.ndarray
+"""
+        if year not in self.years:
+            return np.zeros(0, dtype=np.int32)
+        at = self.years.index(year)
+        return self._year_songs[self.year_offsets[at]:self.year_offsets[at + 1]]
+
+    def __iter__(self):
+        vocabulary = self.vocabulary
+        for number in self.numbers():
+            yield [vocabulary[word] for word in self.ids(number).tolist()]
+
+    def bow(self):
+        """
+:return: every lyrics as a bag of words, [(id, count), ...], the way gensim takes a corpus for LDA, TF-IDF etc.
+(along with id2word)
+:rtype: iterable of list
+"""
+        return _BagOfWords(self)
+
+
+class _BagOfWords:
+    # a corpus as bags of words, iterated over again and again (gensim goes through a corpus several times)
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def __iter__(self):
+        for number in self.corpus.numbers():
+            ids, counts = np.unique(self.corpus.ids(number), return_counts=True)
+            yield list(zip(ids.tolist(), counts.tolist()))
+
+
+class Corpora:
+    """
+:param directories: tokenized corpora of several artists (see build_tokens)
+:type directories: list of str
+:param years: see doc. for TokenCorpus
+
+the words of every lyrics of all of them, one corpus after the other, e.g for a single Word2Vec model of a whole
+batch. (vocabularies aren't shared, hence no bow(), see gensim.corpora.Dictionary for that)
+"""
+
+    def __init__(self, directories, years=None):
+        self.corpora = [TokenCorpus(directory, years=years) for directory in directories]
+
+    def __len__(self):
+        return sum(map(len, self.corpora))
+
+    def __iter__(self):
+        for corpus in self.corpora:
+            yield from corpus